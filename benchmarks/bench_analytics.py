@@ -0,0 +1,122 @@
+"""
+Analytics backend benchmark.
+
+For each history size, loads a scratch database and times, on SQLite and on
+the DuckDB mirror: the raw month / month x category GROUP BYs over every
+transaction, and the six services/analytics.py functions end to end (SQLite
+answers those from its rollup tables). The time to load the DuckDB mirror
+and to refresh it after a one-row update are reported separately. Needs duckdb and pyarrow. Run
+from the project root:
+
+    python benchmarks/bench_analytics.py [--sizes 10000 100000 1000000] [--repeat 5]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core.config  # noqa: E402
+from core import analytics_backend  # noqa: E402
+from core.aggregates import category_monthly_select, monthly_summary_select  # noqa: E402
+from core.database import close_pool, execute_read, initialize_database, transaction  # noqa: E402
+from services import analytics  # noqa: E402
+
+CATEGORIES = ["Food & Dining", "Shopping", "Transport", "Utilities", "Entertainment", "Health", None]
+ANALYTICS = (
+    analytics.get_monthly_trends, analytics.detect_anomalies, analytics.forecast_next_month,
+    analytics.get_category_monthly_totals, analytics.get_category_growth_rates,
+    analytics.get_seasonal_patterns,
+)
+
+
+def _setup(tmp, rows):
+    cfg = core.config.load_config()
+    cfg["database"] = dict(
+        cfg.get("database", {}), path=os.path.join(tmp, f"bench_{rows}.db"), instrumentation=False,
+    )
+    cfg["cache"] = {"enabled": False}
+    cfg["analytics"] = {"backend": "sqlite", "mirror_path": os.path.join(tmp, f"mirror_{rows}.parquet")}
+    cfg["logging"] = {"level": "WARNING", "file": os.path.join(tmp, "bench.log")}
+    logging.disable(logging.INFO)
+    close_pool()
+    analytics_backend.reset_backend()
+    initialize_database()
+
+    rng = random.Random(rows)
+    with transaction() as conn:
+        conn.executemany(
+            """INSERT INTO daily_transactions
+               (date, description, amount, transaction_type, category, is_saving, uploaded_at, hash)
+               VALUES (?, ?, ?, ?, ?, ?, '2024-01-01T00:00:00', ?)""",
+            (
+                (
+                    f"{2015 + i % 10}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                    f"MERCHANT {rng.randint(1, 500)}",
+                    round(rng.uniform(10, 5000), 2),
+                    "Credit" if i % 10 == 0 else "Debit",
+                    rng.choice(CATEGORIES),
+                    1 if i % 17 == 0 else 0,
+                    f"bench{i}",
+                )
+                for i in range(rows)
+            ),
+        )
+
+
+def _best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def bench_size(tmp, rows, repeat):
+    _setup(tmp, rows)
+    raw = [monthly_summary_select(), category_monthly_select()]
+    result = {"rows": rows}
+
+    result["sqlite_raw"] = _best(lambda: [execute_read(q) for q in raw], repeat)
+    result["sqlite_api"] = _best(lambda: [f() for f in ANALYTICS], repeat)
+
+    core.config.get_config()["analytics"]["backend"] = "duckdb"
+    result["sync"] = _best(lambda: analytics_backend.sync_mirror(force=True), 1)
+    result["duckdb_raw"] = _best(lambda: [analytics_backend.analytics_read(q) for q in raw], repeat)
+    result["duckdb_api"] = _best(lambda: [f() for f in ANALYTICS], repeat)
+
+    def update_and_refresh():
+        with transaction() as conn:
+            conn.execute("UPDATE daily_transactions SET amount = amount + 1 WHERE id = 1")
+        analytics_backend.sync_mirror()
+
+    result["refresh"] = _best(update_and_refresh, repeat)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>9}  {'raw GROUP BY (ms)':>21}  {'analytics API (ms)':>21}  {'mirror (ms)':>17}")
+    print(f"{'':>9}  {'sqlite':>10} {'duckdb':>10}  {'sqlite':>10} {'duckdb':>10}  {'load':>8} {'refresh':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.sizes:
+            r = bench_size(tmp, rows, args.repeat)
+            print(
+                f"{r['rows']:>9}  {r['sqlite_raw']:>10.1f} {r['duckdb_raw']:>10.1f}  "
+                f"{r['sqlite_api']:>10.1f} {r['duckdb_api']:>10.1f}  {r['sync']:>8.0f} {r['refresh']:>8.1f}"
+            )
+        close_pool()
+        analytics_backend.reset_backend()
+
+
+if __name__ == "__main__":
+    main()
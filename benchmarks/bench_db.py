@@ -0,0 +1,137 @@
+"""
+Database throughput benchmark.
+
+Measures single-statement write throughput, concurrent read throughput
+from short-lived threads (the pattern Flask's threaded server produces), and
+dashboard reads while an ingest is running, against a scratch database. Run
+from the project root:
+
+    python benchmarks/bench_db.py [--rows 5000] [--threads 8] [--reads 200] [--seconds 3]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core.config  # noqa: E402
+from core.database import execute_query, initialize_database, transaction  # noqa: E402
+from services.analytics import detect_anomalies  # noqa: E402
+from services.transaction_service import get_category_breakdown, get_daily_spending, get_summary  # noqa: E402
+
+
+def _setup(path):
+    cfg = core.config.load_config()
+    cfg["database"] = dict(cfg.get("database", {}), path=path)
+    cfg["cache"] = {"enabled": False}
+    cfg["logging"] = {"level": "WARNING", "file": os.path.join(os.path.dirname(path), "bench.log")}
+    logging.disable(logging.INFO)
+    initialize_database()
+
+
+def bench_writes(rows):
+    start = time.perf_counter()
+    for i in range(rows):
+        execute_query(
+            """INSERT INTO daily_transactions
+               (date, description, amount, transaction_type, category, is_saving, uploaded_at, hash)
+               VALUES (?, ?, ?, 'Debit', 'Shopping', 0, '2024-01-01T00:00:00', ?)""",
+            (f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}", f"MERCHANT {i % 97}", 10.0 + i % 500, f"bench{i}"),
+        )
+    return rows / (time.perf_counter() - start)
+
+
+def bench_reads(threads, reads):
+    def worker():
+        for _ in range(reads):
+            execute_query(
+                """SELECT category, SUM(amount) FROM daily_transactions
+                   WHERE transaction_type = 'Debit' AND year_month = '2024-03'
+                   GROUP BY category""",
+                fetch=True,
+            )
+
+    start = time.perf_counter()
+    # Fresh threads per round, as request threads churn under the dev server
+    for _ in range(5):
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+    return 5 * threads * reads / (time.perf_counter() - start)
+
+
+def bench_mixed(threads, seconds):
+    """Dashboard readers against a writer ingesting 100-row batches."""
+    stop = threading.Event()
+    counts = {"reads": 0, "writes": 0}
+    lock = threading.Lock()
+
+    def writer():
+        batch = 0
+        while not stop.is_set():
+            with transaction():
+                for i in range(100):
+                    execute_query(
+                        """INSERT INTO daily_transactions
+                           (date, description, amount, transaction_type, category, is_saving,
+                            uploaded_at, hash)
+                           VALUES (?, ?, ?, 'Debit', 'Food & Dining', 0, '2024-01-01T00:00:00', ?)""",
+                        (f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}", f"CAFE {i}", 50.0 + i, f"mix{batch}-{i}"),
+                    )
+            batch += 1
+            with lock:
+                counts["writes"] += 100
+
+    def reader():
+        while not stop.is_set():
+            get_summary()
+            get_category_breakdown("Debit")
+            detect_anomalies()
+            get_daily_spending()
+            with lock:
+                counts["reads"] += 4
+
+    workers = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in workers:
+        t.join()
+    return counts["reads"] / seconds, counts["writes"] / seconds
+
+
+def _open_files():
+    try:
+        return len(os.listdir(f"/proc/{os.getpid()}/fd"))
+    except OSError:
+        return -1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _setup(os.path.join(tmp, "bench.db"))
+        writes = bench_writes(args.rows)
+        reads = bench_reads(args.threads, args.reads)
+        mixed_reads, mixed_writes = bench_mixed(args.threads, args.seconds)
+        print(f"writes: {writes:10.0f} rows/s   ({args.rows} single-row commits)")
+        print(f"reads:  {reads:10.0f} queries/s ({args.threads} threads x 5 rounds x {args.reads})")
+        print(f"mixed:  {mixed_reads:10.0f} dashboard queries/s alongside {mixed_writes:.0f} ingested rows/s")
+        print(f"open file descriptors after run: {_open_files()}")
+
+
+if __name__ == "__main__":
+    main()
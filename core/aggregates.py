@@ -0,0 +1,298 @@
+"""
+Trigger-maintained rollups of daily_transactions.
+
+monthly_summary holds one row per year_month with the totals the dashboard,
+analytics and festival pages need. category_monthly is the finer
+month x category x type x is_saving cube (sum, count, min, max) behind the
+per-category analytics, budgets and suggestions. daily_totals is the same
+cube by day, read by the prefix sums in core/daily_series.py. All three are
+kept current by triggers on every insert, update and delete so readers never
+re-aggregate the raw table.
+"""
+from core.logger import setup_logger
+
+logger = setup_logger("pfa.aggregates")
+
+# Per-row contribution of a transaction to its month's summary row.
+_SUMMARY_TERMS = {
+    "total_income": "CASE WHEN {r}.transaction_type = 'Credit' THEN {r}.amount ELSE 0 END",
+    "total_expenses": "CASE WHEN {r}.transaction_type = 'Debit' AND {r}.is_saving = 0 THEN {r}.amount ELSE 0 END",
+    "total_savings": "CASE WHEN {r}.is_saving = 1 THEN {r}.amount ELSE 0 END",
+    "total_debits": "CASE WHEN {r}.transaction_type = 'Debit' THEN {r}.amount ELSE 0 END",
+    "debit_count": "CASE WHEN {r}.transaction_type = 'Debit' THEN 1 ELSE 0 END",
+    "txn_count": "1",
+}
+
+
+def changed(columns) -> str:
+    """
+    WHEN condition for an AFTER UPDATE trigger: one of the columns really
+    changed. The daily_transactions view's INSTEAD OF UPDATE trigger assigns
+    every column, so UPDATE OF alone would fire on any edit.
+    """
+    return " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in columns)
+
+
+_SUMMARY_COLUMNS = ("date", "amount", "transaction_type", "is_saving")
+_CUBE_COLUMNS = ("date", "amount", "transaction_type", "category", "is_saving")
+
+
+def _terms(row):
+    return {col: expr.format(r=row) for col, expr in _SUMMARY_TERMS.items()}
+
+
+def _add_to_summary(row):
+    terms = _terms(row)
+    cols = ", ".join(terms)
+    values = ", ".join(terms.values())
+    updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in terms)
+    return (
+        f"INSERT INTO monthly_summary (month, {cols}) VALUES ({row}.year_month, {values}) "
+        f"ON CONFLICT(month) DO UPDATE SET {updates};"
+    )
+
+
+def _remove_from_summary(row):
+    updates = ", ".join(f"{c} = {c} - ({expr})" for c, expr in _terms(row).items())
+    return (
+        f"UPDATE monthly_summary SET {updates} WHERE month = {row}.year_month;\n"
+        f"DELETE FROM monthly_summary WHERE month = {row}.year_month AND txn_count <= 0;"
+    )
+
+
+def create_summary_triggers(cursor, table="transaction_rows"):
+    cursor.execute("DROP TRIGGER IF EXISTS trg_summary_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_summary_delete")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_summary_update")
+    cursor.execute(f"""
+        CREATE TRIGGER trg_summary_insert AFTER INSERT ON {table}
+        BEGIN
+            {_add_to_summary("NEW")}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_summary_delete AFTER DELETE ON {table}
+        BEGIN
+            {_remove_from_summary("OLD")}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_summary_update
+        AFTER UPDATE OF {", ".join(_SUMMARY_COLUMNS)} ON {table}
+        WHEN {changed(_SUMMARY_COLUMNS)}
+        BEGIN
+            {_remove_from_summary("OLD")}
+            {_add_to_summary("NEW")}
+        END
+    """)
+
+
+def _month_filter(column, months):
+    """SQL condition and params limiting a rebuild to an inclusive (first, last) month range."""
+    if months is None:
+        return "true", ()
+    return f"{column} BETWEEN ? AND ?", tuple(months)
+
+
+def monthly_summary_select(source="daily_transactions", where="true"):
+    """SELECT producing monthly_summary rows from any table or view of transactions."""
+    sums = ", ".join(f"SUM({expr}) AS {col}" for col, expr in _terms("t").items())
+    return f"""
+        SELECT t.year_month AS month, {sums}
+        FROM {source} t
+        WHERE {where}
+        GROUP BY t.year_month
+    """
+
+
+def rebuild_monthly_summary(cursor, months=None):
+    """Recompute monthly_summary from scratch (existing data, or after drift)."""
+    cols = ", ".join(_SUMMARY_TERMS)
+    where, params = _month_filter("month", months)
+    cursor.execute(f"DELETE FROM monthly_summary WHERE {where}", params)
+    where, params = _month_filter("t.year_month", months)
+    cursor.execute(
+        f"INSERT INTO monthly_summary (month, {cols}) {monthly_summary_select(where=where)}", params,
+    )
+
+
+# Uncategorized rows are stored under '' so the cube key stays NOT NULL.
+_CUBE_KEY = "year_month, category, transaction_type, is_saving"
+
+
+def _add_to_cube(row):
+    return f"""
+        INSERT INTO category_monthly ({_CUBE_KEY}, total, txn_count, min_amount, max_amount)
+        VALUES ({row}.year_month, COALESCE({row}.category, ''), {row}.transaction_type,
+                COALESCE({row}.is_saving, 0), {row}.amount, 1, {row}.amount, {row}.amount)
+        ON CONFLICT({_CUBE_KEY}) DO UPDATE SET
+            total = total + excluded.total,
+            txn_count = txn_count + 1,
+            min_amount = MIN(min_amount, excluded.min_amount),
+            max_amount = MAX(max_amount, excluded.max_amount);"""
+
+
+def _remove_from_cube(row, table):
+    cell = (
+        f"year_month = {row}.year_month AND category = COALESCE({row}.category, '') "
+        f"AND transaction_type = {row}.transaction_type AND is_saving = COALESCE({row}.is_saving, 0)"
+    )
+    source = (
+        f"transaction_type = {row}.transaction_type AND year_month = {row}.year_month "
+        f"AND category IS {row}.category AND COALESCE(is_saving, 0) = COALESCE({row}.is_saving, 0)"
+    )
+    # min/max cannot be decremented; re-read them from the (indexed) cell only
+    # when the removed amount was one of the extremes.
+    return f"""
+        UPDATE category_monthly SET total = total - {row}.amount, txn_count = txn_count - 1
+        WHERE {cell};
+        DELETE FROM category_monthly WHERE {cell} AND txn_count <= 0;
+        UPDATE category_monthly SET
+            min_amount = (SELECT MIN(amount) FROM {table} WHERE {source}),
+            max_amount = (SELECT MAX(amount) FROM {table} WHERE {source})
+        WHERE {cell} AND (min_amount >= {row}.amount OR max_amount <= {row}.amount);"""
+
+
+def create_cube_triggers(cursor, table="transaction_rows"):
+    cursor.execute("DROP TRIGGER IF EXISTS trg_cube_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_cube_delete")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_cube_update")
+    cursor.execute(f"""
+        CREATE TRIGGER trg_cube_insert AFTER INSERT ON {table}
+        BEGIN {_add_to_cube("NEW")}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_cube_delete AFTER DELETE ON {table}
+        BEGIN {_remove_from_cube("OLD", table)}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_cube_update
+        AFTER UPDATE OF {", ".join(_CUBE_COLUMNS)} ON {table}
+        WHEN {changed(_CUBE_COLUMNS)}
+        BEGIN {_remove_from_cube("OLD", table)}
+            {_add_to_cube("NEW")}
+        END
+    """)
+
+
+def category_monthly_select(source="daily_transactions", where="true"):
+    """SELECT producing category_monthly rows from any table or view of transactions."""
+    return f"""
+        SELECT year_month, COALESCE(category, '') AS category, transaction_type,
+               COALESCE(is_saving, 0) AS is_saving, SUM(amount) AS total, COUNT(*) AS txn_count,
+               MIN(amount) AS min_amount, MAX(amount) AS max_amount
+        FROM {source}
+        WHERE {where}
+        GROUP BY year_month, COALESCE(category, ''), transaction_type, COALESCE(is_saving, 0)
+    """
+
+
+def rebuild_category_monthly(cursor, months=None):
+    where, params = _month_filter("year_month", months)
+    cursor.execute(f"DELETE FROM category_monthly WHERE {where}", params)
+    cursor.execute(f"""
+        INSERT INTO category_monthly ({_CUBE_KEY}, total, txn_count, min_amount, max_amount)
+        {category_monthly_select(where=where)}
+    """, params)
+
+
+# seq numbers every change to daily_totals so core/daily_series.py can catch
+# up on just the days written since it last looked. A day emptied by deletes
+# keeps its row at zero rather than vanishing unseen.
+_DAILY_KEY = "date, category, transaction_type, is_saving"
+_NEXT_SEQ = "(SELECT COALESCE(MAX(seq), 0) + 1 FROM daily_totals)"
+
+
+def _add_to_daily(row):
+    return f"""
+        INSERT INTO daily_totals ({_DAILY_KEY}, total, txn_count, seq)
+        VALUES ({row}.date, COALESCE({row}.category, ''), {row}.transaction_type,
+                COALESCE({row}.is_saving, 0), {row}.amount, 1, {_NEXT_SEQ})
+        ON CONFLICT({_DAILY_KEY}) DO UPDATE SET
+            total = total + excluded.total,
+            txn_count = txn_count + 1,
+            seq = excluded.seq;"""
+
+
+def _remove_from_daily(row):
+    return f"""
+        UPDATE daily_totals SET total = total - {row}.amount, txn_count = txn_count - 1, seq = {_NEXT_SEQ}
+        WHERE date = {row}.date AND category = COALESCE({row}.category, '')
+          AND transaction_type = {row}.transaction_type AND is_saving = COALESCE({row}.is_saving, 0);"""
+
+
+def create_daily_triggers(cursor, table="transaction_rows"):
+    cursor.execute("DROP TRIGGER IF EXISTS trg_daily_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_daily_delete")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_daily_update")
+    cursor.execute(f"""
+        CREATE TRIGGER trg_daily_insert AFTER INSERT ON {table}
+        BEGIN {_add_to_daily("NEW")}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_daily_delete AFTER DELETE ON {table}
+        BEGIN {_remove_from_daily("OLD")}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_daily_update
+        AFTER UPDATE OF {", ".join(_CUBE_COLUMNS)} ON {table}
+        WHEN {changed(_CUBE_COLUMNS)}
+        BEGIN {_remove_from_daily("OLD")}
+            {_add_to_daily("NEW")}
+        END
+    """)
+
+
+def daily_totals_select(source="daily_transactions", where="true"):
+    """SELECT producing daily_totals rows (without seq) from any table or view of transactions."""
+    return f"""
+        SELECT date, COALESCE(category, '') AS category, transaction_type,
+               COALESCE(is_saving, 0) AS is_saving, SUM(amount) AS total, COUNT(*) AS txn_count
+        FROM {source}
+        WHERE {where}
+        GROUP BY date, COALESCE(category, ''), transaction_type, COALESCE(is_saving, 0)
+    """
+
+
+def merge_daily_totals(cursor, source, where="true", params=()):
+    """Add source's per-day totals onto daily_totals under one new seq."""
+    seq = cursor.execute(f"SELECT {_NEXT_SEQ}").fetchone()[0]
+    cursor.execute(f"""
+        INSERT INTO daily_totals ({_DAILY_KEY}, total, txn_count, seq)
+        SELECT {_DAILY_KEY}, total, txn_count, ? FROM ({daily_totals_select(source, where)}) WHERE true
+        ON CONFLICT({_DAILY_KEY}) DO UPDATE SET
+            total = total + excluded.total,
+            txn_count = txn_count + excluded.txn_count,
+            seq = excluded.seq
+    """, (seq, *params))
+
+
+def rebuild_daily_totals(cursor, months=None):
+    where, params = _month_filter("substr(date, 1, 7)", months)
+    seq = cursor.execute(f"SELECT {_NEXT_SEQ}").fetchone()[0]
+    cursor.execute(f"UPDATE daily_totals SET total = 0, txn_count = 0, seq = ? WHERE {where}", (seq, *params))
+    where, params = _month_filter("year_month", months)
+    merge_daily_totals(cursor, "daily_transactions", where, params)
+
+
+def rebuild_aggregates(conn, extra=None):
+    """
+    Rebuild every rollup table inside one transaction. extra(cursor), if
+    given, runs in the same transaction after the rebuild.
+    """
+    conn.execute("BEGIN")
+    try:
+        rebuild_monthly_summary(conn.cursor())
+        rebuild_category_monthly(conn.cursor())
+        rebuild_daily_totals(conn.cursor())
+        if extra is not None:
+            extra(conn.cursor())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    logger.info("Aggregate tables rebuilt")
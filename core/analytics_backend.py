@@ -0,0 +1,203 @@
+"""
+Selectable backend for analytics queries.
+
+With ``analytics.backend: sqlite`` (the default) analytics read the
+trigger-maintained rollup tables through execute_read(). With ``duckdb``,
+the full transaction history (archived years included) is mirrored into an
+embedded DuckDB, where monthly_summary and category_monthly are views that
+aggregate the raw rows with the same definitions as the SQLite rollups. The
+same SQL therefore runs on either backend and returns the same shapes.
+
+The mirror is loaded once from a Parquet export. After that, each refresh
+re-reads only the dates whose daily_totals seq moved since the last one and
+replaces their rows. The reads from SQLite and the export run outside the
+module lock, which only guards the DuckDB connections, so analytics callers
+never wait on them. Each profile has its own mirror and DuckDB connection.
+
+Needs the optional ``duckdb`` and ``pyarrow`` packages; if they are missing
+the sqlite backend is used.
+"""
+import json
+import os
+import threading
+from typing import Dict
+
+from core.aggregates import category_monthly_select, monthly_summary_select
+from core.archive import history_sources, union_sql
+from core.config import get_config
+from core.database import execute_read, execute_read_on, get_database_id
+from core.logger import setup_logger
+from core.profiles import active_profile, on_profile_evicted, scoped_path
+
+logger = setup_logger("pfa.analytics_backend")
+
+# The columns the analytics views aggregate
+MIRROR_COLUMNS = "date, amount, category, transaction_type, is_saving"
+
+# Guards the DuckDB connections and _mirrors; held only for DuckDB work
+_lock = threading.Lock()
+# mirror path -> {"conn", "profile", "database_id", "seq": highest daily_totals.seq applied}
+_mirrors: Dict[str, dict] = {}
+# mirror path -> lock held by the one thread refreshing that mirror
+_refreshing: Dict[str, threading.Lock] = {}
+_unavailable = False
+
+
+def _config():
+    return get_config().get("analytics", {})
+
+
+def backend() -> str:
+    global _unavailable
+    if _config().get("backend", "sqlite") != "duckdb" or _unavailable:
+        return "sqlite"
+    try:
+        import duckdb  # noqa: F401
+        import pyarrow  # noqa: F401
+    except ImportError:
+        _unavailable = True
+        logger.warning("analytics.backend is duckdb but duckdb/pyarrow are not installed; using sqlite")
+        return "sqlite"
+    return "duckdb"
+
+
+def mirror_path() -> str:
+    return scoped_path(_config().get("mirror_path", "analytics_mirror.parquet"))
+
+
+def _top_seq() -> int:
+    return execute_read("SELECT COALESCE(MAX(seq), 0) AS seq FROM daily_totals")[0]["seq"]
+
+
+def _connect(path):
+    import duckdb
+
+    conn = duckdb.connect()
+    conn.execute(f"SET threads = {int(_config().get('threads', 4))}")
+    conn.execute(f"CREATE TABLE transactions AS SELECT {MIRROR_COLUMNS} FROM read_parquet(?)", [path])
+    conn.execute("""
+        CREATE VIEW daily_transactions AS
+        SELECT *, substr(date, 1, 7) AS year_month, CAST(substr(date, 6, 2) AS INTEGER) AS cal_month
+        FROM transactions
+    """)
+    conn.execute(f"CREATE VIEW monthly_summary AS {monthly_summary_select()}")
+    conn.execute(f"CREATE VIEW category_monthly AS {category_monthly_select()}")
+    return conn
+
+
+def _load(path, database_id):
+    """Export the full history to Parquet and swap in a DuckDB connection loaded from it."""
+    from core.snapshot import export_transactions
+
+    # Read the seq first: a write racing the export is only applied again later
+    seq = _top_seq()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.partial"
+    rows = export_transactions(tmp_path)
+    os.replace(tmp_path, path)
+    duck = _connect(path)
+    with _lock:
+        old = _mirrors.get(path)
+        _mirrors[path] = {"conn": duck, "profile": active_profile(), "database_id": database_id, "seq": seq}
+        if old is not None:
+            old["conn"].close()
+    logger.info("Analytics mirror loaded with %d transactions", rows)
+
+
+def _changed_rows(since):
+    """The top seq, the dates written after since, and those dates' rows, from one read transaction."""
+    with history_sources() as (conn, schemas):
+        conn.execute("BEGIN")
+        try:
+            seq = execute_read_on(conn, "SELECT COALESCE(MAX(seq), 0) FROM daily_totals")[0][0]
+            dates = [r[0] for r in execute_read_on(
+                conn, "SELECT DISTINCT date FROM daily_totals WHERE seq > ?", (since,),
+            )]
+            source = "daily_transactions" if schemas == ["main"] else f"({union_sql(schemas)})"
+            rows = execute_read_on(
+                conn,
+                f"SELECT {MIRROR_COLUMNS} FROM {source} WHERE date IN (SELECT value FROM json_each(?))",
+                (json.dumps(dates),),
+            ) if dates else []
+        finally:
+            conn.rollback()
+    return seq, dates, rows
+
+
+def _apply(mirror, seq, dates, rows):
+    """Replace the given dates' rows in the DuckDB mirror."""
+    import pyarrow as pa
+
+    columns = MIRROR_COLUMNS.split(", ")
+    types = {"amount": pa.float64(), "is_saving": pa.int64()}
+    changed = pa.table({
+        name: pa.array([r[i] for r in rows], type=types.get(name, pa.string()))
+        for i, name in enumerate(columns)
+    })
+    with _lock:
+        duck = mirror["conn"]
+        duck.execute("DELETE FROM transactions WHERE date IN (SELECT unnest(?))", [dates])
+        duck.register("changed_rows", changed)
+        try:
+            duck.execute(f"INSERT INTO transactions SELECT {MIRROR_COLUMNS} FROM changed_rows")
+        finally:
+            duck.unregister("changed_rows")
+        mirror["seq"] = seq
+
+
+def sync_mirror(force=False) -> bool:
+    """Bring the mirror up to date with SQLite. Returns True if anything changed."""
+    path = os.path.abspath(mirror_path())
+    with _lock:
+        refreshing = _refreshing.setdefault(path, threading.Lock())
+    # One refresh per mirror at a time; readers of the mirror are not held up by it
+    with refreshing:
+        database_id = get_database_id()
+        with _lock:
+            mirror = _mirrors.get(path)
+        if force or mirror is None or mirror["database_id"] != database_id:
+            _load(path, database_id)
+            return True
+        seq, dates, rows = _changed_rows(mirror["seq"])
+        if seq < mirror["seq"]:
+            # The file went back in time under the same id, e.g. a restored backup
+            logger.info("daily_totals is behind the mirror (seq %d < %d); reloading", seq, mirror["seq"])
+            _load(path, database_id)
+            return True
+        if not dates:
+            return False
+        _apply(mirror, seq, dates, rows)
+    logger.info("Analytics mirror refreshed %d days (%d transactions)", len(dates), len(rows))
+    return True
+
+
+def analytics_read(query, params=()):
+    """execute_read() on the configured backend; rows support r["column"] either way."""
+    if backend() == "sqlite":
+        return execute_read(query, params)
+    sync_mirror()
+    with _lock:
+        cursor = _mirrors[os.path.abspath(mirror_path())]["conn"].execute(query, list(params))
+        columns = [d[0] for d in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _evict(profile: str):
+    with _lock:
+        for path in [p for p, m in _mirrors.items() if m["profile"] == profile]:
+            _mirrors.pop(path)["conn"].close()
+            _refreshing.pop(path, None)
+
+
+on_profile_evicted(_evict)
+
+
+def reset_backend():
+    """Drop the DuckDB connections (tests, or after switching databases)."""
+    global _unavailable
+    with _lock:
+        for mirror in _mirrors.values():
+            mirror["conn"].close()
+        _mirrors.clear()
+        _refreshing.clear()
+        _unavailable = False
@@ -0,0 +1,325 @@
+"""
+Per-year archive databases.
+
+archive_year() moves every transaction of a closed calendar year out of the
+live database into ``archive.directory/transactions_<year>.db``, together
+with a copy of that year's monthly_summary / category_monthly rows and its
+own full-text index. The live rollup rows for the year (daily_totals too)
+are kept frozen, so
+dashboards, analytics and budgets see the same totals as before while
+daily_transactions only holds open years.
+
+Queries over raw rows that need the full history use history_sources() or
+execute_history(), which attach the archive files to a read connection and
+span them with UNION ALL. restore_year() moves a year back.
+"""
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Set
+
+from core.aggregates import (
+    merge_daily_totals,
+    rebuild_category_monthly,
+    rebuild_daily_totals,
+    rebuild_monthly_summary,
+)
+from core.config import get_config
+from core.database import connection, execute_read, execute_read_on, in_transaction, read_connection
+from core.interning import insert_transactions_from
+from core.logger import setup_logger
+from core.profiles import scoped_path
+
+logger = setup_logger("pfa.archive")
+
+# Stored columns of daily_transactions. Archives keep year_month / cal_month
+# as ordinary columns so the same filters work on both sides of a union.
+ARCHIVE_COLUMNS = (
+    "id, date, description, amount, transaction_type, category, is_saving, uploaded_at, hash, "
+    "pending_ml, predicted_category, predicted_is_saving, predicted_confidence, "
+    "prediction_source, prediction_reviewed"
+)
+UNION_COLUMNS = ARCHIVE_COLUMNS + ", year_month, cal_month"
+
+
+def archive_dir() -> str:
+    return scoped_path(get_config().get("archive", {}).get("directory", "archives"))
+
+
+def _months(year):
+    return f"{year}-01", f"{year}-12"
+
+
+def list_archives() -> List[Dict]:
+    rows = execute_read("SELECT year, path, row_count, archived_at FROM archives ORDER BY year")
+    return [dict(r) for r in rows]
+
+
+def archived_years() -> Set[int]:
+    return {a["year"] for a in list_archives()}
+
+
+@contextmanager
+def history_sources():
+    """
+    Yield (connection, schemas): a read connection and the schema names whose
+    daily_transactions together hold the full history ("main" first). Archives
+    cannot be attached inside a unit of work, so with any archived years this
+    raises there rather than return part of the history.
+    """
+    archives = list_archives()
+    if archives and in_transaction():
+        raise RuntimeError("History reads over archived years cannot run inside a unit of work")
+    with read_connection() as conn:
+        if not archives:
+            yield conn, ["main"]
+            return
+        limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        if len(archives) > limit:
+            raise RuntimeError(f"{len(archives)} archives exceed SQLite's attach limit of {limit}")
+        schemas = []
+        try:
+            for a in archives:
+                if not os.path.exists(a["path"]):
+                    logger.warning("Archive for %d missing at %s", a["year"], a["path"])
+                    continue
+                schema = f"archive_{a['year']}"
+                conn.execute("ATTACH DATABASE ? AS " + schema, (a["path"],))
+                schemas.append(schema)
+            yield conn, ["main"] + schemas
+        finally:
+            for schema in schemas:
+                conn.execute(f"DETACH DATABASE {schema}")
+
+
+def union_sql(schemas: Iterable[str]) -> str:
+    return " UNION ALL ".join(
+        f"SELECT {UNION_COLUMNS} FROM {s}.daily_transactions" for s in schemas
+    )
+
+
+def execute_history(query: str, params=()):
+    """execute_read() where {transactions} in the query spans live and archived rows."""
+    with history_sources() as (conn, schemas):
+        source = "daily_transactions" if schemas == ["main"] else f"({union_sql(schemas)})"
+        return execute_read_on(conn, query.format(transactions=source), params)
+
+
+def find_archived_hashes(hashes: Iterable[str]) -> Set[str]:
+    """Which of the given transaction hashes already exist in an archive."""
+    hashes = list(hashes)
+    found = set()
+    if not hashes:
+        return found
+    with history_sources() as (conn, schemas):
+        for schema in schemas[1:]:
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                rows = execute_read_on(
+                    conn,
+                    f"SELECT hash FROM {schema}.daily_transactions WHERE hash IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                found.update(r[0] for r in rows)
+    return found
+
+
+def _create_archive(conn, year, first, last):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(f"""
+            CREATE TABLE archive_new.daily_transactions AS
+            SELECT {UNION_COLUMNS} FROM main.daily_transactions
+            WHERE year_month BETWEEN ? AND ?
+            ORDER BY id
+        """, (first, last))
+        conn.execute("CREATE UNIQUE INDEX archive_new.idx_archive_id ON daily_transactions (id)")
+        conn.execute("CREATE INDEX archive_new.idx_archive_date ON daily_transactions (date)")
+        conn.execute("CREATE INDEX archive_new.idx_archive_hash ON daily_transactions (hash)")
+        conn.execute("""
+            CREATE TABLE archive_new.monthly_summary AS
+            SELECT * FROM main.monthly_summary WHERE month BETWEEN ? AND ?
+        """, (first, last))
+        conn.execute("""
+            CREATE TABLE archive_new.category_monthly AS
+            SELECT * FROM main.category_monthly WHERE year_month BETWEEN ? AND ?
+        """, (first, last))
+        conn.execute("""
+            CREATE VIRTUAL TABLE archive_new.transactions_fts USING fts5(
+                description, content='daily_transactions', content_rowid='id',
+                tokenize='unicode61', prefix='2 3'
+            )
+        """)
+        conn.execute("INSERT INTO archive_new.transactions_fts (transactions_fts) VALUES ('rebuild')")
+        count = conn.execute("SELECT COUNT(*) FROM archive_new.daily_transactions").fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return count
+
+
+def archive_year(year: int) -> int:
+    """Move a closed year's transactions into its archive file. Returns rows moved."""
+    if year >= datetime.now().year:
+        raise ValueError(f"{year} is not a closed year")
+    if in_transaction():
+        raise RuntimeError("archive_year() cannot run inside a unit of work")
+    if year in archived_years():
+        raise ValueError(f"{year} is already archived")
+
+    first, last = _months(year)
+    os.makedirs(archive_dir(), exist_ok=True)
+    path = os.path.abspath(os.path.join(archive_dir(), f"transactions_{year}.db"))
+    if os.path.exists(path):
+        # Left behind by an interrupted run: it was never registered
+        os.remove(path)
+
+    with connection() as conn:
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("ATTACH DATABASE ? AS archive_new", (path,))
+        try:
+            # 1. Copy the year (rows, rollups, search index) into the archive file
+            count = _create_archive(conn, year, first, last)
+            if not count:
+                raise ValueError(f"No transactions in {year}")
+
+            # 2. Drop the rows from the live table but keep the year's rollups frozen
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                summary = conn.execute(
+                    "SELECT * FROM main.monthly_summary WHERE month BETWEEN ? AND ?", (first, last)
+                ).fetchall()
+                cube = conn.execute(
+                    "SELECT * FROM main.category_monthly WHERE year_month BETWEEN ? AND ?", (first, last)
+                ).fetchall()
+                days = conn.execute(
+                    "SELECT * FROM main.daily_totals WHERE date BETWEEN ? AND ?",
+                    (f"{year}-01-01", f"{year}-12-31"),
+                ).fetchall()
+                deleted = conn.execute(
+                    "DELETE FROM main.transaction_rows WHERE year_month BETWEEN ? AND ?", (first, last)
+                ).rowcount
+                if deleted != count:
+                    raise RuntimeError(f"Archived {count} rows but deleted {deleted}")
+                _restore_rows(conn, "monthly_summary", summary)
+                _restore_rows(conn, "category_monthly", cube)
+                _restore_rows(conn, "daily_totals", days)
+                conn.execute(
+                    "INSERT INTO archives (year, path, row_count, archived_at) VALUES (?, ?, ?, ?)",
+                    (year, path, count, datetime.now().isoformat()),
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        except Exception:
+            conn.execute("DETACH DATABASE archive_new")
+            os.remove(path)
+            raise
+        conn.execute("DETACH DATABASE archive_new")
+
+    logger.info("Archived %d transactions from %d to %s", count, year, path)
+    return count
+
+
+def _restore_rows(conn, table, rows):
+    if not rows:
+        return
+    cols = rows[0].keys()
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+        [tuple(r) for r in rows],
+    )
+
+
+def restore_year(year: int) -> int:
+    """Move an archived year back into the live database. Returns rows restored."""
+    archives = {a["year"]: a for a in list_archives()}
+    if year not in archives:
+        raise ValueError(f"{year} is not archived")
+    if in_transaction():
+        raise RuntimeError("restore_year() cannot run inside a unit of work")
+    path = archives[year]["path"]
+    first, last = _months(year)
+
+    with connection() as conn:
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("ATTACH DATABASE ? AS archive_restore", (path,))
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                restored = insert_transactions_from(
+                    conn, "archive_restore.daily_transactions", ARCHIVE_COLUMNS.split(", "),
+                    or_ignore=True,
+                )
+                # The insert triggers added onto the frozen rollups; recompute the year
+                cursor = conn.cursor()
+                rebuild_monthly_summary(cursor, (first, last))
+                rebuild_category_monthly(cursor, (first, last))
+                rebuild_daily_totals(cursor, (first, last))
+                conn.execute("DELETE FROM archives WHERE year = ?", (year,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        finally:
+            conn.execute("DETACH DATABASE archive_restore")
+
+    os.remove(path)
+    logger.info("Restored %d transactions for %d from %s", restored, year, path)
+    return restored
+
+
+def merge_archived_aggregates(cursor):
+    """
+    Add each archive's frozen rollups back after a full rebuild, which only
+    sees live rows. Archives must be attached on the cursor's connection.
+    """
+    for a in list_archives():
+        schema = f"archive_{a['year']}"
+        cursor.execute(f"""
+            INSERT INTO monthly_summary (month, total_income, total_expenses, total_savings,
+                                         total_debits, debit_count, txn_count)
+            SELECT month, total_income, total_expenses, total_savings,
+                   total_debits, debit_count, txn_count
+            FROM {schema}.monthly_summary WHERE true
+            ON CONFLICT(month) DO UPDATE SET
+                total_income = total_income + excluded.total_income,
+                total_expenses = total_expenses + excluded.total_expenses,
+                total_savings = total_savings + excluded.total_savings,
+                total_debits = total_debits + excluded.total_debits,
+                debit_count = debit_count + excluded.debit_count,
+                txn_count = txn_count + excluded.txn_count
+        """)
+        cursor.execute(f"""
+            INSERT INTO category_monthly (year_month, category, transaction_type, is_saving,
+                                          total, txn_count, min_amount, max_amount)
+            SELECT year_month, category, transaction_type, is_saving,
+                   total, txn_count, min_amount, max_amount
+            FROM {schema}.category_monthly WHERE true
+            ON CONFLICT(year_month, category, transaction_type, is_saving) DO UPDATE SET
+                total = total + excluded.total,
+                txn_count = txn_count + excluded.txn_count,
+                min_amount = MIN(min_amount, excluded.min_amount),
+                max_amount = MAX(max_amount, excluded.max_amount)
+        """)
+        merge_daily_totals(cursor, f"{schema}.daily_transactions")
+
+
+@contextmanager
+def attached_for_write(conn):
+    """Attach every archive to a write connection (outside any transaction)."""
+    schemas = []
+    try:
+        for a in list_archives():
+            schema = f"archive_{a['year']}"
+            conn.execute("ATTACH DATABASE ? AS " + schema, (a["path"],))
+            schemas.append(schema)
+        yield schemas
+    finally:
+        for schema in schemas:
+            conn.execute(f"DETACH DATABASE {schema}")
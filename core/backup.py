@@ -0,0 +1,178 @@
+"""
+Online database backups.
+
+Backups use SQLite's backup API, copying a bounded number of pages per step
+and sleeping between steps, so writers are only ever blocked for one step and
+pages still in the WAL are included. Finished backups are kept in
+``backup.directory`` and pruned to the newest ``backup.keep`` files; an
+optional scheduler thread takes one every ``backup.interval_hours`` of the
+default profile and of every profile used since the previous round.
+
+Archived years live in their own files (core/archive.py), so each archive
+registered in the backed-up database is copied the same way into a
+``<backup>_archives/`` directory next to it. To restore, put the backup at
+``database.path`` and those files back in ``archive.directory``.
+"""
+import os
+import re
+import shutil
+import sqlite3
+import threading
+from datetime import datetime
+from typing import List, Optional
+
+from core.config import get_config
+from core.database import read_connection
+from core.logger import setup_logger
+from core.profiles import recent_profiles, scoped_path, use_profile
+
+logger = setup_logger("pfa.backup")
+
+BACKUP_NAME = re.compile(r"^backup_\d{8}_\d{6}(_\d+)?\.db$")
+
+_scheduler = None
+_stop = threading.Event()
+
+
+def _backup_config():
+    return get_config().get("backup", {})
+
+
+def backup_dir() -> str:
+    return scoped_path(_backup_config().get("directory", "backups"))
+
+
+def _new_backup_path(directory):
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(directory, f"backup_{stamp}.db")
+    n = 1
+    while os.path.exists(path):
+        path = os.path.join(directory, f"backup_{stamp}_{n}.db")
+        n += 1
+    return path
+
+
+def archives_dir_for(backup_path: str) -> str:
+    """Directory holding the archive files copied with a backup."""
+    return f"{os.path.splitext(backup_path)[0]}_archives"
+
+
+def _copy(source, dest_path):
+    cfg = _backup_config()
+    tmp_path = f"{dest_path}.partial"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    dest = sqlite3.connect(tmp_path)
+    try:
+        source.backup(
+            dest,
+            pages=cfg.get("pages_per_step", 256),
+            sleep=cfg.get("step_sleep_ms", 5) / 1000,
+        )
+    except Exception:
+        dest.close()
+        os.remove(tmp_path)
+        raise
+    dest.close()
+    os.replace(tmp_path, dest_path)
+
+
+def _copy_archives(dest_path):
+    # The archives the copied database refers to, not whatever is registered now
+    conn = sqlite3.connect(dest_path)
+    try:
+        archives = conn.execute("SELECT year, path FROM archives ORDER BY year").fetchall()
+    finally:
+        conn.close()
+    if not archives:
+        return
+    directory = archives_dir_for(dest_path)
+    os.makedirs(directory, exist_ok=True)
+    for year, path in archives:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Archive for {year} missing at {path}")
+        source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            _copy(source, os.path.join(directory, os.path.basename(path)))
+        finally:
+            source.close()
+    logger.info("Copied %d archive files to %s", len(archives), directory)
+
+
+def backup_database(dest_path: Optional[str] = None) -> str:
+    """
+    Copy the live database to dest_path (default: a new file in
+    backup_dir()), and its archive files alongside.
+    """
+    if dest_path is None:
+        os.makedirs(backup_dir(), exist_ok=True)
+        dest_path = _new_backup_path(backup_dir())
+
+    with read_connection() as source:
+        _copy(source, dest_path)
+    try:
+        _copy_archives(dest_path)
+    except Exception:
+        # A backup without its archived years would silently lose them
+        os.remove(dest_path)
+        shutil.rmtree(archives_dir_for(dest_path), ignore_errors=True)
+        raise
+    logger.info("Database backed up to %s (%d bytes)", dest_path, os.path.getsize(dest_path))
+    return dest_path
+
+
+def list_backups() -> List[str]:
+    """Backup file names in backup_dir(), newest first."""
+    directory = backup_dir()
+    if not os.path.isdir(directory):
+        return []
+    names = [n for n in os.listdir(directory) if BACKUP_NAME.match(n)]
+    return sorted(names, key=lambda n: os.path.getmtime(os.path.join(directory, n)), reverse=True)
+
+
+def prune_backups(keep: Optional[int] = None) -> int:
+    """Delete all but the newest `keep` backups. Returns the number removed."""
+    if keep is None:
+        keep = _backup_config().get("keep", 7)
+    removed = 0
+    for name in list_backups()[keep:]:
+        path = os.path.join(backup_dir(), name)
+        os.remove(path)
+        shutil.rmtree(archives_dir_for(path), ignore_errors=True)
+        removed += 1
+    if removed:
+        logger.info("Pruned %d old backups", removed)
+    return removed
+
+
+def _scheduler_loop(interval):
+    while not _stop.wait(interval):
+        for profile in recent_profiles(interval):
+            try:
+                with use_profile(profile):
+                    backup_database()
+                    prune_backups()
+            except Exception:
+                logger.exception("Scheduled backup of profile %s failed", profile)
+
+
+def start_backup_scheduler():
+    """Take rolling backups every backup.interval_hours (0 disables)."""
+    global _scheduler
+    hours = _backup_config().get("interval_hours", 0)
+    if not hours or (_scheduler is not None and _scheduler.is_alive()):
+        return
+    _stop.clear()
+    _scheduler = threading.Thread(
+        target=_scheduler_loop, args=(hours * 3600,), name="pfa-backup", daemon=True,
+    )
+    _scheduler.start()
+    logger.info("Scheduled backups every %g h, keeping %d", hours, _backup_config().get("keep", 7))
+
+
+def stop_backup_scheduler():
+    global _scheduler
+    _stop.set()
+    if _scheduler is not None:
+        _scheduler.join(timeout=5)
+        _scheduler = None
@@ -0,0 +1,125 @@
+"""
+Result cache for service functions that are pure functions of database state.
+
+Entries are keyed on the function, its arguments, the database instance and
+the data version of every table the function reads, so any committed write to
+those tables makes old entries unreachable. One LRU store is shared by all
+threads in the process and can optionally be persisted across restarts.
+"""
+import copy
+import functools
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from core.config import get_config
+from core.database import get_data_versions, get_database_id
+from core.logger import setup_logger
+
+logger = setup_logger("pfa.cache")
+
+_lock = threading.Lock()
+_entries: "OrderedDict[tuple, object]" = OrderedDict()
+_stats = {}
+
+
+def _cache_config():
+    return get_config().get("cache", {})
+
+
+def _max_entries():
+    return _cache_config().get("max_entries", 256)
+
+
+def cached(*tables):
+    """Cache a function's result until one of the given logical tables changes."""
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+        _stats.setdefault(name, {"hits": 0, "misses": 0})
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _cache_config().get("enabled", True):
+                return func(*args, **kwargs)
+
+            versions = get_data_versions()
+            key = (
+                name,
+                get_database_id(),
+                tuple(versions.get(t, 0) for t in tables),
+                args,
+                tuple(sorted(kwargs.items())),
+            )
+            with _lock:
+                if key in _entries:
+                    _entries.move_to_end(key)
+                    _stats[name]["hits"] += 1
+                    return copy.deepcopy(_entries[key])
+                _stats[name]["misses"] += 1
+
+            result = func(*args, **kwargs)
+
+            with _lock:
+                _entries[key] = copy.deepcopy(result)
+                _entries.move_to_end(key)
+                while len(_entries) > _max_entries():
+                    _entries.popitem(last=False)
+            return result
+
+        wrapper.cache_tables = tables
+        return wrapper
+    return decorator
+
+
+def get_cache_stats():
+    """Per-function hits, misses and hit rate, plus the current entry count."""
+    with _lock:
+        functions = {}
+        for name, s in _stats.items():
+            calls = s["hits"] + s["misses"]
+            functions[name] = {
+                "hits": s["hits"],
+                "misses": s["misses"],
+                "hit_rate": round(s["hits"] / calls, 3) if calls else 0.0,
+            }
+        return {"entries": len(_entries), "max_entries": _max_entries(), "functions": functions}
+
+
+def clear_cache():
+    with _lock:
+        _entries.clear()
+        for s in _stats.values():
+            s["hits"] = s["misses"] = 0
+
+
+def save_cache():
+    """Write the cache to cache.persist_path, if configured."""
+    path = _cache_config().get("persist_path")
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _lock:
+        snapshot = list(_entries.items())
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    logger.info("Saved %d cache entries to %s", len(snapshot), path)
+
+
+def load_cache():
+    """Restore entries saved by save_cache(). Stale entries simply never match."""
+    path = _cache_config().get("persist_path")
+    if not path or not os.path.exists(path):
+        return
+    try:
+        with open(path, "rb") as f:
+            snapshot = pickle.load(f)
+    except Exception as e:
+        logger.warning("Ignoring unreadable cache file %s: %s", path, e)
+        return
+    with _lock:
+        for key, value in snapshot[-_max_entries():]:
+            _entries[key] = value
+    logger.info("Loaded %d cache entries from %s", len(snapshot), path)
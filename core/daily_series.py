@@ -0,0 +1,264 @@
+"""
+Prefix sums of daily totals for constant-time date-range queries.
+
+Budget windows, festival windows and "last N days" figures each need the
+total of some transactions between two dates. Instead of scanning for every
+window, the series keeps the per-day totals of each (category, type,
+is_saving) key as a numpy array over a contiguous day axis, together with
+its running sum, so a range total is cum[end + 1] - cum[start] and a whole
+batch of windows is one vectorized subtraction.
+
+The series is loaded from the daily_totals rollup (which also covers
+archived years), kept per database, and before each use catches up on just
+the rows whose seq moved since it last looked. Inside a unit of work it
+does not catch up (it would absorb rows that may yet roll back) and answers
+from the committed state it last saw. It can be saved to
+``daily_series.persist_path`` between runs.
+"""
+import os
+import pickle
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.config import get_config
+from core.database import get_database_id, in_transaction, read_connection
+from core.logger import setup_logger
+from core.profiles import active_profile, on_profile_evicted, scoped_path
+
+logger = setup_logger("pfa.daily_series")
+
+# Days of room added when the axis has to grow, so a daily import does not
+# reallocate the arrays every time
+_GROWTH_DAYS = 92
+# Float residue left on a day whose transactions were all removed
+_EPSILON = 1e-6
+
+_lock = threading.Lock()
+# database id -> {"database_id", "profile", "series"}, and the file each is saved to
+_states: Dict[str, dict] = {}
+_paths: Dict[str, str] = {}
+
+
+def _series_config():
+    return get_config().get("daily_series", {})
+
+
+def _days(dates: Iterable) -> np.ndarray:
+    """ISO dates (or date / datetime objects) as days since 1970-01-01."""
+    return np.array([str(d)[:10] for d in dates], dtype="datetime64[D]").astype(np.int64)
+
+
+class DailySeries:
+    """Per-day totals and their prefix sums for every (category, type, is_saving) key."""
+
+    def __init__(self):
+        self.seq = 0  # highest daily_totals.seq applied
+        self.first_day = 0  # day number of column 0
+        self.keys: List[Tuple[str, str, int]] = []
+        self.daily = np.zeros((0, 0))
+        self.cum = np.zeros((0, 1))  # cum[:, i] = sum of daily[:, :i]
+        self._rows: Dict[Tuple[str, str, int], int] = {}
+        self._combined: Dict[tuple, np.ndarray] = {}
+
+    @property
+    def num_days(self) -> int:
+        return self.daily.shape[1]
+
+    def _key_row(self, key) -> int:
+        row = self._rows.get(key)
+        if row is None:
+            row = self._rows[key] = len(self.keys)
+            self.keys.append(key)
+        return row
+
+    def _fit(self, first, last):
+        """Grow the arrays to hold every key and the days first..last."""
+        if not self.num_days:
+            self.first_day, last = first, max(last, first)
+        pad_before = max(self.first_day - first, 0)
+        pad_after = max(last - (self.first_day + self.num_days - 1), 0)
+        if pad_after:
+            pad_after += _GROWTH_DAYS
+        pad_keys = len(self.keys) - self.daily.shape[0]
+        if not (pad_before or pad_after or pad_keys):
+            return
+        self.daily = np.pad(self.daily, ((0, pad_keys), (pad_before, pad_after)))
+        # Nothing is spent before the old first day; after the old last day the sum carries
+        cum = np.pad(self.cum, ((0, pad_keys), (pad_before, 0)))
+        self.cum = np.pad(cum, ((0, 0), (0, pad_after)), mode="edge")
+        self.first_day -= pad_before
+
+    def apply(self, rows: Sequence):
+        """Set the (date, category, transaction_type, is_saving, total) cells and refresh the sums."""
+        if not rows:
+            return
+        days = _days(r[0] for r in rows)
+        key_rows = np.array([self._key_row((r[1], r[2], int(r[3]))) for r in rows])
+        self._fit(int(days.min()), int(days.max()))
+        cols = days - self.first_day
+        self.daily[key_rows, cols] = [r[4] for r in rows]
+        # Only the suffix from the earliest changed day moves
+        start = int(cols.min())
+        self.cum[:, start + 1:] = self.cum[:, start:start + 1] + np.cumsum(self.daily[:, start:], axis=1)
+        self._combined.clear()
+
+    def _select(self, category, transaction_type, is_saving) -> np.ndarray:
+        """Prefix sums of the matching keys added together (cached until the next apply)."""
+        spec = (category, transaction_type, is_saving)
+        combined = self._combined.get(spec)
+        if combined is None:
+            rows = [
+                i for i, (cat, txn_type, saving) in enumerate(self.keys)
+                if (category is None or cat == category)
+                and (transaction_type is None or txn_type == transaction_type)
+                and (is_saving is None or saving == int(is_saving))
+            ]
+            combined = self.cum[rows].sum(axis=0) if rows else np.zeros(self.num_days + 1)
+            self._combined[spec] = combined
+        return combined
+
+    def range_totals(self, starts, ends, category=None, transaction_type="Debit", is_saving=None) -> np.ndarray:
+        """Totals over the inclusive day ranges starts[i]..ends[i] (day numbers); empty ranges are 0."""
+        cum = self._select(category, transaction_type, is_saving)
+        lo = np.clip(np.asarray(starts) - self.first_day, 0, self.num_days)
+        hi = np.clip(np.asarray(ends) - self.first_day + 1, lo, self.num_days)
+        return cum[hi] - cum[lo]
+
+    def daily_values(self, start, end, category=None, transaction_type="Debit", is_saving=None) -> np.ndarray:
+        """Per-day totals for the days start..end inclusive (day numbers)."""
+        cum = self._select(category, transaction_type, is_saving)
+        cols = np.clip(np.arange(start, end + 2) - self.first_day, 0, self.num_days)
+        return np.diff(cum[cols])
+
+
+def _persist_path() -> str:
+    path = _series_config().get("persist_path")
+    return scoped_path(path) if path else ""
+
+
+def _load(path, database_id) -> Optional[dict]:
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+    except Exception as e:
+        logger.warning("Ignoring unreadable daily series %s: %s", path, e)
+        return None
+    if state.get("database_id") != database_id:
+        return None
+    logger.info("Loaded daily series from %s (changes up to seq %d)", path, state["series"].seq)
+    return state
+
+
+def _catch_up(state):
+    series = state["series"]
+    with read_connection() as conn:
+        top = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM daily_totals").fetchone()[0]
+        if top < series.seq:
+            # The file went back in time under the same id, e.g. a restored backup
+            logger.info("daily_totals is behind the series (seq %d < %d); reloading", top, series.seq)
+            series = state["series"] = DailySeries()
+        if top == series.seq:
+            return
+        rows = conn.execute(
+            "SELECT date, category, transaction_type, is_saving, total, seq FROM daily_totals WHERE seq > ?",
+            (series.seq,),
+        ).fetchall()
+    if rows:
+        series.apply(rows)
+        series.seq = max(r[5] for r in rows)
+
+
+def _series() -> DailySeries:
+    # Callers hold _lock
+    database_id = get_database_id()
+    state = _states.get(database_id)
+    if state is None:
+        path = _persist_path()
+        state = _load(path, database_id) or {"database_id": database_id, "series": DailySeries()}
+        state["profile"] = active_profile()
+        _states[database_id] = state
+        _paths[database_id] = path
+    if not in_transaction():
+        _catch_up(state)
+    return state["series"]
+
+
+def range_total(start, end, category=None, transaction_type="Debit", is_saving=None) -> float:
+    """Total of the matching transactions dated start..end inclusive (ISO dates or date objects)."""
+    return float(range_totals([(start, end)], category, transaction_type, is_saving)[0])
+
+
+def range_totals(ranges, category=None, transaction_type="Debit", is_saving=None) -> np.ndarray:
+    """
+    Totals for many inclusive (start, end) date ranges at once. None for
+    category, transaction_type or is_saving matches every value.
+    """
+    ranges = list(ranges)
+    if not ranges:
+        return np.zeros(0)
+    starts = _days(r[0] for r in ranges)
+    ends = _days(r[1] for r in ranges)
+    with _lock:
+        return _series().range_totals(starts, ends, category, transaction_type, is_saving)
+
+
+def daily_totals(start, end, category=None, transaction_type="Debit", is_saving=None) -> Tuple[List[str], np.ndarray]:
+    """ISO dates start..end inclusive and the matching total of each day."""
+    first, last = _days([start, end])
+    with _lock:
+        values = _series().daily_values(int(first), int(last), category, transaction_type, is_saving)
+    dates = np.arange(first, last + 1).astype("datetime64[D]").astype(str).tolist()
+    return dates, values
+
+
+def date_span(transaction_type="Debit") -> Optional[Tuple[str, str]]:
+    """First and last ISO date with a non-zero total of the type, or None."""
+    with _lock:
+        series = _series()
+        nonzero = np.flatnonzero(np.abs(np.diff(series._select(None, transaction_type, None))) > _EPSILON)
+        if not len(nonzero):
+            return None
+        first, last = series.first_day + nonzero[0], series.first_day + nonzero[-1]
+    return str(np.datetime64(int(first), "D")), str(np.datetime64(int(last), "D"))
+
+
+def save_daily_series():
+    """Write each database's series to its daily_series.persist_path, if configured."""
+    with _lock:
+        snapshots = [
+            (_paths[database_id], pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+            for database_id, state in _states.items() if _paths.get(database_id)
+        ]
+    for path, data in snapshots:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        logger.info("Saved daily series to %s", path)
+
+
+def _evict(profile: str):
+    # Any saved copy stays; the series reloads from it on the profile's next use
+    with _lock:
+        for database_id in [d for d, s in _states.items() if s.get("profile") == profile]:
+            del _states[database_id]
+            _paths.pop(database_id, None)
+
+
+on_profile_evicted(_evict)
+
+
+def reset_daily_series():
+    """Discard the active profile's series and its saved copy."""
+    path = _persist_path()
+    with _lock:
+        for database_id in [d for d, p in _paths.items() if p == path]:
+            _states.pop(database_id, None)
+            del _paths[database_id]
+        if path and os.path.exists(path):
+            os.remove(path)
@@ -1,146 +1,284 @@
-import sqlite3
 import threading
-import os
+import time
+from collections import OrderedDict
 from contextlib import contextmanager
 from core.config import get_config
 from core.logger import setup_logger
+from core.pool import ConnectionPool
+from core import query_stats
+from core.migrations import SCHEMA_VERSION, DATA_VERSION_TABLES, run_migrations  # noqa: F401
+from core.aggregates import rebuild_aggregates
+from core.interning import register_functions
+from core.profiles import scoped_path
 
 logger = setup_logger("pfa.database")
 
 _local = threading.local()
+# (database path, "write" / "read") -> ConnectionPool, least recently used first
+_pools: "OrderedDict[tuple, ConnectionPool]" = OrderedDict()
+_pool_lock = threading.Lock()
 
-SCHEMA_VERSION = 2
+_database_ids = {}
 
 
 def _db_path():
     cfg = get_config()
-    return cfg.get("database", {}).get("path", "personal_finance_analyzer.db")
+    return scoped_path(cfg.get("database", {}).get("path", "personal_finance_analyzer.db"))
 
 
-def get_connection():
-    if not hasattr(_local, "connection") or _local.connection is None:
-        path = _db_path()
-        _local.connection = sqlite3.connect(path)
-        _local.connection.row_factory = sqlite3.Row
-        _local.connection.execute("PRAGMA journal_mode=WAL")
-        _local.connection.execute("PRAGMA foreign_keys=ON")
-    return _local.connection
+def _evict_pools(keep_path):
+    """
+    Unregister the pools of the least recently used databases beyond
+    profiles.max_open, skipping any with connections checked out. Caller
+    holds _pool_lock and closes the returned pools.
+    """
+    max_open = max(get_config().get("profiles", {}).get("max_open", 4), 1)
+    paths = list(OrderedDict.fromkeys(path for path, _ in _pools))
+    evicted = []
+    for path in paths[:max(len(paths) - max_open, 0)]:
+        pools = [(key, p) for key, p in _pools.items() if key[0] == path]
+        if path == keep_path or any(p.stats()["in_use"] for _, p in pools):
+            continue
+        for key, p in sorted(pools, key=lambda kp: kp[0][1]):  # "read" before "write"
+            del _pools[key]
+            evicted.append(p)
+    return evicted
+
+
+def _get_pool(read_only=False):
+    kind = "read" if read_only else "write"
+    path = _db_path()
+    evicted = []
+    with _pool_lock:
+        pool = _pools.get((path, kind))
+        if pool is None:
+            cfg = get_config().get("database", {})
+            pool = _pools[(path, kind)] = ConnectionPool(
+                path,
+                size=cfg.get("read_pool_size" if read_only else "pool_size", 8),
+                timeout=cfg.get("pool_timeout", 10),
+                pragmas=cfg.get("pragmas"),
+                read_only=read_only,
+                on_connect=register_functions,
+            )
+            evicted = _evict_pools(path)
+        _pools.move_to_end((path, kind))
+    for old in evicted:
+        old.close()
+    if evicted:
+        logger.info("Closed %d idle pools of least recently used databases", len(evicted))
+    return pool
+
+
+def _held_connection(pool):
+    """This thread's current connection, if it belongs to the live pool."""
+    conn = getattr(_local, "connection", None)
+    if conn is not None and _local.pool is not pool:
+        _local.connection = _local.pool = None
+        return None
+    return conn
 
 
 @contextmanager
-def get_db():
-    conn = get_connection()
+def connection():
+    """Check a pooled connection out for the block; nested blocks in a thread share it."""
+    pool = _get_pool()
+    conn = _held_connection(pool)
+    if conn is not None:
+        yield conn
+        return
+    conn = pool.acquire()
+    _local.connection, _local.pool = conn, pool
     try:
         yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
+    finally:
+        _local.connection = _local.pool = None
+        pool.release(conn)
 
 
-def execute_query(query, params=(), fetch=False):
-    with get_db() as conn:
+def get_connection():
+    """
+    This thread's connection. Outside a connection() block it stays checked
+    out until release_connection() or until the thread exits.
+    """
+    pool = _get_pool()
+    conn = _held_connection(pool)
+    if conn is None:
+        conn = pool.acquire()
+        _local.connection, _local.pool = conn, pool
+    return conn
+
+
+def release_connection():
+    conn = getattr(_local, "connection", None)
+    if conn is not None:
+        pool = _local.pool
+        _local.connection = _local.pool = None
+        pool.release(conn)
+
+
+def close_pool():
+    """Close all pooled connections and checkpoint the WAL (application shutdown)."""
+    with _pool_lock:
+        # Readers first, so the checkpoint can truncate the WAL
+        pools = [p for _, p in sorted(_pools.items(), key=lambda kp: (kp[0][0], kp[0][1]))]
+        _pools.clear()
+    _local.connection = _local.pool = None
+    _local.tx_depth = 0
+    for pool in pools:
+        pool.close()
+    if pools:
+        logger.info("Database connections closed")
+
+
+def get_pool_stats(read_only=False):
+    return _get_pool(read_only).stats()
+
+
+def in_transaction():
+    return getattr(_local, "tx_depth", 0) > 0
+
+
+@contextmanager
+def transaction():
+    """
+    Unit of work: every statement in the block, including execute_query()
+    calls, commits or rolls back together. The outermost block takes the
+    write lock up front (BEGIN IMMEDIATE); nested blocks become savepoints
+    that can fail without aborting the enclosing work. So does a block opened
+    while an enclosing connection() / get_db() block has uncommitted writes:
+    that block still decides when they commit.
+    """
+    with connection() as conn:
+        depth = getattr(_local, "tx_depth", 0)
+        savepoint = f"uow_{depth}"
+        owner = depth == 0 and not conn.in_transaction
+        if owner:
+            conn.execute("BEGIN IMMEDIATE")
+        else:
+            conn.execute(f"SAVEPOINT {savepoint}")
+        _local.tx_depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            _local.tx_depth = depth
+            if owner:
+                conn.rollback()
+            else:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            raise
+        _local.tx_depth = depth
+        if owner:
+            conn.commit()
+        else:
+            conn.execute(f"RELEASE {savepoint}")
+
+
+@contextmanager
+def get_db():
+    if in_transaction():
+        with transaction() as conn:
+            yield conn
+        return
+    with connection() as conn:
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def _timed(conn, query, params, fetch):
+    if not query_stats.enabled():
         cursor = conn.execute(query, params)
-        if fetch:
-            return cursor.fetchall()
-        return None
+        return cursor.fetchall() if fetch else None
+    start = time.perf_counter()
+    cursor = conn.execute(query, params)
+    result = cursor.fetchall() if fetch else None
+    elapsed = time.perf_counter() - start
+    query_stats.record(conn, query, params, elapsed, len(result) if fetch else max(cursor.rowcount, 0))
+    return result
 
 
-def initialize_database():
+def execute_query(query, params=(), fetch=False):
+    if in_transaction():
+        # Part of the enclosing unit of work; it decides when to commit.
+        return _timed(_local.connection, query, params, fetch)
     with get_db() as conn:
-        cursor = conn.cursor()
+        return _timed(conn, query, params, fetch)
 
-        # Schema version tracking
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS schema_version (
-                version INTEGER PRIMARY KEY
-            )
-        """)
-
-        # Daily transactions
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS daily_transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                description TEXT NOT NULL,
-                amount REAL NOT NULL,
-                transaction_type TEXT NOT NULL,
-                category TEXT,
-                is_saving INTEGER DEFAULT 0,
-                uploaded_at TEXT NOT NULL,
-                hash TEXT UNIQUE
-            )
-        """)
-
-        # Training data for ML
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS training_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                description TEXT NOT NULL,
-                category TEXT NOT NULL
-            )
-        """)
-
-        # Monthly budgets per category
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS budgets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                category TEXT NOT NULL,
-                monthly_limit REAL NOT NULL,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL,
-                UNIQUE(category)
-            )
-        """)
-
-        # Monthly summaries
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS monthly_summary (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                month TEXT NOT NULL UNIQUE,
-                total_income REAL NOT NULL DEFAULT 0,
-                total_expenses REAL NOT NULL DEFAULT 0,
-                total_savings REAL NOT NULL DEFAULT 0
-            )
-        """)
-
-        # Festival alerts
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS festivals (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                month INTEGER NOT NULL,
-                day INTEGER NOT NULL,
-                duration_days INTEGER DEFAULT 1,
-                is_active INTEGER DEFAULT 1
-            )
-        """)
-
-        # Savings goals
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS savings_goals (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                target_amount REAL NOT NULL,
-                current_amount REAL NOT NULL DEFAULT 0,
-                deadline TEXT,
-                created_at TEXT NOT NULL,
-                is_active INTEGER DEFAULT 1
-            )
-        """)
 
-        # Update schema version
-        cursor.execute("DELETE FROM schema_version")
-        cursor.execute("INSERT INTO schema_version (version) VALUES (?)", (SCHEMA_VERSION,))
+@contextmanager
+def read_connection():
+    """
+    A connection from the read-only pool. Inside a unit of work the writer's
+    own connection is used instead, so the block sees its uncommitted rows.
+    """
+    if in_transaction():
+        yield _local.connection
+        return
+    pool = _get_pool(read_only=True)
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
 
+def execute_read(query, params=()):
+    """Run a SELECT on the read-only pool and return all rows."""
+    with read_connection() as conn:
+        return _timed(conn, query, params, fetch=True)
+
+
+def execute_read_on(conn, query, params=()):
+    """execute_read() on a connection the caller holds, e.g. one with archives attached."""
+    return _timed(conn, query, params, fetch=True)
+
+
+def get_data_versions():
+    """Current write counter of each logical table, e.g. {"transactions": 42, ...}."""
+    rows = execute_read("SELECT name, version FROM data_versions")
+    return {r["name"]: r["version"] for r in rows}
+
+
+def get_data_version(name):
+    rows = execute_read("SELECT version FROM data_versions WHERE name = ?", (name,))
+    return rows[0]["version"] if rows else 0
+
+
+def get_database_id():
+    """Random id assigned to the database file when it was created."""
+    path = _db_path()
+    db_id = _database_ids.get(path)
+    if db_id is None:
+        rows = execute_read("SELECT value FROM db_meta WHERE key = 'instance_id'")
+        db_id = _database_ids[path] = rows[0]["value"]
+    return db_id
+
+
+def initialize_database():
+    _database_ids.pop(_db_path(), None)
+    with connection() as conn:
+        version = run_migrations(conn)
     _seed_festivals()
-    logger.info("Database initialized (schema v%d)", SCHEMA_VERSION)
+    logger.info("Database initialized (schema v%d)", version)
+
+
+def rebuild_summaries():
+    """Recompute all rollup tables from daily_transactions and the archives."""
+    from core.archive import attached_for_write, merge_archived_aggregates
+    with connection() as conn:
+        with attached_for_write(conn):
+            rebuild_aggregates(conn, extra=merge_archived_aggregates)
 
 
 def _seed_festivals():
     cfg = get_config()
     festivals = cfg.get("festivals", {}).get("default_festivals", [])
-    with get_db() as conn:
+    with transaction() as conn:
         for f in festivals:
             conn.execute(
                 """INSERT OR IGNORE INTO festivals (name, month, day, duration_days)
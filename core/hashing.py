@@ -0,0 +1,51 @@
+"""
+Transaction identity hashes.
+
+A transaction's dedup key is a 16-byte BLAKE2b digest of its date, processed
+description, amount and type, stored as a BLOB. Services hand it to callers
+(and the UI) as 32 hex characters; hash_key() turns either form back into the
+stored key.
+"""
+import hashlib
+import re
+from typing import Union
+
+from core.interning import normalize_merchant
+
+DIGEST_SIZE = 16
+
+_HEX_KEY = re.compile(r"^[0-9a-f]{%d}$" % (DIGEST_SIZE * 2))
+
+
+def _identity(date, description, amount, txn_type) -> bytes:
+    return f"{date}|{description}|{amount}|{txn_type}".encode()
+
+
+def transaction_hash(date, description, amount, txn_type) -> bytes:
+    """Dedup key of a row; description is the processed (merchant) form."""
+    return hashlib.blake2b(_identity(date, description, amount, txn_type), digest_size=DIGEST_SIZE).digest()
+
+
+def hash_key(value: Union[bytes, str]) -> Union[bytes, str]:
+    """Stored form of a hash given as bytes or hex; other strings are left as-is."""
+    if isinstance(value, str) and _HEX_KEY.match(value):
+        return bytes.fromhex(value)
+    return value
+
+
+def hash_hex(value: Union[bytes, str, None]) -> Union[str, None]:
+    return value.hex() if isinstance(value, bytes) else value
+
+
+def upgrade_hash(old, date, description, amount, txn_type):
+    """
+    Binary key for a row stored with a v12-era hex SHA-256 key. Rows whose key
+    is not the SHA-256 of their own fields (inserted by hand) keep a digest of
+    the old key, so they stay distinct but were never re-importable anyway.
+    """
+    if isinstance(old, bytes) or old is None:
+        return old
+    processed = normalize_merchant(description)
+    if hashlib.sha256(_identity(date, processed, amount, txn_type)).hexdigest() == old:
+        return transaction_hash(date, processed, amount, txn_type)
+    return hashlib.blake2b(old.encode(), digest_size=DIGEST_SIZE).digest()
@@ -0,0 +1,91 @@
+"""
+Interned description and merchant dictionaries.
+
+Raw narrations are stored once in ``descriptions`` and normalized merchant
+names once in ``merchants``; transaction_rows and training_rows reference
+them by integer id. The ``daily_transactions`` and ``training_data`` views
+join the text back in, so readers see the same columns as before, and their
+INSTEAD OF triggers intern on write. Hot paths write the physical tables
+directly through the helpers below.
+"""
+import re
+from typing import Dict, Iterable, List, Sequence
+
+# View -> physical table holding its rows
+PHYSICAL_TABLES = {"daily_transactions": "transaction_rows", "training_data": "training_rows"}
+
+
+def normalize_merchant(desc: str) -> str:
+    """Upper-cased narration without reference-number suffixes, e.g. 'ZOMATO ORDER'."""
+    desc = (desc or "").upper()
+    desc = re.sub(r"-\d{6,}", "", desc)
+    return " ".join(desc.split())
+
+
+def register_functions(conn):
+    """SQL functions the interning triggers and migrations rely on."""
+    conn.create_function("normalize_merchant", 1, normalize_merchant, deterministic=True)
+
+
+def intern_merchant(conn, name: str) -> int:
+    conn.execute("INSERT OR IGNORE INTO merchants (name) VALUES (?)", (name,))
+    return conn.execute("SELECT id FROM merchants WHERE name = ?", (name,)).fetchone()[0]
+
+
+def intern_description(conn, text: str) -> int:
+    merchant_id = intern_merchant(conn, normalize_merchant(text))
+    conn.execute(
+        "INSERT OR IGNORE INTO descriptions (text, merchant_id) VALUES (?, ?)", (text, merchant_id)
+    )
+    return conn.execute("SELECT id FROM descriptions WHERE text = ?", (text,)).fetchone()[0]
+
+
+def intern_descriptions(conn, texts: Iterable[str]) -> Dict[str, int]:
+    """Description ids for many narrations, interning the new ones."""
+    return {text: intern_description(conn, text) for text in set(texts)}
+
+
+def intern_from(conn, source: str):
+    """Intern every description in a table or view with a text description column."""
+    conn.execute(f"""
+        INSERT OR IGNORE INTO merchants (name)
+        SELECT DISTINCT normalize_merchant(description) FROM {source}
+    """)
+    conn.execute(f"""
+        INSERT OR IGNORE INTO descriptions (text, merchant_id)
+        SELECT s.description, m.id
+        FROM (SELECT DISTINCT description FROM {source}) s
+        JOIN merchants m ON m.name = normalize_merchant(s.description)
+    """)
+
+
+def insert_transactions_from(conn, source: str, columns: Sequence[str], or_ignore=False) -> int:
+    """
+    Copy rows from a source shaped like daily_transactions (text description)
+    into transaction_rows. Returns the number of rows inserted.
+    """
+    intern_from(conn, source)
+    targets: List[str] = []
+    values: List[str] = []
+    for name in columns:
+        if name == "description":
+            targets.append("description_id")
+            values.append("d.id")
+        else:
+            targets.append(name)
+            values.append(f"s.{name}")
+    return conn.execute(f"""
+        INSERT {'OR IGNORE ' if or_ignore else ''}INTO transaction_rows ({', '.join(targets)})
+        SELECT {', '.join(values)}
+        FROM {source} s JOIN descriptions d ON d.text = s.description
+    """).rowcount
+
+
+def insert_training_from(conn, source: str) -> int:
+    """Copy (id, description, category) rows from a source into training_rows."""
+    conn.execute(f"INSERT OR IGNORE INTO merchants (name) SELECT DISTINCT description FROM {source}")
+    return conn.execute(f"""
+        INSERT INTO training_rows (id, merchant_id, category)
+        SELECT s.id, m.id, s.category
+        FROM {source} s JOIN merchants m ON m.name = s.description
+    """).rowcount
@@ -0,0 +1,232 @@
+"""
+Scheduled database maintenance.
+
+run_maintenance() performs the housekeeping SQLite never does on its own:
+
+- ``analyze``: a full ANALYZE (bounded by ``maintenance.analysis_limit``
+  rows per index) so the planner has statistics for every index;
+- ``optimize``: PRAGMA optimize, which re-analyzes only what has drifted;
+- ``vacuum``: PRAGMA incremental_vacuum to hand free pages back to the file
+  system. A database created before incremental auto-vacuum is switched to
+  it with one full VACUUM once enough of it is free;
+- ``checkpoint``: a TRUNCATE checkpoint once the WAL grows past
+  ``maintenance.wal_checkpoint_mb``.
+
+Each task runs when its interval has passed and every run is recorded in
+maintenance_log with its timing. The scheduler thread only starts a pass in
+an idle window, when no write has landed since its previous check, and
+never while an ingestion job (CSV import, snapshot import) is active; a
+pass also stops between tasks if one starts, and a job that starts while a
+task is running waits for that task to finish, so the two never overlap.
+Each check covers the default profile and any profile used within the last
+day.
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from core.config import get_config
+from core.database import connection, execute_query, execute_read, get_data_versions
+from core.logger import setup_logger
+from core.profiles import recent_profiles, use_profile
+
+logger = setup_logger("pfa.maintenance")
+
+TASKS = ("analyze", "optimize", "vacuum", "checkpoint")
+
+_lock = threading.Lock()
+# Signalled when a maintenance task finishes
+_task_done = threading.Condition(_lock)
+_active_jobs = 0
+_running = False
+_task_running = False
+_scheduler = None
+_stop = threading.Event()
+
+
+def _maintenance_config():
+    return get_config().get("maintenance", {})
+
+
+@contextmanager
+def ingestion_job():
+    """
+    Mark an ingestion as active for the block (also usable as a decorator),
+    first waiting for a running maintenance task to finish.
+    """
+    global _active_jobs
+    with _lock:
+        while _task_running:
+            _task_done.wait()
+        _active_jobs += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _active_jobs -= 1
+
+
+def ingestion_active() -> bool:
+    with _lock:
+        return _active_jobs > 0
+
+
+def _analyze(conn) -> str:
+    limit = int(_maintenance_config().get("analysis_limit", 1000))
+    conn.execute(f"PRAGMA analysis_limit = {limit}")
+    conn.execute("ANALYZE")
+    return f"analysis_limit={limit}"
+
+
+def _optimize(conn) -> str:
+    conn.execute("PRAGMA optimize")
+    return ""
+
+
+def _vacuum(conn) -> str:
+    cfg = _maintenance_config()
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    total = conn.execute("PRAGMA page_count").fetchone()[0]
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        if not total or free / total < cfg.get("vacuum_convert_free_ratio", 0.2):
+            return f"{free} of {total} pages free; auto_vacuum off"
+        # The auto_vacuum mode of an existing file only changes on a full VACUUM
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return f"converted to incremental auto_vacuum, {free} pages freed"
+    pages = int(cfg.get("vacuum_pages", 1000))
+    # Each step of this pragma frees one page; executescript() runs it to completion
+    conn.executescript(f"PRAGMA incremental_vacuum({pages})")
+    freed = free - conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return f"{freed} of {free} free pages released"
+
+
+def _checkpoint(conn) -> str:
+    wal_path = conn.execute("PRAGMA database_list").fetchone()[2] + "-wal"
+    size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+    threshold = _maintenance_config().get("wal_checkpoint_mb", 16) * 1024 * 1024
+    if size < threshold:
+        return f"WAL {size // 1024} KiB, below threshold"
+    busy = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0]
+    after = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+    return f"WAL {size // 1024} -> {after // 1024} KiB" + (" (readers busy)" if busy else "")
+
+
+_RUNNERS = {"analyze": _analyze, "optimize": _optimize, "vacuum": _vacuum, "checkpoint": _checkpoint}
+
+
+def _due(task) -> bool:
+    if task == "checkpoint":
+        return True  # size-triggered; cheap to check every pass
+    hours = _maintenance_config().get(f"{task}_hours", {"analyze": 168}.get(task, 24))
+    rows = execute_read(
+        "SELECT MAX(started_at) AS last FROM maintenance_log WHERE task = ? AND status = 'ok'", (task,)
+    )
+    last = rows[0]["last"]
+    return last is None or datetime.fromisoformat(last) <= datetime.now() - timedelta(hours=hours)
+
+
+def _run_task(task) -> Dict:
+    started = datetime.now()
+    start = time.perf_counter()
+    status, detail = "ok", ""
+    try:
+        with connection() as conn:
+            if conn.in_transaction:
+                conn.commit()
+            detail = _RUNNERS[task](conn)
+    except sqlite3.Error as e:
+        status, detail = "error", str(e)
+        logger.warning("Maintenance task %s failed: %s", task, e)
+    duration_ms = (time.perf_counter() - start) * 1000
+    execute_query(
+        "INSERT INTO maintenance_log (task, started_at, duration_ms, status, detail) VALUES (?, ?, ?, ?, ?)",
+        (task, started.isoformat(), round(duration_ms, 2), status, detail),
+    )
+    logger.info("Maintenance %s: %s in %.0f ms (%s)", task, status, duration_ms, detail)
+    return {"task": task, "status": status, "duration_ms": duration_ms, "detail": detail}
+
+
+def run_maintenance(tasks=None, force=False) -> List[Dict]:
+    """
+    Run the given (default: all) maintenance tasks that are due, or all of
+    them with force=True. Returns one result per task run; empty if an
+    ingestion job is active or another pass is already running.
+    """
+    global _running, _task_running
+    with _lock:
+        if _active_jobs or _running:
+            return []
+        _running = True
+    try:
+        results = []
+        for task in tasks or TASKS:
+            if not (force or _due(task)):
+                continue
+            with _lock:
+                # Checked and claimed together, so no ingestion can slip in between
+                if _active_jobs:
+                    logger.info("Maintenance paused: ingestion started")
+                    break
+                _task_running = True
+            try:
+                results.append(_run_task(task))
+            finally:
+                with _lock:
+                    _task_running = False
+                    _task_done.notify_all()
+        return results
+    finally:
+        with _lock:
+            _running = False
+
+
+def get_maintenance_log(limit: int = 20) -> List[Dict]:
+    """Newest maintenance runs first."""
+    rows = execute_read(
+        "SELECT task, started_at, duration_ms, status, detail FROM maintenance_log ORDER BY id DESC LIMIT ?",
+        (limit,),
+    )
+    return [dict(r) for r in rows]
+
+
+def _scheduler_loop(interval):
+    versions: Dict[str, Dict] = {}
+    while not _stop.wait(interval):
+        for profile in recent_profiles(24 * 3600):
+            try:
+                with use_profile(profile):
+                    # Idle window: nothing written since the previous check
+                    current = get_data_versions()
+                    idle = current == versions.get(profile)
+                    versions[profile] = current
+                    if idle and not ingestion_active():
+                        run_maintenance()
+            except Exception:
+                logger.exception("Scheduled maintenance of profile %s failed", profile)
+
+
+def start_maintenance_scheduler():
+    """Check for an idle window every maintenance.check_minutes (0 disables)."""
+    global _scheduler
+    minutes = _maintenance_config().get("check_minutes", 0)
+    if not minutes or (_scheduler is not None and _scheduler.is_alive()):
+        return
+    _stop.clear()
+    _scheduler = threading.Thread(
+        target=_scheduler_loop, args=(minutes * 60,), name="pfa-maintenance", daemon=True,
+    )
+    _scheduler.start()
+    logger.info("Maintenance checks every %g min", minutes)
+
+
+def stop_maintenance_scheduler():
+    global _scheduler
+    _stop.set()
+    if _scheduler is not None:
+        _scheduler.join(timeout=5)
+        _scheduler = None
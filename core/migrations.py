@@ -0,0 +1,613 @@
+"""
+Ordered schema migrations.
+
+Each migration is (version, description, function(cursor)). Versions are
+applied in order inside their own transaction, and every step is written so
+that re-running it against an already-migrated database is a no-op.
+"""
+import os
+import sqlite3
+
+from core.aggregates import (
+    changed,
+    create_cube_triggers,
+    create_daily_triggers,
+    create_summary_triggers,
+    daily_totals_select,
+    rebuild_category_monthly,
+    rebuild_daily_totals,
+    rebuild_monthly_summary,
+)
+from core.hashing import upgrade_hash
+from core.interning import register_functions
+from core.logger import setup_logger
+
+logger = setup_logger("pfa.migrations")
+
+
+def _add_missing_columns(cursor, table, columns):
+    """Add columns introduced after a table was first created."""
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    for name, ddl in columns:
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+            logger.info("Added column %s.%s", table, name)
+
+
+def _initial_schema(cursor):
+    # Daily transactions
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            description TEXT NOT NULL,
+            amount REAL NOT NULL,
+            transaction_type TEXT NOT NULL,
+            category TEXT,
+            is_saving INTEGER DEFAULT 0,
+            uploaded_at TEXT NOT NULL,
+            hash TEXT UNIQUE
+        )
+    """)
+
+    # Training data for ML
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS training_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            description TEXT NOT NULL,
+            category TEXT NOT NULL
+        )
+    """)
+
+    # Monthly budgets per category
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS budgets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,
+            monthly_limit REAL NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            UNIQUE(category)
+        )
+    """)
+
+    # Monthly summaries
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_summary (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            month TEXT NOT NULL UNIQUE,
+            total_income REAL NOT NULL DEFAULT 0,
+            total_expenses REAL NOT NULL DEFAULT 0,
+            total_savings REAL NOT NULL DEFAULT 0
+        )
+    """)
+
+    # Festival alerts
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS festivals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            month INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            duration_days INTEGER DEFAULT 1,
+            is_active INTEGER DEFAULT 1
+        )
+    """)
+
+    # Savings goals
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS savings_goals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            target_amount REAL NOT NULL,
+            current_amount REAL NOT NULL DEFAULT 0,
+            deadline TEXT,
+            created_at TEXT NOT NULL,
+            is_active INTEGER DEFAULT 1
+        )
+    """)
+
+
+def _prediction_tracking(cursor):
+    _add_missing_columns(cursor, "daily_transactions", [
+        ("pending_ml", "INTEGER DEFAULT 0"),
+        ("predicted_category", "TEXT"),
+        ("predicted_is_saving", "INTEGER"),
+        ("predicted_confidence", "REAL"),
+        ("prediction_source", "TEXT"),
+        ("prediction_reviewed", "INTEGER DEFAULT 0"),
+    ])
+
+    # Rolling accuracy of each classifier head, fed by user corrections
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS model_accuracy (
+            head TEXT NOT NULL,
+            label TEXT NOT NULL,
+            confirmed INTEGER NOT NULL DEFAULT 0,
+            corrected INTEGER NOT NULL DEFAULT 0,
+            rolling_accuracy REAL NOT NULL DEFAULT 1.0,
+            corrected_since_train INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (head, label)
+        )
+    """)
+
+
+def _transaction_indexes(cursor):
+    # Type-first: monthly/seasonal/festival aggregates, daily spending, summary
+    # totals and category breakdowns are all answered from this index alone.
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_txn_type_date
+        ON daily_transactions (transaction_type, date, category, is_saving, amount)
+    """)
+    # Category-first: budget vs actual, what-if, discretionary totals, uncategorized list
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_txn_category_type_date
+        ON daily_transactions (category, transaction_type, date, amount)
+    """)
+    # Newest-first listing
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_txn_date ON daily_transactions (date)")
+    # Rows waiting for the ML models; normally empty
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_txn_pending_ml
+        ON daily_transactions (id) WHERE pending_ml = 1
+    """)
+
+
+def _month_columns(cursor):
+    # Virtual generated columns: no extra storage, but indexable, so month
+    # filters and GROUP BYs become index range scans instead of per-row substr().
+    _add_missing_columns(cursor, "daily_transactions", [
+        ("year_month", "TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL"),
+        ("cal_month", "INTEGER GENERATED ALWAYS AS (CAST(substr(date, 6, 2) AS INTEGER)) VIRTUAL"),
+    ])
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_txn_type_month
+        ON daily_transactions (transaction_type, year_month, category, is_saving, amount)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_txn_type_cal_month
+        ON daily_transactions (transaction_type, cal_month, amount)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_txn_month
+        ON daily_transactions (year_month, transaction_type, is_saving, amount)
+    """)
+    cursor.execute("DROP INDEX IF EXISTS idx_txn_category_type_date")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_txn_category_type_month
+        ON daily_transactions (category, transaction_type, year_month, amount)
+    """)
+
+
+def _monthly_summary_rollup(cursor):
+    _add_missing_columns(cursor, "monthly_summary", [
+        ("total_debits", "REAL NOT NULL DEFAULT 0"),
+        ("debit_count", "INTEGER NOT NULL DEFAULT 0"),
+        ("txn_count", "INTEGER NOT NULL DEFAULT 0"),
+    ])
+    # The table was renamed to transaction_rows in v12
+    create_summary_triggers(cursor, table="daily_transactions")
+    rebuild_monthly_summary(cursor)
+
+
+def _category_monthly_cube(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS category_monthly (
+            year_month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            transaction_type TEXT NOT NULL,
+            is_saving INTEGER NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            txn_count INTEGER NOT NULL DEFAULT 0,
+            min_amount REAL,
+            max_amount REAL,
+            PRIMARY KEY (year_month, category, transaction_type, is_saving)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_cube_type_category
+        ON category_monthly (transaction_type, category, year_month)
+    """)
+    create_cube_triggers(cursor, table="daily_transactions")
+    rebuild_category_monthly(cursor)
+
+
+# Logical table name -> physical table whose writes bump it.
+DATA_VERSION_TABLES = {
+    "transactions": "daily_transactions",
+    "budgets": "budgets",
+    "festivals": "festivals",
+    "training_data": "training_data",
+}
+
+
+def _data_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    for name, table in DATA_VERSION_TABLES.items():
+        cursor.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES (?, 0)", (name,))
+        # Bumped inside the writing statement's own transaction, so a reader
+        # never sees new data with an old version (or the reverse).
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            trigger = f"trg_version_{table}_{event.lower()}"
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            cursor.execute(f"""
+                CREATE TRIGGER {trigger} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE data_versions SET version = version + 1 WHERE name = '{name}';
+                END
+            """)
+
+
+def _database_identity(cursor):
+    # A random id distinguishes this database file from any other that later
+    # appears at the same path, for caches that outlive the process.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS db_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(
+        "INSERT OR IGNORE INTO db_meta (key, value) VALUES ('instance_id', lower(hex(randomblob(16))))"
+    )
+
+
+def _transaction_search(cursor):
+    # External-content FTS5 index: stores only the index, reading descriptions
+    # back from daily_transactions by rowid. prefix='2 3' makes short prefix
+    # queries ("swi*") index lookups instead of term scans.
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+            description,
+            content='daily_transactions',
+            content_rowid='id',
+            tokenize='unicode61',
+            prefix='2 3'
+        )
+    """)
+    for trigger in ("trg_fts_insert", "trg_fts_delete", "trg_fts_update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("""
+        CREATE TRIGGER trg_fts_insert AFTER INSERT ON daily_transactions
+        BEGIN
+            INSERT INTO transactions_fts (rowid, description) VALUES (NEW.id, NEW.description);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_fts_delete AFTER DELETE ON daily_transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, description)
+            VALUES ('delete', OLD.id, OLD.description);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_fts_update AFTER UPDATE OF description ON daily_transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, description)
+            VALUES ('delete', OLD.id, OLD.description);
+            INSERT INTO transactions_fts (rowid, description) VALUES (NEW.id, NEW.description);
+        END
+    """)
+    cursor.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+
+
+def _archive_registry(cursor):
+    # Closed years moved out to per-year archive files (core/archive.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS archives (
+            year INTEGER PRIMARY KEY,
+            path TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            archived_at TEXT NOT NULL
+        )
+    """)
+
+
+# Stored columns of transaction_rows other than id and description_id, in
+# the order the daily_transactions view exposes them around description.
+_TXN_VIEW_COLUMNS = (
+    "date", "description", "amount", "transaction_type", "category", "is_saving", "uploaded_at",
+    "hash", "pending_ml", "predicted_category", "predicted_is_saving", "predicted_confidence",
+    "prediction_source", "prediction_reviewed",
+)
+# Row defaults the views must re-apply: an INSTEAD OF trigger sees NULL for omitted columns.
+_TXN_DEFAULTS = {"is_saving": 0, "pending_ml": 0, "prediction_reviewed": 0}
+
+
+def _txn_value(column):
+    if column == "description":
+        return "(SELECT id FROM descriptions WHERE text = NEW.description)"
+    if column in _TXN_DEFAULTS:
+        return f"COALESCE(NEW.{column}, {_TXN_DEFAULTS[column]})"
+    return f"NEW.{column}"
+
+
+def _interned_descriptions(cursor):
+    register_functions(cursor.connection)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS merchants (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS descriptions (
+            id INTEGER PRIMARY KEY,
+            text TEXT NOT NULL UNIQUE,
+            merchant_id INTEGER NOT NULL REFERENCES merchants(id)
+        )
+    """)
+    tables = {r[0]: r[1] for r in cursor.execute("SELECT name, type FROM sqlite_master")}
+
+    if tables.get("daily_transactions") == "table":
+        cursor.execute("""
+            INSERT OR IGNORE INTO merchants (name)
+            SELECT DISTINCT normalize_merchant(description) FROM daily_transactions
+        """)
+        cursor.execute("""
+            INSERT OR IGNORE INTO descriptions (text, merchant_id)
+            SELECT s.description, m.id
+            FROM (SELECT DISTINCT description FROM daily_transactions) s
+            JOIN merchants m ON m.name = normalize_merchant(s.description)
+        """)
+        # The search triggers read the text column; recreated below on the id
+        for trigger in ("trg_fts_insert", "trg_fts_delete", "trg_fts_update"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cursor.execute(
+            "ALTER TABLE daily_transactions ADD COLUMN description_id INTEGER REFERENCES descriptions(id)"
+        )
+        cursor.execute("""
+            UPDATE daily_transactions
+            SET description_id = (SELECT id FROM descriptions WHERE text = daily_transactions.description)
+        """)
+        cursor.execute("ALTER TABLE daily_transactions DROP COLUMN description")
+        # Renaming carries the indexes and rollup / version triggers along
+        cursor.execute("ALTER TABLE daily_transactions RENAME TO transaction_rows")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_txn_description ON transaction_rows (description_id)")
+
+    if tables.get("training_data") == "table":
+        cursor.execute("INSERT OR IGNORE INTO merchants (name) SELECT DISTINCT description FROM training_data")
+        cursor.execute(
+            "ALTER TABLE training_data ADD COLUMN merchant_id INTEGER REFERENCES merchants(id)"
+        )
+        cursor.execute("""
+            UPDATE training_data
+            SET merchant_id = (SELECT id FROM merchants WHERE name = training_data.description)
+        """)
+        cursor.execute("ALTER TABLE training_data DROP COLUMN description")
+        cursor.execute("ALTER TABLE training_data RENAME TO training_rows")
+
+    stored = ", ".join(f"t.{c}" if c != "description" else "d.text AS description" for c in _TXN_VIEW_COLUMNS)
+    cursor.execute(f"""
+        CREATE VIEW IF NOT EXISTS daily_transactions AS
+        SELECT t.id, {stored}, t.year_month, t.cal_month, t.description_id, d.merchant_id
+        FROM transaction_rows t JOIN descriptions d ON d.id = t.description_id
+    """)
+    cursor.execute("""
+        CREATE VIEW IF NOT EXISTS training_data AS
+        SELECT r.id, m.name AS description, r.category, r.merchant_id
+        FROM training_rows r JOIN merchants m ON m.id = r.merchant_id
+    """)
+
+    for trigger in ("trg_txn_view_insert", "trg_txn_view_update", "trg_txn_view_delete",
+                    "trg_training_view_insert", "trg_training_view_delete",
+                    "trg_fts_insert", "trg_fts_delete", "trg_fts_update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    intern = """
+            INSERT OR IGNORE INTO merchants (name) VALUES (normalize_merchant(NEW.description));
+            INSERT OR IGNORE INTO descriptions (text, merchant_id)
+            VALUES (NEW.description,
+                    (SELECT id FROM merchants WHERE name = normalize_merchant(NEW.description)));"""
+    targets = ", ".join("description_id" if c == "description" else c for c in _TXN_VIEW_COLUMNS)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_txn_view_insert INSTEAD OF INSERT ON daily_transactions
+        BEGIN {intern}
+            INSERT INTO transaction_rows (id, {targets})
+            VALUES (NEW.id, {', '.join(_txn_value(c) for c in _TXN_VIEW_COLUMNS)});
+        END
+    """)
+    assignments = ", ".join(
+        f"{'description_id' if c == 'description' else c} = {_txn_value(c)}" for c in _TXN_VIEW_COLUMNS
+    )
+    cursor.execute(f"""
+        CREATE TRIGGER trg_txn_view_update INSTEAD OF UPDATE ON daily_transactions
+        BEGIN {intern}
+            UPDATE transaction_rows SET {assignments} WHERE id = OLD.id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_txn_view_delete INSTEAD OF DELETE ON daily_transactions
+        BEGIN
+            DELETE FROM transaction_rows WHERE id = OLD.id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_training_view_insert INSTEAD OF INSERT ON training_data
+        BEGIN
+            INSERT OR IGNORE INTO merchants (name) VALUES (NEW.description);
+            INSERT INTO training_rows (id, merchant_id, category)
+            VALUES (NEW.id, (SELECT id FROM merchants WHERE name = NEW.description), NEW.category);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_training_view_delete INSTEAD OF DELETE ON training_data
+        BEGIN
+            DELETE FROM training_rows WHERE id = OLD.id;
+        END
+    """)
+
+    _create_fts_triggers(cursor)
+
+
+def _create_fts_triggers(cursor):
+    # Full-text index: still keyed on the transaction id, text read via the id
+    for trigger in ("trg_fts_insert", "trg_fts_delete", "trg_fts_update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    text_of = "(SELECT text FROM descriptions WHERE id = {}.description_id)"
+    cursor.execute(f"""
+        CREATE TRIGGER trg_fts_insert AFTER INSERT ON transaction_rows
+        BEGIN
+            INSERT INTO transactions_fts (rowid, description) VALUES (NEW.id, {text_of.format("NEW")});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_fts_delete AFTER DELETE ON transaction_rows
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, description)
+            VALUES ('delete', OLD.id, {text_of.format("OLD")});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_fts_update AFTER UPDATE OF description_id ON transaction_rows
+        WHEN {changed(["description_id"])}
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, description)
+            VALUES ('delete', OLD.id, {text_of.format("OLD")});
+            INSERT INTO transactions_fts (rowid, description) VALUES (NEW.id, {text_of.format("NEW")});
+        END
+    """)
+
+
+def _upgrade_hashes(conn, table, description):
+    conn.create_function("upgrade_hash", 5, upgrade_hash, deterministic=True)
+    conn.execute(f"""
+        UPDATE {table}
+        SET hash = upgrade_hash(hash, date, {description}, amount, transaction_type)
+        WHERE typeof(hash) = 'text'
+    """)
+
+
+def _binary_hashes(cursor):
+    # 64-char hex SHA-256 TEXT keys become 16-byte BLAKE2b BLOBs (core/hashing.py).
+    # TEXT affinity keeps BLOB values as-is, so the column needs no rebuild.
+    _upgrade_hashes(
+        cursor.connection, "transaction_rows",
+        "(SELECT text FROM descriptions WHERE id = transaction_rows.description_id)",
+    )
+    # Archive files hold their own copies of the keys for import dedup
+    for (path,) in cursor.execute("SELECT path FROM archives").fetchall():
+        if not os.path.exists(path):
+            logger.warning("Archive %s missing; its hashes were not upgraded", path)
+            continue
+        archive = sqlite3.connect(path)
+        try:
+            _upgrade_hashes(archive, "daily_transactions", "description")
+            archive.commit()
+        finally:
+            archive.close()
+
+
+def _maintenance_log(cursor):
+    # One row per ANALYZE / vacuum / checkpoint run (core/maintenance.py)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS maintenance_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task TEXT NOT NULL,
+            started_at TEXT NOT NULL,
+            duration_ms REAL NOT NULL,
+            status TEXT NOT NULL,
+            detail TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_maintenance_log_task ON maintenance_log(task, started_at)")
+
+
+def _daily_totals(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_totals (
+            date TEXT NOT NULL,
+            category TEXT NOT NULL,
+            transaction_type TEXT NOT NULL,
+            is_saving INTEGER NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            txn_count INTEGER NOT NULL DEFAULT 0,
+            seq INTEGER NOT NULL,
+            PRIMARY KEY (date, category, transaction_type, is_saving)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_totals_seq ON daily_totals (seq)")
+    create_daily_triggers(cursor)
+    rebuild_daily_totals(cursor)
+    # Archived years keep frozen rollups; read theirs from each archive file
+    # (no ATTACH inside the migration's transaction)
+    for (path,) in cursor.execute("SELECT path FROM archives").fetchall():
+        if not os.path.exists(path):
+            logger.warning("Archive %s missing; its days are not in daily_totals", path)
+            continue
+        archive = sqlite3.connect(path)
+        try:
+            rows = archive.execute(daily_totals_select()).fetchall()
+        finally:
+            archive.close()
+        cursor.executemany("""
+            INSERT INTO daily_totals (date, category, transaction_type, is_saving, total, txn_count, seq)
+            VALUES (?, ?, ?, ?, ?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM daily_totals))
+            ON CONFLICT(date, category, transaction_type, is_saving) DO UPDATE SET
+                total = total + excluded.total, txn_count = txn_count + excluded.txn_count
+        """, rows)
+
+
+def _changed_column_triggers(cursor):
+    # Recreate the rollup and search triggers on transaction_rows by name, and
+    # fire their update halves only when a column they read really changed
+    create_summary_triggers(cursor)
+    create_cube_triggers(cursor)
+    create_daily_triggers(cursor)
+    _create_fts_triggers(cursor)
+
+
+MIGRATIONS = [
+    # Schema v2 predates the migration runner; databases from that era already have it.
+    (2, "initial schema", _initial_schema),
+    (3, "ML prediction tracking", _prediction_tracking),
+    (4, "daily_transactions indexes", _transaction_indexes),
+    (5, "indexed year_month / cal_month columns", _month_columns),
+    (6, "trigger-maintained monthly_summary", _monthly_summary_rollup),
+    (7, "month x category x type aggregate cube", _category_monthly_cube),
+    (8, "per-table data version counters", _data_versions),
+    (9, "database instance id", _database_identity),
+    (10, "full-text search over descriptions", _transaction_search),
+    (11, "archive registry", _archive_registry),
+    (12, "interned descriptions and merchants", _interned_descriptions),
+    (13, "binary transaction hashes", _binary_hashes),
+    (14, "maintenance log", _maintenance_log),
+    (15, "trigger-maintained daily_totals", _daily_totals),
+    (16, "rollup triggers fire on changed columns only", _changed_column_triggers),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn) -> int:
+    conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY)")
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def run_migrations(conn) -> int:
+    """Apply pending migrations in order. Returns the resulting schema version."""
+    version = current_version(conn)
+    conn.commit()
+    for target, description, migrate in MIGRATIONS:
+        if target <= version:
+            continue
+        conn.execute("BEGIN")
+        try:
+            migrate(conn.cursor())
+            conn.execute("DELETE FROM schema_version")
+            conn.execute("INSERT INTO schema_version (version) VALUES (?)", (target,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.exception("Migration to v%d (%s) failed", target, description)
+            raise
+        version = target
+        logger.info("Migrated schema to v%d: %s", target, description)
+    return version
@@ -0,0 +1,154 @@
+"""
+Bounded pool of SQLite connections.
+
+Connections are opened lazily up to ``size``, handed out to one thread at a
+time, checked with a trivial query before reuse and replaced if broken.
+Connections checked out by threads that have since exited are reclaimed, so
+churning request threads cannot leak file handles. A read-only pool opens the
+file with mode=ro and query_only, so any write through it fails immediately.
+"""
+import pathlib
+import sqlite3
+import threading
+import time
+
+from core.logger import setup_logger
+
+logger = setup_logger("pfa.pool")
+
+# Applied to every connection; values come from config database.pragmas.
+DEFAULT_PRAGMAS = {
+    # Only takes effect on a new file, and must precede journal_mode there;
+    # core/maintenance.py converts older databases.
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",
+    "foreign_keys": "ON",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,
+    "mmap_size": 134217728,
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+}
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """No connection became free within the pool's timeout."""
+
+
+class ConnectionPool:
+    def __init__(self, path, size=8, timeout=10.0, pragmas=None, read_only=False, on_connect=None):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.read_only = read_only
+        self.on_connect = on_connect
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
+        if read_only:
+            # journal_mode is a property of the file, set by the writers
+            self.pragmas.pop("journal_mode", None)
+            self.pragmas.pop("auto_vacuum", None)
+            self.pragmas["query_only"] = "ON"
+        self._idle = []
+        self._leased = {}  # id(conn) -> (conn, owning thread)
+        self._opened = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _open(self):
+        if self.read_only:
+            uri = pathlib.Path(self.path).resolve().as_uri() + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        if self.on_connect is not None:
+            self.on_connect(conn)
+        return conn
+
+    @staticmethod
+    def _healthy(conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return not conn.in_transaction
+        except sqlite3.Error:
+            return False
+
+    def _reclaim_orphans(self):
+        for key, (conn, owner) in list(self._leased.items()):
+            if not owner.is_alive():
+                del self._leased[key]
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.append(conn)
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed")
+                if not self._idle and self._opened >= self.size:
+                    self._reclaim_orphans()
+                if self._idle:
+                    conn = self._idle.pop()
+                    if not self._healthy(conn):
+                        logger.warning("Replacing unhealthy pooled connection to %s", self.path)
+                        self._discard(conn)
+                        continue
+                    break
+                if self._opened < self.size:
+                    conn = self._open()
+                    self._opened += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s")
+                self._cond.wait(remaining)
+            self._leased[id(conn)] = (conn, threading.current_thread())
+            return conn
+
+    def release(self, conn):
+        with self._cond:
+            if self._leased.pop(id(conn), None) is None:
+                return
+            if self._closed:
+                self._discard(conn)
+                return
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn):
+        self._opened -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._opened,
+                "idle": len(self._idle),
+                "in_use": len(self._leased),
+            }
+
+    def close(self, checkpoint=True):
+        """Close idle connections, checkpointing the WAL into the main file first."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            if checkpoint and idle and not self.read_only:
+                try:
+                    idle[0].execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                except sqlite3.Error as e:
+                    logger.warning("WAL checkpoint on shutdown failed: %s", e)
+            for conn in idle:
+                self._discard(conn)
+            if self._leased:
+                logger.info("%d pooled connections still in use at shutdown", len(self._leased))
+            self._cond.notify_all()
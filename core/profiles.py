@@ -0,0 +1,188 @@
+"""
+Per-profile data routing.
+
+One server can host several households. Each profile keeps its own database,
+trained models, archives, backups and snapshots under
+``profiles.directory/<name>/``; the ``default`` profile uses the paths in
+config.yaml unchanged, so a single-user install is unaffected. The active
+profile is per thread: web requests take it from the profile cookie (see
+ui/routes.py) and background work inherits it through bind_profile(). A
+profile's database is only opened, and migrated, when it is first used.
+
+Modules that keep per-profile state in memory (models, similarity index,
+daily prefix sums, the analytics mirror) register with on_profile_evicted().
+Like the database pools, that state is kept for at most
+``profiles.max_open`` profiles: when another profile comes into use, the
+least recently used idle one is dropped and reloads on its next use.
+"""
+import functools
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, List
+
+from core.config import get_config
+from core.logger import setup_logger
+
+logger = setup_logger("pfa.profiles")
+
+DEFAULT_PROFILE = "default"
+
+_NAME = re.compile(r"[a-z0-9][a-z0-9_-]{0,31}")
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = set()  # database paths migrated by this process
+_last_used = {}  # profile -> time.monotonic() it was last activated
+_state_lock = threading.Lock()
+_resident = OrderedDict()  # profiles that may hold in-memory state, least recently used first
+_in_use = {}  # profile -> use_profile() blocks currently open on it
+_evict_callbacks: List[Callable[[str], None]] = []
+
+
+def _profiles_config():
+    return get_config().get("profiles", {})
+
+
+def profiles_dir() -> str:
+    return _profiles_config().get("directory", "profiles")
+
+
+def profile_cookie() -> str:
+    return _profiles_config().get("cookie", "pfa_profile")
+
+
+def validate_profile_name(name: str) -> str:
+    if not isinstance(name, str) or not _NAME.fullmatch(name):
+        raise ValueError(f"Invalid profile name {name!r}: use lowercase letters, digits, '-' and '_'")
+    return name
+
+
+def active_profile() -> str:
+    return getattr(_local, "profile", None) or DEFAULT_PROFILE
+
+
+def profile_exists(name: str) -> bool:
+    if name == DEFAULT_PROFILE:
+        return True
+    return bool(_NAME.fullmatch(name or "")) and os.path.isdir(os.path.join(profiles_dir(), name))
+
+
+def list_profiles() -> List[str]:
+    """The default profile followed by every profile directory, by name."""
+    directory = profiles_dir()
+    names = []
+    if os.path.isdir(directory):
+        names = sorted(
+            n for n in os.listdir(directory)
+            if n != DEFAULT_PROFILE and _NAME.fullmatch(n) and os.path.isdir(os.path.join(directory, n))
+        )
+    return [DEFAULT_PROFILE] + names
+
+
+def create_profile(name: str) -> str:
+    """Create an empty profile; its database is set up on first use."""
+    validate_profile_name(name)
+    if name == DEFAULT_PROFILE or profile_exists(name):
+        raise ValueError(f"Profile {name!r} already exists")
+    os.makedirs(os.path.join(profiles_dir(), name))
+    logger.info("Created profile %s", name)
+    return name
+
+
+def on_profile_evicted(callback: Callable[[str], None]):
+    """Register callback(profile), which drops that profile's in-memory state."""
+    _evict_callbacks.append(callback)
+
+
+def _evict_profiles():
+    """Drop the state of the least recently used idle profiles beyond profiles.max_open."""
+    max_open = max(_profiles_config().get("max_open", 4), 1)
+    with _state_lock:
+        idle = [name for name in _resident if not _in_use.get(name)]
+        evicted = idle[:max(len(_resident) - max_open, 0)]
+        for name in evicted:
+            del _resident[name]
+    for name in evicted:
+        for callback in _evict_callbacks:
+            try:
+                callback(name)
+            except Exception:
+                logger.exception("Evicting profile %s failed in %s", name, getattr(callback, "__name__", callback))
+    if evicted:
+        logger.info("Dropped the in-memory state of profiles %s", ", ".join(evicted))
+
+
+def scoped_path(path: str) -> str:
+    """
+    Where a configured file or directory lives for the active profile: as
+    configured for the default profile, else the same name inside the
+    profile's directory.
+    """
+    name = active_profile()
+    if name == DEFAULT_PROFILE:
+        return path
+    return os.path.join(profiles_dir(), name, os.path.basename(os.path.normpath(path)))
+
+
+def _ensure_initialized():
+    # The default database is set up at startup; others on first use
+    from core.database import _db_path, initialize_database
+
+    path = _db_path()
+    if path in _initialized:
+        return
+    with _init_lock:
+        if path not in _initialized:
+            initialize_database()
+            _initialized.add(path)
+
+
+@contextmanager
+def use_profile(name: str):
+    """Route this thread's data access to the named profile for the block."""
+    from core.database import in_transaction
+
+    if not profile_exists(name):
+        raise ValueError(f"Unknown profile {name!r}")
+    if name != active_profile() and in_transaction():
+        raise RuntimeError("Cannot switch profiles inside a unit of work")
+    previous = getattr(_local, "profile", None)
+    _local.profile = name
+    _last_used[name] = time.monotonic()
+    with _state_lock:
+        _in_use[name] = _in_use.get(name, 0) + 1
+        new = name not in _resident
+        _resident[name] = True
+        _resident.move_to_end(name)
+    try:
+        if new:
+            _evict_profiles()
+        if name != DEFAULT_PROFILE:
+            _ensure_initialized()
+        yield
+    finally:
+        _local.profile = previous
+        with _state_lock:
+            _in_use[name] -= 1
+
+
+def recent_profiles(seconds: float) -> List[str]:
+    """The default profile plus every profile used in the last `seconds`."""
+    cutoff = time.monotonic() - seconds
+    recent = {n for n, t in list(_last_used.items()) if t >= cutoff and profile_exists(n)}
+    return [DEFAULT_PROFILE] + sorted(recent - {DEFAULT_PROFILE})
+
+
+def bind_profile(func):
+    """Wrap func to run under the profile active now, e.g. as a thread target."""
+    name = active_profile()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with use_profile(name):
+            return func(*args, **kwargs)
+    return wrapper
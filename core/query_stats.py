@@ -0,0 +1,149 @@
+"""
+Per-statement query instrumentation.
+
+execute_query() and execute_read() report every statement here with its
+latency, row count and the application call site. Recent executions are kept
+in a ring buffer, per-statement totals and a global latency histogram are
+accumulated, and statements slower than ``database.slow_query_ms`` are logged
+together with their EXPLAIN QUERY PLAN. Per-statement totals are kept for at
+most ``database.query_stats_max_statements`` distinct statements, evicting the
+least recently executed, so SQL built with inline values cannot grow them
+without bound.
+"""
+import functools
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+from core.config import get_config
+from core.logger import setup_logger
+
+logger = setup_logger("pfa.queries")
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open-ended.
+HISTOGRAM_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, float("inf"))
+
+_CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_lock = threading.Lock()
+_recent = deque(maxlen=500)  # most recent executions
+_statements: "OrderedDict[str, dict]" = OrderedDict()
+_histogram = [0] * len(HISTOGRAM_BUCKETS_MS)
+
+
+def _config():
+    return get_config().get("database", {})
+
+
+def enabled() -> bool:
+    return _config().get("instrumentation", True)
+
+
+def _max_statements():
+    return _config().get("query_stats_max_statements", 1000)
+
+
+@functools.lru_cache(maxsize=1024)
+def _normalize(sql):
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def _call_site():
+    """First frame outside core/, e.g. 'services/analytics.py:42 get_monthly_trends'."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        path = os.path.abspath(frame.f_code.co_filename)
+        if not path.startswith(_CORE_DIR):
+            root = os.path.dirname(_CORE_DIR)
+            rel = os.path.relpath(path, root) if path.startswith(root) else path
+            return f"{rel}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+def _query_plan(conn, sql, params):
+    try:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    except Exception as e:
+        return [f"(plan unavailable: {e})"]
+    return [r[3] for r in rows]
+
+
+def record(conn, sql, params, elapsed, rows):
+    """Account one executed statement; elapsed is in seconds."""
+    elapsed_ms = elapsed * 1000
+    statement = _normalize(sql)
+    site = _call_site()
+    with _lock:
+        _recent.append({
+            "sql": statement,
+            "ms": round(elapsed_ms, 3),
+            "rows": rows,
+            "call_site": site,
+            "at": time.time(),
+        })
+        s = _statements.get(statement)
+        if s is None:
+            s = _statements[statement] = {
+                "sql": statement, "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "call_sites": set(),
+            }
+            while len(_statements) > _max_statements():
+                _statements.popitem(last=False)
+        else:
+            _statements.move_to_end(statement)
+        s["calls"] += 1
+        s["total_ms"] += elapsed_ms
+        s["max_ms"] = max(s["max_ms"], elapsed_ms)
+        s["rows"] += rows or 0
+        s["call_sites"].add(site)
+        for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                _histogram[i] += 1
+                break
+
+    if elapsed_ms >= _config().get("slow_query_ms", 100):
+        plan = _query_plan(conn, sql, params)
+        logger.warning(
+            "Slow query (%.1f ms, %s rows) at %s: %s\n  plan: %s",
+            elapsed_ms, rows, site, statement, " | ".join(plan),
+        )
+
+
+def _summary(s):
+    return {
+        "sql": s["sql"],
+        "calls": s["calls"],
+        "total_ms": round(s["total_ms"], 2),
+        "avg_ms": round(s["total_ms"] / s["calls"], 3),
+        "max_ms": round(s["max_ms"], 3),
+        "rows": s["rows"],
+        "call_sites": sorted(s["call_sites"]),
+    }
+
+
+def get_query_stats(top_n=10):
+    """Slowest and most frequent statements, the latency histogram and recent executions."""
+    with _lock:
+        statements = [_summary(s) for s in _statements.values()]
+        histogram = {
+            (f"<= {b:g} ms" if b != float("inf") else f"> {HISTOGRAM_BUCKETS_MS[-2]:g} ms"): n
+            for b, n in zip(HISTOGRAM_BUCKETS_MS, _histogram)
+        }
+        recent = list(_recent)[-top_n:]
+    return {
+        "slowest": sorted(statements, key=lambda s: s["max_ms"], reverse=True)[:top_n],
+        "most_frequent": sorted(statements, key=lambda s: s["calls"], reverse=True)[:top_n],
+        "histogram": histogram,
+        "recent": recent,
+    }
+
+
+def reset_query_stats():
+    with _lock:
+        _recent.clear()
+        _statements.clear()
+        for i in range(len(_histogram)):
+            _histogram[i] = 0
@@ -0,0 +1,152 @@
+"""
+Optional single writer thread.
+
+With ``database.single_writer`` enabled, functions decorated with
+@write_operation are not run by the calling thread. They are queued for one
+dedicated writer, which drains whatever jobs are waiting and runs them in a
+single transaction, each job inside its own savepoint. The caller blocks
+until the batch commits and then gets the job's return value or exception.
+``database.writer_timeout`` only bounds the wait in the queue: a job the
+writer has not picked up by then is withdrawn and the caller gets a
+TimeoutError, but once picked up it always runs to completion and the caller
+waits for it, so a slow import is never reported failed and then committed.
+Writes from concurrent callbacks therefore never contend for the SQLite write
+lock, and bursts of small writes share one commit. Each job runs under the
+profile that queued it; consecutive jobs of one profile share a batch.
+"""
+import functools
+import itertools
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from core.config import get_config
+from core.database import in_transaction, transaction
+from core.logger import setup_logger
+from core.profiles import active_profile, use_profile
+
+logger = setup_logger("pfa.writer")
+
+_queue: "queue.Queue" = queue.Queue()
+_thread = None
+_start_lock = threading.Lock()
+_stats = {"jobs": 0, "batches": 0, "failed": 0}
+
+
+def _writer_config():
+    return get_config().get("database", {})
+
+
+def writer_enabled() -> bool:
+    return bool(_writer_config().get("single_writer", False))
+
+
+def _run_batch(jobs):
+    done = []
+    try:
+        with transaction():
+            for future, func, args, kwargs, _ in jobs:
+                try:
+                    with transaction():
+                        done.append((future, func(*args, **kwargs), None))
+                except Exception as e:
+                    done.append((future, None, e))
+    except Exception as e:
+        # The commit itself failed: nothing in the batch was written
+        logger.exception("Write batch of %d jobs failed", len(jobs))
+        for future, *_ in jobs:
+            future.set_exception(e)
+        _stats["failed"] += len(jobs)
+        return
+    _stats["batches"] += 1
+    _stats["jobs"] += len(jobs)
+    for future, result, error in done:
+        if error is not None:
+            _stats["failed"] += 1
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+def _writer_loop():
+    max_batch = _writer_config().get("writer_max_batch", 64)
+    while True:
+        job = _queue.get()
+        if job is None:
+            return
+        jobs = [job]
+        stop = False
+        while len(jobs) < max_batch:
+            try:
+                job = _queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                stop = True
+                break
+            jobs.append(job)
+        # Claim the jobs; any whose caller gave up waiting in the queue is dropped
+        jobs = [job for job in jobs if job[0].set_running_or_notify_cancel()]
+        for profile, group in itertools.groupby(jobs, key=lambda job: job[4]):
+            group = list(group)
+            try:
+                with use_profile(profile):
+                    _run_batch(group)
+            except Exception as e:
+                # The profile's database could not be opened
+                logger.exception("Write batch for profile %s failed", profile)
+                for future, *_ in group:
+                    if not future.done():
+                        future.set_exception(e)
+        if stop:
+            return
+
+
+def start_writer():
+    global _thread
+    with _start_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_writer_loop, name="pfa-db-writer", daemon=True)
+            _thread.start()
+            logger.info("Single writer thread started")
+
+
+def stop_writer(timeout=10.0):
+    """Finish queued writes and stop the writer thread."""
+    global _thread
+    with _start_lock:
+        thread, _thread = _thread, None
+    if thread is not None and thread.is_alive():
+        _queue.put(None)
+        thread.join(timeout)
+
+
+def submit_write(func, *args, **kwargs) -> Future:
+    start_writer()
+    future = Future()
+    _queue.put((future, func, args, kwargs, active_profile()))
+    return future
+
+
+def get_writer_stats():
+    return dict(_stats, queued=_queue.qsize())
+
+
+def write_operation(func):
+    """Route a service write through the single writer when it is enabled."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Already on the writer, or part of a caller's unit of work: run inline
+        if (not writer_enabled() or threading.current_thread() is _thread
+                or in_transaction()):
+            return func(*args, **kwargs)
+        timeout = _writer_config().get("writer_timeout", 30)
+        future = submit_write(func, *args, **kwargs)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            if future.cancel():
+                raise TimeoutError(f"{func.__name__} waited {timeout}s for the writer and was not run")
+        # Already running: its outcome is the caller's, however long it takes
+        return future.result()
+    return wrapper
@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from core.config import get_config
+from core.database import execute_query, execute_read, transaction
+from core.logger import setup_logger
+from core.writer import write_operation
+
+logger = setup_logger("pfa.drift")
+
+
+def _feedback_events(prediction: Dict, category: str, is_saving: int) -> List[Tuple[str, str, bool]]:
+    """(head, predicted label, was correct) for one reviewed transaction."""
+    source = prediction.get("prediction_source")
+    predicted = prediction.get("predicted_category")
+    if not source or not predicted:
+        return []
+    if source == "keyword":
+        return [("keywords", predicted, predicted == category)]
+
+    events = []
+    predicted_saving = prediction.get("predicted_is_saving")
+    if prediction.get("transaction_type") == "Debit" and predicted_saving is not None:
+        predicted_type = "Savings/Investment" if predicted_saving else "Expense"
+        events.append(("debit_type", predicted_type, bool(predicted_saving) == bool(is_saving)))
+    head = "savings" if predicted_saving else "expense"
+    events.append((head, predicted, predicted == category))
+    return events
+
+
+@write_operation
+def record_feedback(prediction: Dict, category: str, is_saving: int):
+    """
+    Fold a user's categorization into the per-head accuracy counters.
+    prediction holds the transaction's stored prediction_* columns.
+    """
+    alpha = get_config().get("ml", {}).get("drift_alpha", 0.1)
+    now = datetime.now().isoformat()
+    with transaction():
+        for head, label, correct in _feedback_events(prediction, category, is_saving):
+            hit = 1 if correct else 0
+            execute_query(
+                """INSERT INTO model_accuracy
+                     (head, label, confirmed, corrected, rolling_accuracy, corrected_since_train, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(head, label) DO UPDATE SET
+                     confirmed = confirmed + excluded.confirmed,
+                     corrected = corrected + excluded.corrected,
+                     rolling_accuracy = rolling_accuracy * (1 - ?) + ? * excluded.confirmed,
+                     corrected_since_train = corrected_since_train + excluded.corrected,
+                     updated_at = excluded.updated_at""",
+                (head, label, hit, 1 - hit, float(hit), 1 - hit, now, alpha, alpha),
+            )
+            if not correct:
+                logger.info("Correction on %s head: predicted %s, user chose %s", head, label, category)
+
+
+def get_model_accuracy() -> List[Dict]:
+    rows = execute_read(
+        """SELECT head, label, confirmed, corrected, rolling_accuracy, corrected_since_train,
+                  updated_at
+           FROM model_accuracy ORDER BY head, label""",
+    )
+    return [dict(r) for r in rows] if rows else []
+
+
+def should_retrain() -> bool:
+    """True when corrections since the last training show the ML models drifting."""
+    cfg = get_config().get("ml", {})
+    min_corrections = cfg.get("retrain_min_corrections", 5)
+    accuracy_floor = cfg.get("drift_accuracy_threshold", 0.8)
+
+    rows = execute_read(
+        """SELECT confirmed + corrected AS reviewed, rolling_accuracy, corrected_since_train
+           FROM model_accuracy
+           WHERE head != 'keywords' AND corrected_since_train > 0""",
+    )
+    if not rows:
+        return False
+    pending = sum(r["corrected_since_train"] for r in rows)
+    drifted = any(
+        r["reviewed"] >= min_corrections and r["rolling_accuracy"] < accuracy_floor for r in rows
+    )
+    return pending >= min_corrections or drifted
+
+
+@write_operation
+def reset_since_train():
+    execute_query("UPDATE model_accuracy SET corrected_since_train = 0")
@@ -2,30 +2,78 @@ import os
 import threading
 import hashlib
 import joblib
-from typing import Tuple, Optional, List
+from typing import Callable, Dict, Tuple, Optional, List
 
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 
 from core.config import get_config
-from core.database import execute_query
+from core.database import execute_read
 from core.logger import setup_logger
+from core.profiles import active_profile, bind_profile, on_profile_evicted, scoped_path
 from models.keywords import ALL_SAVINGS_CATEGORIES
+from models.drift import reset_since_train
 
 logger = setup_logger("pfa.ml")
 
+# Guards the module state; held only to read or swap models, never across disk I/O or fitting
 _lock = threading.Lock()
 
-_debit_type_model: Optional[LogisticRegression] = None
-_expense_model: Optional[LogisticRegression] = None
-_savings_model: Optional[LogisticRegression] = None
-_vectorizer: Optional[TfidfVectorizer] = None
-_data_hash: Optional[str] = None
+_MODEL_FILES = ("vectorizer", "debit_type", "expense", "savings")
+
+
+class _Models:
+    """One profile's trained models and load state."""
+
+    def __init__(self):
+        self.debit_type: Optional[LogisticRegression] = None
+        self.expense: Optional[LogisticRegression] = None
+        self.savings: Optional[LogisticRegression] = None
+        self.vectorizer: Optional[TfidfVectorizer] = None
+        self.data_hash: Optional[str] = None
+        # Set once the startup load (or first training) has finished, successfully or not.
+        self.ready = threading.Event()
+        self.loader: Optional[threading.Thread] = None
+        # Serializes training and the joblib files with the startup load
+        self.training = threading.Lock()
+
+    def install(self, models: Dict):
+        """Swap in a full set of models (callers hold _lock)."""
+        for name in _MODEL_FILES:
+            setattr(self, name, models[name])
+        self.data_hash = models["data_hash"]
+
+
+_models: Dict[str, _Models] = {}
+_ready_callbacks: List[Callable[[], None]] = []
+
+
+def _current() -> _Models:
+    """Model state of the active profile, created empty on first use."""
+    with _lock:
+        return _models.setdefault(active_profile(), _Models())
+
+
+def _evict(profile: str):
+    with _lock:
+        _models.pop(profile, None)
+
+
+on_profile_evicted(_evict)
+
+
+def reset_models():
+    """Wait for background loads and forget every profile's models (tests)."""
+    for state in list(_models.values()):
+        if state.loader is not None:
+            state.loader.join(timeout=30)
+    with _lock:
+        _models.clear()
 
 
 def _model_dir():
     cfg = get_config()
-    path = cfg.get("ml", {}).get("model_save_path", "saved_models/")
+    path = scoped_path(cfg.get("ml", {}).get("model_save_path", "saved_models/"))
     os.makedirs(path, exist_ok=True)
     return path
 
@@ -35,44 +83,44 @@ def _compute_data_hash(data):
     return hashlib.md5(raw.encode()).hexdigest()
 
 
-def _save_models():
+def _save_models(models: Dict):
     path = _model_dir()
-    joblib.dump(_vectorizer, os.path.join(path, "vectorizer.joblib"))
-    joblib.dump(_debit_type_model, os.path.join(path, "debit_type.joblib"))
-    joblib.dump(_expense_model, os.path.join(path, "expense.joblib"))
-    joblib.dump(_savings_model, os.path.join(path, "savings.joblib"))
-    if _data_hash:
+    for name in _MODEL_FILES:
+        joblib.dump(models[name], os.path.join(path, f"{name}.joblib"))
+    if models["data_hash"]:
         with open(os.path.join(path, "data_hash.txt"), "w") as f:
-            f.write(_data_hash)
+            f.write(models["data_hash"])
     logger.info("Models saved to %s", path)
 
 
-def _load_models():
-    global _debit_type_model, _expense_model, _savings_model, _vectorizer, _data_hash
+def _load_models() -> Optional[Dict]:
     path = _model_dir()
-    vect_path = os.path.join(path, "vectorizer.joblib")
-    if not os.path.exists(vect_path):
-        return False
+    if not os.path.exists(os.path.join(path, "vectorizer.joblib")):
+        return None
     try:
-        _vectorizer = joblib.load(vect_path)
-        _debit_type_model = joblib.load(os.path.join(path, "debit_type.joblib"))
-        _expense_model = joblib.load(os.path.join(path, "expense.joblib"))
-        _savings_model = joblib.load(os.path.join(path, "savings.joblib"))
+        models = {name: joblib.load(os.path.join(path, f"{name}.joblib")) for name in _MODEL_FILES}
+        models["data_hash"] = None
         hash_path = os.path.join(path, "data_hash.txt")
         if os.path.exists(hash_path):
             with open(hash_path) as f:
-                _data_hash = f.read().strip()
+                models["data_hash"] = f.read().strip()
         logger.info("Models loaded from disk")
-        return True
+        return models
     except Exception as e:
         logger.warning("Failed to load models: %s", e)
-        return False
+        return None
 
 
 def train_models():
-    global _debit_type_model, _expense_model, _savings_model, _vectorizer, _data_hash
+    state = _current()
+    # A second caller (loader vs. post-ingest retrain) waits and then sees the new hash
+    with state.training:
+        _train(state)
+    _mark_ready(state)
 
-    rows = execute_query("SELECT description, category FROM training_data", fetch=True)
+
+def _train(state: _Models):
+    rows = execute_read("SELECT description, category FROM training_data")
     if not rows:
         logger.info("No training data available, skipping training")
         return
@@ -81,84 +129,153 @@ def train_models():
     new_hash = _compute_data_hash(data)
 
     with _lock:
-        if _data_hash == new_hash:
-            logger.info("Training data unchanged, skipping retrain")
+        unchanged = state.data_hash == new_hash
+    if unchanged:
+        logger.info("Training data unchanged, skipping retrain")
+        return
+
+    # Fit outside the lock so predictions keep using the previous models meanwhile
+    descriptions = [d for d, _ in data]
+    categories = [c for _, c in data]
+
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), lowercase=True)
+    X = vectorizer.fit_transform(descriptions)
+
+    # Debit type: Expense vs Savings/Investment
+    y_debit = [
+        "Savings/Investment" if c in ALL_SAVINGS_CATEGORIES else "Expense"
+        for c in categories
+    ]
+    if len(set(y_debit)) >= 2:
+        debit_type_model = LogisticRegression(max_iter=600)
+        debit_type_model.fit(X, y_debit)
+    else:
+        debit_type_model = None
+        logger.info("Skipping debit-type model: only one class in data")
+
+    # Expense category
+    expense_labels = [c if c not in ALL_SAVINGS_CATEGORIES else "Other" for c in categories]
+    if len(set(expense_labels)) >= 2:
+        expense_model = LogisticRegression(max_iter=600)
+        expense_model.fit(X, expense_labels)
+    else:
+        expense_model = None
+
+    # Savings category
+    savings_labels = [c if c in ALL_SAVINGS_CATEGORIES else "Other" for c in categories]
+    if len(set(savings_labels)) >= 2:
+        savings_model = LogisticRegression(max_iter=600)
+        savings_model.fit(X, savings_labels)
+    else:
+        savings_model = None
+
+    models = {
+        "vectorizer": vectorizer,
+        "debit_type": debit_type_model,
+        "expense": expense_model,
+        "savings": savings_model,
+        "data_hash": new_hash,
+    }
+    with _lock:
+        state.install(models)
+    _save_models(models)
+    reset_since_train()
+    logger.info("Models trained on %d examples", len(data))
+
+
+def on_models_ready(callback: Callable[[], None]):
+    """Register a callback to run (in the loader thread) once models become available."""
+    _ready_callbacks.append(callback)
+
+
+def models_ready() -> bool:
+    return _current().ready.is_set()
+
+
+def wait_for_models(timeout: Optional[float] = None) -> bool:
+    return _current().ready.wait(timeout)
+
+
+def _mark_ready(state: _Models):
+    with _lock:
+        if state.ready.is_set():
             return
+        state.ready.set()
+    for callback in list(_ready_callbacks):
+        try:
+            callback()
+        except Exception:
+            logger.exception("Model-ready callback %s failed", getattr(callback, "__name__", callback))
 
-        descriptions = [d for d, _ in data]
-        categories = [c for _, c in data]
-
-        _vectorizer = TfidfVectorizer(ngram_range=(1, 2), lowercase=True)
-        X = _vectorizer.fit_transform(descriptions)
-
-        # Debit type: Expense vs Savings/Investment
-        y_debit = [
-            "Savings/Investment" if c in ALL_SAVINGS_CATEGORIES else "Expense"
-            for c in categories
-        ]
-        if len(set(y_debit)) >= 2:
-            _debit_type_model = LogisticRegression(max_iter=600)
-            _debit_type_model.fit(X, y_debit)
-        else:
-            _debit_type_model = None
-            logger.info("Skipping debit-type model: only one class in data")
-
-        # Expense category
-        expense_labels = [c if c not in ALL_SAVINGS_CATEGORIES else "Other" for c in categories]
-        if len(set(expense_labels)) >= 2:
-            _expense_model = LogisticRegression(max_iter=600)
-            _expense_model.fit(X, expense_labels)
-        else:
-            _expense_model = None
-
-        # Savings category
-        savings_labels = [c if c in ALL_SAVINGS_CATEGORIES else "Other" for c in categories]
-        if len(set(savings_labels)) >= 2:
-            _savings_model = LogisticRegression(max_iter=600)
-            _savings_model.fit(X, savings_labels)
-        else:
-            _savings_model = None
-
-        _data_hash = new_hash
-        _save_models()
-        logger.info("Models trained on %d examples", len(data))
-
-
-def _ensure_trained():
-    global _debit_type_model
-    if _debit_type_model is None:
-        with _lock:
-            if _debit_type_model is None:
-                if not _load_models():
-                    rows = execute_query("SELECT COUNT(*) as cnt FROM training_data", fetch=True)
-                    if rows and rows[0]["cnt"] > 0:
-                        _lock.release()
-                        try:
-                            train_models()
-                        finally:
-                            _lock.acquire()
-
-
-def _predict_generic(model, text: str) -> Tuple[Optional[str], float]:
-    if model is None or _vectorizer is None:
-        return None, 0.0
+
+def _load_or_train(retrain: bool):
+    state = _current()
+    try:
+        with state.training:
+            models = _load_models()
+            if models is not None:
+                with _lock:
+                    state.install(models)
+        if retrain or models is None:
+            train_models()
+    except Exception:
+        logger.exception("Background model load failed")
+    finally:
+        _mark_ready(state)
+
+
+def start_background_load(retrain: bool = False):
+    """Load the active profile's persisted models (training if needed) without blocking."""
+    state = _current()
     with _lock:
-        X = _vectorizer.transform([text])
-        label = model.predict(X)[0]
-        conf = float(max(model.predict_proba(X)[0]))
+        if state.ready.is_set() or (state.loader is not None and state.loader.is_alive()):
+            return
+        state.loader = threading.Thread(
+            target=bind_profile(_load_or_train), args=(retrain,), daemon=True, name="pfa-model-loader",
+        )
+        state.loader.start()
+
+
+def _ensure_trained() -> bool:
+    """True when models can be queried; otherwise kicks off the background load."""
+    if _current().ready.is_set():
+        return True
+    start_background_load()
+    return False
+
+
+def _predict_generic(head: str, text: str) -> Tuple[Optional[str], float]:
+    state = _current()
+    with _lock:
+        # Resolve the model under the lock so it always matches the current vectorizer;
+        # fitted models are never mutated, only swapped, so predicting needs no lock
+        model = {
+            "debit_type": state.debit_type,
+            "expense": state.expense,
+            "savings": state.savings,
+        }[head]
+        vectorizer = state.vectorizer
+    if model is None or vectorizer is None:
+        return None, 0.0
+    X = vectorizer.transform([text])
+    label = model.predict(X)[0]
+    conf = float(max(model.predict_proba(X)[0]))
     return label, conf
 
 
 def predict_debit_type(description: str) -> Tuple[Optional[str], float]:
-    _ensure_trained()
-    return _predict_generic(_debit_type_model, description)
+    if not _ensure_trained():
+        return None, 0.0
+    return _predict_generic("debit_type", description)
 
 
 def predict_expense_category(description: str) -> Tuple[Optional[str], float]:
-    _ensure_trained()
-    return _predict_generic(_expense_model, description)
+    if not _ensure_trained():
+        return None, 0.0
+    return _predict_generic("expense", description)
 
 
 def predict_savings_category(description: str) -> Tuple[Optional[str], float]:
-    _ensure_trained()
-    return _predict_generic(_savings_model, description)
+    if not _ensure_trained():
+        return None, 0.0
+    return _predict_generic("savings", description)
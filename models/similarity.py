@@ -0,0 +1,147 @@
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from core.config import get_config
+from core.database import execute_read
+from core.logger import setup_logger
+from core.profiles import active_profile, on_profile_evicted
+
+logger = setup_logger("pfa.similarity")
+
+_lock = threading.Lock()
+
+# Hashed features keep the vector space fixed, so new labels can be appended
+# to the index without refitting anything.
+_vectorizer = HashingVectorizer(
+    ngram_range=(1, 2), n_features=2 ** 18, alternate_sign=False, norm="l2", lowercase=True,
+)
+
+
+class _Index:
+    """One profile's labeled descriptions and their feature rows."""
+
+    def __init__(self):
+        self.matrix: Optional[sp.csr_matrix] = None
+        self.pending: List[sp.csr_matrix] = []
+        self.descriptions: List[str] = []
+        self.label_counts: List[Counter] = []
+        self.row_of: Dict[str, int] = {}
+        self.last_id = 0
+
+
+_indexes: Dict[str, _Index] = {}
+
+
+def _current() -> _Index:
+    """Index of the active profile. Caller holds _lock."""
+    return _indexes.setdefault(active_profile(), _Index())
+
+
+def reset_index(profile: Optional[str] = None):
+    """Drop one profile's index (rebuilt on next use), or every profile's."""
+    with _lock:
+        if profile is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(profile, None)
+
+
+on_profile_evicted(reset_index)
+
+
+def _add_examples(index, rows):
+    """Fold (id, description, category) rows into the index. Caller holds _lock."""
+    new_texts = []
+    for row in rows:
+        desc, cat = row["description"], row["category"]
+        index.last_id = max(index.last_id, row["id"])
+        idx = index.row_of.get(desc)
+        if idx is None:
+            idx = len(index.descriptions)
+            index.row_of[desc] = idx
+            index.descriptions.append(desc)
+            index.label_counts.append(Counter())
+            new_texts.append(desc)
+        index.label_counts[idx][cat] += 1
+    if new_texts:
+        index.pending.append(_vectorizer.transform(new_texts).tocsr())
+    return len(new_texts)
+
+
+def sync_index() -> int:
+    """Pull training rows added since the last sync. Returns new distinct descriptions."""
+    with _lock:
+        index = _current()
+        rows = execute_read(
+            "SELECT id, description, category FROM training_data WHERE id > ? ORDER BY id",
+            (index.last_id,),
+        )
+        if not rows:
+            return 0
+        added = _add_examples(index, rows)
+    if added:
+        logger.info("Similarity index: +%d descriptions (%d total)", added, len(index.descriptions))
+    return added
+
+
+def _index_matrix(index) -> Optional[sp.csr_matrix]:
+    """Merge appended blocks into a single matrix. Caller holds _lock."""
+    if index.pending:
+        blocks = ([index.matrix] if index.matrix is not None else []) + index.pending
+        index.matrix = sp.vstack(blocks, format="csr")
+        index.pending = []
+    return index.matrix
+
+
+def find_similar(descriptions: List[str], k: Optional[int] = None) -> List[List[Dict]]:
+    """
+    For each processed description, return up to k most similar labeled descriptions
+    as dicts with description, category (majority label) and similarity.
+    """
+    if k is None:
+        k = get_config().get("ml", {}).get("similarity_neighbors", 5)
+    if not descriptions:
+        return []
+
+    sync_index()
+    with _lock:
+        index = _current()
+        matrix = _index_matrix(index)
+        if matrix is None or matrix.shape[0] == 0:
+            return [[] for _ in descriptions]
+        scores = (_vectorizer.transform(descriptions) @ matrix.T).tocsr()
+
+        results = []
+        for i in range(scores.shape[0]):
+            start, end = scores.indptr[i], scores.indptr[i + 1]
+            sims = scores.data[start:end]
+            cols = scores.indices[start:end]
+            if len(sims) > k:
+                top = np.argpartition(-sims, k)[:k]
+                sims, cols = sims[top], cols[top]
+            order = np.argsort(-sims)
+            results.append([
+                {
+                    "description": index.descriptions[cols[j]],
+                    "category": index.label_counts[cols[j]].most_common(1)[0][0],
+                    "similarity": round(float(sims[j]), 3),
+                }
+                for j in order
+            ])
+    return results
+
+
+def suggest_categories(descriptions: List[str], k: Optional[int] = None) -> List[List[str]]:
+    """Distinct neighbour categories per description, ordered by summed similarity."""
+    suggestions = []
+    for neighbours in find_similar(descriptions, k):
+        votes: Dict[str, float] = {}
+        for n in neighbours:
+            votes[n["category"]] = votes.get(n["category"], 0.0) + n["similarity"]
+        suggestions.append(sorted(votes, key=votes.get, reverse=True))
+    return suggestions
@@ -1,5 +1,7 @@
 """Personal Finance Analyzer — Application Entry Point."""
 
+import argparse
+import atexit
 import sys
 import os
 
@@ -7,25 +9,118 @@ import os
 sys.path.insert(0, os.path.dirname(__file__))
 
 from core.config import load_config
-from core.database import initialize_database
+from core.database import close_pool, initialize_database, rebuild_summaries
 from core.logger import setup_logger
-from models.ml_models import train_models
+from core.backup import start_backup_scheduler, stop_backup_scheduler
+from core.cache import load_cache, save_cache
+from core.maintenance import run_maintenance, start_maintenance_scheduler, stop_maintenance_scheduler
+from core.profiles import DEFAULT_PROFILE, create_profile, use_profile
+from core.daily_series import save_daily_series
+from core.writer import start_writer, stop_writer, writer_enabled
+from models.ml_models import start_background_load
 
-import threading
+
+def _run_command(args, logger) -> bool:
+    """Run the one-shot command given on the command line, if any. Returns True if it did."""
+    if args.rebuild_summaries:
+        rebuild_summaries()
+        logger.info("Summary tables rebuilt")
+        return True
+
+    if args.maintenance:
+        run_maintenance(force=True)
+        return True
+
+    if args.archive_year or args.restore_year:
+        from core.archive import archive_year, restore_year
+        if args.archive_year:
+            archive_year(args.archive_year)
+        if args.restore_year:
+            restore_year(args.restore_year)
+        return True
+
+    if args.export_snapshot is not None or args.import_snapshot:
+        from core.snapshot import export_snapshot, import_snapshot
+        if args.export_snapshot is not None:
+            export_snapshot(args.export_snapshot or None)
+        if args.import_snapshot:
+            import_snapshot(args.import_snapshot)
+        return True
+    return False
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Personal Finance Analyzer")
+    parser.add_argument(
+        "--rebuild-summaries", action="store_true",
+        help="recompute the monthly rollup tables from all transactions and exit",
+    )
+    parser.add_argument(
+        "--maintenance", action="store_true",
+        help="run ANALYZE, incremental vacuum and a WAL checkpoint now and exit",
+    )
+    parser.add_argument(
+        "--archive-year", type=int, metavar="YEAR",
+        help="move a closed year's transactions into an archive file and exit",
+    )
+    parser.add_argument(
+        "--restore-year", type=int, metavar="YEAR",
+        help="move an archived year back into the live database and exit",
+    )
+    parser.add_argument(
+        "--export-snapshot", nargs="?", const="", metavar="DIR",
+        help="write a Parquet snapshot of all data (default: a new directory under snapshot.directory) and exit",
+    )
+    parser.add_argument(
+        "--import-snapshot", metavar="DIR",
+        help="replace all data with a Parquet snapshot and exit",
+    )
+    parser.add_argument(
+        "--profile", default=DEFAULT_PROFILE, metavar="NAME",
+        help="run the commands above against this profile's data",
+    )
+    parser.add_argument(
+        "--create-profile", metavar="NAME",
+        help="create an empty profile under profiles.directory and exit",
+    )
+    args = parser.parse_args()
+
     # Load configuration
     config = load_config()
     logger = setup_logger("pfa")
     logger.info("Starting Personal Finance Analyzer")
 
-    # Initialize database
+    # Initialize database; checkpoint the WAL and close connections on exit
     initialize_database()
+    atexit.register(close_pool)
+    if writer_enabled():
+        start_writer()
+        atexit.register(stop_writer)
+
+    if args.create_profile:
+        create_profile(args.create_profile)
+        return
+
+    with use_profile(args.profile):
+        if _run_command(args, logger):
+            return
+
+    # Warm the analytics result cache from the previous run
+    load_cache()
+    atexit.register(save_cache)
+    atexit.register(save_daily_series)
+
+    # Rolling online backups
+    start_backup_scheduler()
+    atexit.register(stop_backup_scheduler)
+
+    # ANALYZE / vacuum / checkpoints in idle windows
+    start_maintenance_scheduler()
+    atexit.register(stop_maintenance_scheduler)
 
-    # Train ML models in background if enabled
-    if config.get("ml", {}).get("retrain_on_startup", True):
-        threading.Thread(target=train_models, daemon=True).start()
+    # Load (and optionally retrain) ML models in the background; imports made
+    # before they are ready fall back to keywords and are re-scored afterwards
+    start_background_load(retrain=config.get("ml", {}).get("retrain_on_startup", True))
 
     # Import Dash app and register all callbacks
     from ui.app import app
@@ -37,6 +132,7 @@ def main():
     import ui.callbacks.suggestion_cb    # noqa: F401
     import ui.callbacks.festival_cb      # noqa: F401
     import ui.callbacks.settings_cb      # noqa: F401
+    import ui.routes                     # noqa: F401
 
     server_cfg = config.get("server", {})
     logger.info(
@@ -2,24 +2,21 @@ import numpy as np
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 
-from core.database import execute_query
+from core.analytics_backend import analytics_read
+from core.cache import cached
 from core.logger import setup_logger
 
 logger = setup_logger("pfa.analytics")
 
 
+@cached("transactions")
 def get_monthly_trends() -> List[Dict]:
     """Monthly income, expenses, savings with rolling averages."""
-    rows = execute_query(
-        """SELECT
-             substr(date, 1, 7) as month,
-             SUM(CASE WHEN transaction_type='Credit' THEN amount ELSE 0 END) as income,
-             SUM(CASE WHEN transaction_type='Debit' AND is_saving=0 THEN amount ELSE 0 END) as expenses,
-             SUM(CASE WHEN is_saving=1 THEN amount ELSE 0 END) as savings
-           FROM daily_transactions
-           GROUP BY substr(date, 1, 7)
+    rows = analytics_read(
+        """SELECT month, total_income as income, total_expenses as expenses,
+                  total_savings as savings
+           FROM monthly_summary
            ORDER BY month""",
-        fetch=True,
     )
     if not rows:
         return []
@@ -40,20 +37,17 @@ def get_monthly_trends() -> List[Dict]:
     return data
 
 
+@cached("transactions")
 def detect_anomalies(threshold_factor: float = 1.5) -> List[Dict]:
     """
     Find months where category spending spiked above threshold_factor * average.
     """
-    rows = execute_query(
-        """SELECT
-             substr(date, 1, 7) as month,
-             category,
-             SUM(amount) as total
-           FROM daily_transactions
+    rows = analytics_read(
+        """SELECT year_month as month, NULLIF(category, '') as category, SUM(total) as total
+           FROM category_monthly
            WHERE transaction_type = 'Debit'
-           GROUP BY substr(date, 1, 7), category
-           ORDER BY month""",
-        fetch=True,
+           GROUP BY year_month, category
+           ORDER BY year_month, category""",
     )
     if not rows:
         return []
@@ -84,19 +78,15 @@ def detect_anomalies(threshold_factor: float = 1.5) -> List[Dict]:
     return anomalies
 
 
+@cached("transactions")
 def forecast_next_month() -> Dict:
     """
     Simple linear trend forecast for next month's expenses and income.
     """
-    rows = execute_query(
-        """SELECT
-             substr(date, 1, 7) as month,
-             SUM(CASE WHEN transaction_type='Credit' THEN amount ELSE 0 END) as income,
-             SUM(CASE WHEN transaction_type='Debit' THEN amount ELSE 0 END) as expenses
-           FROM daily_transactions
-           GROUP BY substr(date, 1, 7)
+    rows = analytics_read(
+        """SELECT month, total_income as income, total_debits as expenses
+           FROM monthly_summary
            ORDER BY month""",
-        fetch=True,
     )
     if not rows or len(rows) < 2:
         return {"error": "Need at least 2 months of data for forecasting"}
@@ -127,19 +117,23 @@ def forecast_next_month() -> Dict:
     }
 
 
+@cached("transactions")
+def get_category_monthly_totals() -> List[Dict]:
+    """Debit totals per month and (known) category, oldest month first."""
+    rows = analytics_read(
+        """SELECT year_month as month, category, SUM(total) as total
+           FROM category_monthly
+           WHERE transaction_type = 'Debit' AND category != ''
+           GROUP BY year_month, category
+           ORDER BY year_month, category""",
+    )
+    return [dict(r) for r in rows] if rows else []
+
+
+@cached("transactions")
 def get_category_growth_rates() -> List[Dict]:
     """Identify which expense categories are growing fastest."""
-    rows = execute_query(
-        """SELECT
-             substr(date, 1, 7) as month,
-             category,
-             SUM(amount) as total
-           FROM daily_transactions
-           WHERE transaction_type = 'Debit' AND category IS NOT NULL
-           GROUP BY substr(date, 1, 7), category
-           ORDER BY month""",
-        fetch=True,
-    )
+    rows = get_category_monthly_totals()
     if not rows:
         return []
 
@@ -167,19 +161,19 @@ def get_category_growth_rates() -> List[Dict]:
     return growth_rates
 
 
+@cached("transactions")
 def get_seasonal_patterns() -> List[Dict]:
     """Identify spending patterns by calendar month across years."""
-    rows = execute_query(
+    rows = analytics_read(
         """SELECT
-             CAST(substr(date, 6, 2) AS INTEGER) as cal_month,
-             AVG(amount) as avg_daily_spend,
-             SUM(amount) as total_spend,
-             COUNT(*) as txn_count
-           FROM daily_transactions
-           WHERE transaction_type = 'Debit'
-           GROUP BY CAST(substr(date, 6, 2) AS INTEGER)
+             CAST(substr(month, 6, 2) AS INTEGER) as cal_month,
+             SUM(total_debits) * 1.0 / SUM(debit_count) as avg_daily_spend,
+             SUM(total_debits) as total_spend,
+             SUM(debit_count) as txn_count
+           FROM monthly_summary
+           WHERE debit_count > 0
+           GROUP BY cal_month
            ORDER BY cal_month""",
-        fetch=True,
     )
     if not rows:
         return []
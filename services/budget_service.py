@@ -1,35 +1,40 @@
 from datetime import datetime
 from typing import List, Dict, Optional
 
-from core.database import execute_query
+from core.cache import cached
+from core.database import execute_query, execute_read, transaction
 from core.logger import setup_logger
+from core.writer import write_operation
 
 logger = setup_logger("pfa.budget")
 
 
+@write_operation
 def set_budget(category: str, monthly_limit: float):
     now = datetime.now().isoformat()
-    existing = execute_query(
-        "SELECT id FROM budgets WHERE category = ?", (category,), fetch=True
-    )
-    if existing:
-        execute_query(
-            "UPDATE budgets SET monthly_limit = ?, updated_at = ? WHERE category = ?",
-            (monthly_limit, now, category),
-        )
-    else:
-        execute_query(
-            "INSERT INTO budgets (category, monthly_limit, created_at, updated_at) VALUES (?, ?, ?, ?)",
-            (category, monthly_limit, now, now),
+    with transaction():
+        existing = execute_read(
+            "SELECT id FROM budgets WHERE category = ?", (category,),
         )
+        if existing:
+            execute_query(
+                "UPDATE budgets SET monthly_limit = ?, updated_at = ? WHERE category = ?",
+                (monthly_limit, now, category),
+            )
+        else:
+            execute_query(
+                "INSERT INTO budgets (category, monthly_limit, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (category, monthly_limit, now, now),
+            )
     logger.info("Budget set: %s = %.2f", category, monthly_limit)
 
 
 def get_all_budgets() -> List[Dict]:
-    rows = execute_query("SELECT * FROM budgets ORDER BY category", fetch=True)
+    rows = execute_read("SELECT * FROM budgets ORDER BY category")
     return [dict(r) for r in rows] if rows else []
 
 
+@write_operation
 def delete_budget(category: str):
     execute_query("DELETE FROM budgets WHERE category = ?", (category,))
 
@@ -41,21 +46,27 @@ def get_budget_vs_actual(month: Optional[str] = None) -> List[Dict]:
     """
     if not month:
         month = datetime.now().strftime("%Y-%m")
+    # Resolve the default month first so the cache key names a concrete month.
+    return _budget_vs_actual(month)
+
 
-    budgets = execute_query("SELECT category, monthly_limit FROM budgets", fetch=True)
+@cached("transactions", "budgets")
+def _budget_vs_actual(month: str) -> List[Dict]:
+    budgets = execute_read("SELECT category, monthly_limit FROM budgets")
     if not budgets:
         return []
 
+    actual_rows = execute_read(
+        """SELECT category, SUM(total) as spent FROM category_monthly
+           WHERE year_month = ? AND transaction_type = 'Debit'
+           GROUP BY category""",
+        (month,),
+    )
+    actual = {r["category"]: r["spent"] for r in actual_rows or []}
+
     results = []
     for b in budgets:
-        actual_rows = execute_query(
-            """SELECT SUM(amount) as spent FROM daily_transactions
-               WHERE category = ? AND transaction_type = 'Debit'
-               AND date LIKE ?""",
-            (b["category"], f"{month}%"),
-            fetch=True,
-        )
-        spent = actual_rows[0]["spent"] if actual_rows and actual_rows[0]["spent"] else 0
+        spent = actual.get(b["category"]) or 0
 
         limit = b["monthly_limit"]
         results.append({
@@ -1,21 +1,24 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import List, Dict
 
-from core.database import execute_query
+from core.daily_series import date_span, range_totals
+from core.database import execute_query, execute_read
 from core.config import get_config
+from core.cache import cached
 from core.logger import setup_logger
+from core.writer import write_operation
 
 logger = setup_logger("pfa.festivals")
 
 
 def get_all_festivals() -> List[Dict]:
-    rows = execute_query(
+    rows = execute_read(
         "SELECT * FROM festivals WHERE is_active = 1 ORDER BY month, day",
-        fetch=True,
     )
     return [dict(r) for r in rows] if rows else []
 
 
+@write_operation
 def add_festival(name: str, month: int, day: int, duration_days: int = 1):
     execute_query(
         "INSERT INTO festivals (name, month, day, duration_days) VALUES (?, ?, ?, ?)",
@@ -24,6 +27,7 @@ def add_festival(name: str, month: int, day: int, duration_days: int = 1):
     logger.info("Festival added: %s (%d/%d)", name, day, month)
 
 
+@write_operation
 def remove_festival(festival_id: int):
     execute_query("UPDATE festivals SET is_active = 0 WHERE id = ?", (festival_id,))
 
@@ -52,7 +56,8 @@ def get_upcoming_festivals(days_ahead: int = None) -> List[Dict]:
         days_until = (festival_date - today).days
 
         if 0 <= days_until <= days_ahead:
-            historical = _get_historical_festival_spending(f["name"], f["month"])
+            historical = dict(_get_historical_festival_spending(f["name"], f["month"]))
+            historical["window_spend"] = _get_festival_window_spending(f["month"], f["day"], f["duration_days"])
             upcoming.append({
                 "name": f["name"],
                 "date": festival_date.strftime("%Y-%m-%d"),
@@ -60,6 +65,7 @@ def get_upcoming_festivals(days_ahead: int = None) -> List[Dict]:
                 "duration_days": f["duration_days"],
                 "historical_avg_spend": historical["avg_spend"],
                 "suggested_saving": historical["suggested_saving"],
+                "window_avg_spend": historical["window_spend"],
                 "message": _build_alert_message(f["name"], days_until, historical),
             })
 
@@ -67,30 +73,20 @@ def get_upcoming_festivals(days_ahead: int = None) -> List[Dict]:
     return upcoming
 
 
+@cached("transactions")
 def _get_historical_festival_spending(festival_name: str, festival_month: int) -> Dict:
     """Analyze past spending during the festival month vs normal months."""
     # Get average spending in the festival month
-    festival_rows = execute_query(
-        """SELECT AVG(monthly_total) as avg_spend FROM (
-               SELECT substr(date, 1, 7) as month, SUM(amount) as monthly_total
-               FROM daily_transactions
-               WHERE transaction_type = 'Debit'
-                 AND CAST(substr(date, 6, 2) AS INTEGER) = ?
-               GROUP BY substr(date, 1, 7)
-           )""",
+    festival_rows = execute_read(
+        """SELECT AVG(total_debits) as avg_spend FROM monthly_summary
+           WHERE debit_count > 0 AND CAST(substr(month, 6, 2) AS INTEGER) = ?""",
         (festival_month,),
-        fetch=True,
     )
 
     # Get average spending across all months
-    overall_rows = execute_query(
-        """SELECT AVG(monthly_total) as avg_spend FROM (
-               SELECT substr(date, 1, 7) as month, SUM(amount) as monthly_total
-               FROM daily_transactions
-               WHERE transaction_type = 'Debit'
-               GROUP BY substr(date, 1, 7)
-           )""",
-        fetch=True,
+    overall_rows = execute_read(
+        """SELECT AVG(total_debits) as avg_spend FROM monthly_summary
+           WHERE debit_count > 0""",
     )
 
     festival_avg = festival_rows[0]["avg_spend"] if festival_rows and festival_rows[0]["avg_spend"] else 0
@@ -106,6 +102,27 @@ def _get_historical_festival_spending(festival_name: str, festival_month: int) -
     }
 
 
+@cached("transactions")
+def _get_festival_window_spending(month: int, day: int, duration_days: int) -> float:
+    """Average spend over the festival's own days, across past years with data for them."""
+    span = date_span()
+    if span is None:
+        return 0.0
+    windows = []
+    for year in range(int(span[0][:4]), int(span[1][:4]) + 1):
+        try:
+            start = date(year, month, day)
+        except ValueError:
+            continue
+        end = start + timedelta(days=max(duration_days or 1, 1) - 1)
+        if span[0] <= start.isoformat() and end.isoformat() <= span[1]:
+            windows.append((start, end))
+    if not windows:
+        return 0.0
+    # Every year's window from the daily prefix sums in one step
+    return round(float(range_totals(windows).mean()), 2)
+
+
 def _build_alert_message(name: str, days_until: int, historical: Dict) -> str:
     cfg = get_config()
     symbol = cfg.get("currency", {}).get("symbol", "\u20B9")
@@ -131,27 +148,28 @@ def _build_alert_message(name: str, days_until: int, historical: Dict) -> str:
             )
         else:
             msg += "."
+        if historical.get("window_spend", 0) > 0:
+            msg += f" The festival days themselves averaged {symbol}{historical['window_spend']:,.0f}."
     else:
         msg += " Plan ahead and set aside some extra savings for festive expenses."
 
     return msg
 
 
+@cached("transactions", "festivals")
 def get_festive_spending_analysis() -> List[Dict]:
     """Compare spending in festive months vs non-festive months."""
     festivals = get_all_festivals()
     festive_months = set(f["month"] for f in festivals)
 
-    rows = execute_query(
+    rows = execute_read(
         """SELECT
-             CAST(substr(date, 6, 2) AS INTEGER) as cal_month,
-             substr(date, 1, 7) as year_month,
-             SUM(amount) as total_spend
-           FROM daily_transactions
-           WHERE transaction_type = 'Debit'
-           GROUP BY substr(date, 1, 7)
-           ORDER BY year_month""",
-        fetch=True,
+             CAST(substr(month, 6, 2) AS INTEGER) as cal_month,
+             month as year_month,
+             total_debits as total_spend
+           FROM monthly_summary
+           WHERE debit_count > 0
+           ORDER BY month""",
     )
     if not rows:
         return []
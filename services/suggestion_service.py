@@ -1,7 +1,9 @@
 from typing import List, Dict
 from datetime import datetime
 
-from core.database import execute_query
+from core.archive import execute_history
+from core.database import execute_read
+from core.cache import cached
 from core.logger import setup_logger
 from services.budget_service import get_budget_vs_actual
 
@@ -61,30 +63,31 @@ CATEGORY_TIPS = {
 }
 
 
+@cached("transactions")
 def get_top_discretionary_spending(months: int = 3) -> List[Dict]:
     """Identify top discretionary spending categories."""
     placeholders = ",".join(["?"] * len(DISCRETIONARY_CATEGORIES))
-    rows = execute_query(
-        f"""SELECT category, SUM(amount) as total, COUNT(*) as txn_count,
-               AVG(amount) as avg_amount
-           FROM daily_transactions
+    rows = execute_read(
+        f"""SELECT category, SUM(total) as total, SUM(txn_count) as txn_count,
+               SUM(total) / SUM(txn_count) as avg_amount
+           FROM category_monthly
            WHERE transaction_type = 'Debit'
              AND category IN ({placeholders})
            GROUP BY category
            ORDER BY total DESC""",
         tuple(DISCRETIONARY_CATEGORIES),
-        fetch=True,
     )
     return [dict(r) for r in rows] if rows else []
 
 
+@cached("transactions")
 def get_subscription_audit() -> List[Dict]:
     """Identify recurring subscription-like transactions."""
-    rows = execute_query(
+    rows = execute_history(
         """SELECT description, COUNT(*) as occurrences,
                SUM(amount) as total_spent, AVG(amount) as avg_amount,
                MIN(date) as first_seen, MAX(date) as last_seen
-           FROM daily_transactions
+           FROM {transactions}
            WHERE transaction_type = 'Debit'
              AND (category = 'Subscriptions'
                   OR description LIKE '%SUBSCRIPTION%'
@@ -92,7 +95,6 @@ def get_subscription_audit() -> List[Dict]:
            GROUP BY description
            HAVING COUNT(*) >= 2
            ORDER BY total_spent DESC""",
-        fetch=True,
     )
     results = []
     for r in rows:
@@ -102,18 +104,14 @@ def get_subscription_audit() -> List[Dict]:
     return results
 
 
+@cached("transactions")
 def what_if_calculator(category: str, reduction_pct: float) -> Dict:
     """Calculate savings if spending in a category is reduced by X%."""
-    rows = execute_query(
-        """SELECT SUM(amount) as total, COUNT(*) as months
-           FROM (
-               SELECT substr(date, 1, 7) as month, SUM(amount) as amount
-               FROM daily_transactions
-               WHERE transaction_type = 'Debit' AND category = ?
-               GROUP BY substr(date, 1, 7)
-           )""",
+    rows = execute_read(
+        """SELECT SUM(total) as total, COUNT(DISTINCT year_month) as months
+           FROM category_monthly
+           WHERE transaction_type = 'Debit' AND category = ?""",
         (category,),
-        fetch=True,
     )
     if not rows or not rows[0]["total"]:
         return {"error": f"No spending data found for {category}"}
@@ -133,15 +131,13 @@ def what_if_calculator(category: str, reduction_pct: float) -> Dict:
     }
 
 
+@cached("transactions")
 def get_spending_ratio_analysis() -> Dict:
     """Compare actual spending split against 50/30/20 rule."""
-    rows = execute_query(
-        """SELECT
-             SUM(CASE WHEN transaction_type='Credit' THEN amount ELSE 0 END) as income,
-             SUM(CASE WHEN transaction_type='Debit' AND is_saving=0 THEN amount ELSE 0 END) as expenses,
-             SUM(CASE WHEN is_saving=1 THEN amount ELSE 0 END) as savings
-           FROM daily_transactions""",
-        fetch=True,
+    rows = execute_read(
+        """SELECT SUM(total_income) as income, SUM(total_expenses) as expenses,
+                  SUM(total_savings) as savings
+           FROM monthly_summary""",
     )
     if not rows or not rows[0]["income"]:
         return {"error": "No transaction data available"}
@@ -152,12 +148,11 @@ def get_spending_ratio_analysis() -> Dict:
 
     # Classify expenses into needs vs wants
     needs_cats = ",".join(["?"] * len(NEEDS_CATEGORIES))
-    needs_rows = execute_query(
-        f"""SELECT SUM(amount) as total FROM daily_transactions
+    needs_rows = execute_read(
+        f"""SELECT SUM(total) as total FROM category_monthly
            WHERE transaction_type='Debit' AND is_saving=0
            AND category IN ({needs_cats})""",
         tuple(NEEDS_CATEGORIES),
-        fetch=True,
     )
     needs = needs_rows[0]["total"] if needs_rows and needs_rows[0]["total"] else 0
     wants = expenses - needs
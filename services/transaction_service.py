@@ -1,12 +1,19 @@
 import re
-import hashlib
 from datetime import datetime
 from typing import Optional, Tuple, List, Dict
 
 import pandas as pd
 
-from core.database import execute_query, get_db
+from core.daily_series import daily_totals, date_span
+from core.database import execute_query, execute_read, execute_read_on, transaction
+from core.maintenance import ingestion_job
+from core.profiles import bind_profile
+from core.hashing import hash_hex, hash_key, transaction_hash
+from core.interning import intern_description, intern_merchant, normalize_merchant
+from core.archive import archived_years, execute_history, find_archived_hashes, history_sources
+from core.cache import cached
 from core.logger import setup_logger
+from core.writer import write_operation
 from models.keywords import (
     INCOME_KEYWORDS,
     EXPENSE_KEYWORDS,
@@ -17,21 +24,39 @@ from models.ml_models import (
     predict_expense_category,
     predict_savings_category,
     train_models,
+    models_ready,
+    on_models_ready,
 )
+from models.similarity import suggest_categories
+from models.drift import record_feedback
 from core.config import get_config
 
 logger = setup_logger("pfa.transactions")
 
 
 def preprocess_description(desc: str) -> str:
-    desc = (desc or "").upper()
-    desc = re.sub(r"-\d{6,}", "", desc)
-    return " ".join(desc.split())
+    return normalize_merchant(desc)
+
+
+def _month_bounds(month: str) -> Tuple[str, str]:
+    """Half-open ISO date range [first day, first day of next month) for YYYY-MM."""
+    year, mon = int(month[:4]), int(month[5:7])
+    next_year, next_mon = (year + 1, 1) if mon == 12 else (year, mon + 1)
+    return f"{year:04d}-{mon:02d}-01", f"{next_year:04d}-{next_mon:02d}-01"
 
 
 def _compute_hash(date, description, amount, txn_type):
-    raw = f"{date}|{description}|{amount}|{txn_type}"
-    return hashlib.sha256(raw.encode()).hexdigest()
+    return transaction_hash(date, description, amount, txn_type)
+
+
+def _rows_out(rows):
+    """Rows as dicts with the binary hash as hex, safe to hand to the UI."""
+    out = []
+    for r in rows or []:
+        row = dict(r)
+        row["hash"] = hash_hex(row.get("hash"))
+        out.append(row)
+    return out
 
 
 def label_with_keywords(description: str) -> Tuple[Optional[str], Optional[str]]:
@@ -57,10 +82,12 @@ def _parse_date(date_str: str) -> str:
     return str(date_str).strip()
 
 
-def classify_transaction(description: str, amount: float, is_credit: bool):
+def classify_with_prediction(description: str, amount: float, is_credit: bool) -> Dict:
     """
-    Classify a single transaction.
-    Returns (transaction_type, category, is_saving).
+    Classify a single transaction, keeping the guess behind the result.
+    Returns a dict with transaction_type, category and is_saving, plus
+    predicted_category / predicted_confidence / prediction_source describing
+    the raw keyword or ML guess (kept even when below the confidence threshold).
     """
     cfg = get_config()
     threshold = cfg.get("ml", {}).get("confidence_threshold", 0.7)
@@ -68,10 +95,17 @@ def classify_transaction(description: str, amount: float, is_credit: bool):
 
     if is_credit:
         _, category = label_with_keywords(processed)
-        return "Credit", category, 0
+        return {
+            "transaction_type": "Credit", "category": category, "is_saving": 0,
+            "predicted_category": category,
+            "predicted_confidence": 1.0 if category else None,
+            "prediction_source": "keyword" if category else None,
+        }
 
     # Debit — determine type
     debit_type, category = label_with_keywords(processed)
+    source = "keyword" if category else None
+    pred, conf = category, (1.0 if category else None)
 
     if not debit_type:
         ml_type, ml_conf = predict_debit_type(processed)
@@ -92,10 +126,72 @@ def classify_transaction(description: str, amount: float, is_credit: bool):
             pred, conf = predict_expense_category(processed)
             if pred and conf > threshold:
                 category = pred
+    if not source and pred:
+        source = "ml"
 
-    return "Debit", category, is_saving
+    return {
+        "transaction_type": "Debit", "category": category, "is_saving": is_saving,
+        "predicted_category": pred, "predicted_confidence": conf, "prediction_source": source,
+    }
+
+
+def classify_transaction(description: str, amount: float, is_credit: bool):
+    """
+    Classify a single transaction.
+    Returns (transaction_type, category, is_saving).
+    """
+    result = classify_with_prediction(description, amount, is_credit)
+    return result["transaction_type"], result["category"], result["is_saving"]
 
 
+@write_operation
+def _store_parsed_rows(parsed):
+    """Insert classified CSV rows as one unit of work: the file lands completely or not at all."""
+    inserted = 0
+    skipped = 0
+    uncategorized = []
+    description_ids = {}
+    with transaction() as conn:
+        for date, description_raw, processed, amount, result, pending_ml, txn_hash in parsed:
+            txn_type, category, is_saving = result["transaction_type"], result["category"], result["is_saving"]
+
+            if description_raw not in description_ids:
+                description_ids[description_raw] = intern_description(conn, description_raw)
+            # The UNIQUE hash index skips rows already stored or repeated within this file
+            if not execute_query(
+                """INSERT INTO transaction_rows
+                   (date, description_id, amount, transaction_type, category, is_saving, uploaded_at, hash,
+                    pending_ml, predicted_category, predicted_is_saving, predicted_confidence,
+                    prediction_source)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (hash) DO NOTHING RETURNING id""",
+                (date, description_ids[description_raw], amount, txn_type, category, is_saving,
+                 datetime.now().isoformat(), txn_hash, pending_ml, result["predicted_category"],
+                 is_saving, result["predicted_confidence"], result["prediction_source"]),
+                fetch=True,
+            ):
+                skipped += 1
+                continue
+
+            if category:
+                execute_query(
+                    "INSERT INTO training_rows (merchant_id, category) VALUES (?, ?)",
+                    (intern_merchant(conn, processed), category),
+                )
+
+            if not category:
+                uncategorized.append({
+                    "description": description_raw,
+                    "amount": amount,
+                    "type": txn_type,
+                    "hash": hash_hex(txn_hash),
+                })
+
+            inserted += 1
+    return inserted, skipped, uncategorized
+
+
+@ingestion_job()
 def ingest_csv(file_content: bytes, filename: str) -> Dict:
     """
     Parse and ingest a bank statement CSV.
@@ -113,11 +209,10 @@ def ingest_csv(file_content: bytes, filename: str) -> Dict:
     df["Debit Amount"] = pd.to_numeric(df["Debit Amount"], errors="coerce").fillna(0.0)
     df["Credit Amount"] = pd.to_numeric(df["Credit Amount"], errors="coerce").fillna(0.0)
 
-    inserted = 0
-    skipped = 0
-    uncategorized = []
-
+    # Classify first so the write transaction holds the lock only for inserts
+    parsed = []
     for _, row in df.iterrows():
+        ml_available = models_ready()
         description_raw = str(row["Narration"])
         processed = preprocess_description(description_raw)
         date = _parse_date(row["Date"])
@@ -131,47 +226,30 @@ def ingest_csv(file_content: bytes, filename: str) -> Dict:
         else:
             continue
 
-        txn_type, category, is_saving = classify_transaction(description_raw, amount, is_credit)
-        txn_hash = _compute_hash(date, processed, amount, txn_type)
-
-        # Check duplicate
-        existing = execute_query(
-            "SELECT id FROM daily_transactions WHERE hash = ?",
-            (txn_hash,),
-            fetch=True,
-        )
-        if existing:
-            skipped += 1
-            continue
-
-        execute_query(
-            """INSERT INTO daily_transactions
-               (date, description, amount, transaction_type, category, is_saving, uploaded_at, hash)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-            (date, description_raw, amount, txn_type, category, is_saving,
-             datetime.now().isoformat(), txn_hash),
-        )
+        result = classify_with_prediction(description_raw, amount, is_credit)
+        # Keyword-only result for a debit the ML models never saw: re-score once they load
+        pending_ml = 0 if (is_credit or result["category"] or ml_available) else 1
+        txn_hash = _compute_hash(date, processed, amount, result["transaction_type"])
+        parsed.append((date, description_raw, processed, amount, result, pending_ml, txn_hash))
 
-        if category:
-            execute_query(
-                "INSERT INTO training_data (description, category) VALUES (?, ?)",
-                (processed, category),
-            )
+    # Rows from archived years are deduplicated against their archive files
+    archived = archived_years()
+    already_archived = find_archived_hashes(
+        p[-1] for p in parsed if archived and int(p[0][:4]) in archived
+    )
+    parsed = [p for p in parsed if p[-1] not in already_archived]
 
-        if not category:
-            uncategorized.append({
-                "description": description_raw,
-                "amount": amount,
-                "type": txn_type,
-                "hash": txn_hash,
-            })
+    inserted, skipped, uncategorized = _store_parsed_rows(parsed)
+    skipped += len(already_archived)
 
-        inserted += 1
+    # Rows classified while the models were still loading
+    if models_ready():
+        rescore_pending_transactions()
 
     # Background retrain
     if inserted > 0:
         import threading
-        threading.Thread(target=train_models, daemon=True).start()
+        threading.Thread(target=bind_profile(train_models), daemon=True).start()
 
     logger.info("CSV ingested: %d inserted, %d skipped (duplicate)", inserted, skipped)
     return {
@@ -182,65 +260,184 @@ def ingest_csv(file_content: bytes, filename: str) -> Dict:
     }
 
 
-def update_transaction_category(txn_hash: str, category: str, is_saving: int = 0):
-    """Update category for a transaction and add training data."""
-    execute_query(
-        "UPDATE daily_transactions SET category = ?, is_saving = ? WHERE hash = ?",
-        (category, is_saving, txn_hash),
-    )
-    rows = execute_query(
-        "SELECT description FROM daily_transactions WHERE hash = ?",
-        (txn_hash,),
-        fetch=True,
+def rescore_pending_transactions() -> int:
+    """Re-classify rows that were ingested before the ML models were available."""
+    rows = execute_read(
+        """SELECT id, description, amount FROM daily_transactions
+           WHERE pending_ml = 1 AND category IS NULL""",
     )
+    results = [classify_with_prediction(r["description"], r["amount"], False) for r in rows or []]
+    rescored = _apply_rescores(rows or [], results)
     if rows:
-        processed = preprocess_description(rows[0]["description"])
+        logger.info("Re-scored %d of %d pending transactions", rescored, len(rows))
+    return rescored
+
+
+@write_operation
+def _apply_rescores(rows, results) -> int:
+    rescored = 0
+    with transaction() as conn:
+        for row, result in zip(rows or [], results):
+            category, is_saving = result["category"], result["is_saving"]
+            cursor = conn.execute(
+                """UPDATE transaction_rows
+                   SET category = ?, is_saving = ?, pending_ml = 0, predicted_category = ?,
+                       predicted_is_saving = ?, predicted_confidence = ?, prediction_source = ?
+                   WHERE id = ? AND pending_ml = 1""",
+                (category, is_saving, result["predicted_category"], is_saving,
+                 result["predicted_confidence"], result["prediction_source"], row["id"]),
+            )
+            if cursor.rowcount and category:
+                conn.execute(
+                    "INSERT INTO training_rows (merchant_id, category) VALUES (?, ?)",
+                    (intern_merchant(conn, preprocess_description(row["description"])), category),
+                )
+                rescored += 1
+    return rescored
+
+
+on_models_ready(rescore_pending_transactions)
+
+
+@write_operation
+def update_transaction_category(txn_hash: str, category: str, is_saving: int = 0):
+    """Update category for a transaction, add training data and record model feedback."""
+    txn_hash = hash_key(txn_hash)
+    with transaction():
+        rows = execute_read(
+            """SELECT description, merchant_id, transaction_type, predicted_category,
+                      predicted_is_saving, prediction_source, prediction_reviewed
+               FROM daily_transactions WHERE hash = ?""",
+            (txn_hash,),
+        )
         execute_query(
-            "INSERT INTO training_data (description, category) VALUES (?, ?)",
-            (processed, category),
+            """UPDATE transaction_rows SET category = ?, is_saving = ?, prediction_reviewed = 1
+               WHERE hash = ?""",
+            (category, is_saving, txn_hash),
         )
-    logger.info("Transaction %s categorized as %s", txn_hash[:8], category)
+        if rows:
+            # The row's merchant is its processed description
+            execute_query(
+                "INSERT INTO training_rows (merchant_id, category) VALUES (?, ?)",
+                (rows[0]["merchant_id"], category),
+            )
+            # Only the first review of a row says anything about the original guess
+            if not rows[0]["prediction_reviewed"]:
+                record_feedback(dict(rows[0]), category, is_saving)
+    logger.info("Transaction %s categorized as %s", hash_hex(txn_hash)[:8], category)
 
 
 def get_all_transactions(limit=500, offset=0):
-    rows = execute_query(
+    rows = execute_history(
         """SELECT id, date, description, amount, transaction_type, category, is_saving, uploaded_at, hash
-           FROM daily_transactions ORDER BY date DESC LIMIT ? OFFSET ?""",
+           FROM {transactions} ORDER BY date DESC LIMIT ? OFFSET ?""",
         (limit, offset),
-        fetch=True,
     )
-    return [dict(r) for r in rows] if rows else []
+    return _rows_out(rows)
 
 
 def get_uncategorized_transactions():
-    rows = execute_query(
+    rows = execute_read(
         """SELECT id, date, description, amount, transaction_type, is_saving, hash
            FROM daily_transactions WHERE category IS NULL ORDER BY date DESC""",
-        fetch=True,
     )
-    return [dict(r) for r in rows] if rows else []
+    return _rows_out(rows)
+
+
+def get_uncategorized_with_suggestions(k: Optional[int] = None):
+    """Uncategorized transactions, each with the categories of its nearest labeled neighbours."""
+    txns = get_uncategorized_transactions()
+    processed = [preprocess_description(t["description"]) for t in txns]
+    for txn, cats in zip(txns, suggest_categories(processed, k)):
+        txn["suggested_categories"] = cats
+    return txns
 
 
 def get_transactions_by_month(month: str):
     """month in format YYYY-MM"""
-    rows = execute_query(
-        """SELECT * FROM daily_transactions WHERE date LIKE ? ORDER BY date""",
-        (f"{month}%",),
-        fetch=True,
+    rows = execute_history(
+        """SELECT * FROM {transactions} WHERE date >= ? AND date < ? ORDER BY date""",
+        _month_bounds(month),
     )
-    return [dict(r) for r in rows] if rows else []
+    return _rows_out(rows)
+
 
+_SEARCH_TERM = re.compile(r'"([^"]*)"|(\S+)')
 
+
+def _fts_query(text: str) -> str:
+    """
+    Turn search-box text into an FTS5 MATCH expression: "quoted text" is an
+    exact phrase, every other word matches as a prefix, and all terms must match.
+    """
+    terms = []
+    for phrase, word in _SEARCH_TERM.findall(text):
+        tokens = re.findall(r"\w+", phrase or word)
+        if not tokens:
+            continue
+        terms.append('"' + " ".join(tokens) + '"' + ("" if phrase else "*"))
+    return " ".join(terms)
+
+
+def search_transactions(query: str, transaction_type: Optional[str] = None,
+                        category: Optional[str] = None, month: Optional[str] = None,
+                        uncategorized: bool = False, limit: int = 100, offset: int = 0) -> Dict:
+    """
+    Full-text search over all transaction descriptions, best matches first.
+    Returns {"total": matching rows, "results": one page of rows}.
+    """
+    match = _fts_query(query or "")
+    if not match:
+        return {"total": 0, "results": []}
+
+    where = ["f.transactions_fts MATCH ?"]
+    params = [match]
+    if transaction_type:
+        where.append("t.transaction_type = ?")
+        params.append(transaction_type)
+    if uncategorized:
+        where.append("t.category IS NULL")
+    elif category:
+        where.append("t.category = ?")
+        params.append(category)
+    if month:
+        where.append("t.year_month = ?")
+        params.append(month)
+    where_sql = " AND ".join(where)
+
+    # One ranked branch per live/archive database, each with its own index
+    with history_sources() as (conn, schemas):
+        hits = " UNION ALL ".join(
+            f"""SELECT t.id, t.date, t.description, t.amount, t.transaction_type, t.category,
+                       t.is_saving, t.uploaded_at, t.hash, f.rank AS score
+                FROM {schema}.transactions_fts f
+                JOIN {schema}.daily_transactions t ON t.id = f.rowid
+                WHERE {where_sql}"""
+            for schema in schemas
+        )
+        all_params = tuple(params) * len(schemas)
+        total = execute_read_on(conn, f"SELECT COUNT(*) FROM ({hits})", all_params)[0][0]
+        rows = execute_read_on(
+            conn,
+            f"SELECT * FROM ({hits}) ORDER BY score, date DESC LIMIT ? OFFSET ?",
+            all_params + (limit, offset),
+        )
+    results = _rows_out(rows)
+    for row in results:
+        del row["score"]
+    return {"total": total, "results": results}
+
+
+@cached("transactions")
 def get_summary():
     """Get overall totals."""
-    rows = execute_query(
+    rows = execute_read(
         """SELECT
-             SUM(CASE WHEN transaction_type='Credit' THEN amount ELSE 0 END) as total_income,
-             SUM(CASE WHEN transaction_type='Debit' THEN amount ELSE 0 END) as total_expenses,
-             SUM(CASE WHEN is_saving=1 THEN amount ELSE 0 END) as total_savings,
-             COUNT(*) as total_count
-           FROM daily_transactions""",
-        fetch=True,
+             SUM(total_income) as total_income,
+             SUM(total_debits) as total_expenses,
+             SUM(total_savings) as total_savings,
+             SUM(txn_count) as total_count
+           FROM monthly_summary""",
     )
     if rows and rows[0]["total_count"]:
         r = rows[0]
@@ -253,52 +450,46 @@ def get_summary():
     return {"total_income": 0, "total_expenses": 0, "total_savings": 0, "total_count": 0}
 
 
+@cached("transactions")
 def get_monthly_breakdown():
     """Get income/expense/savings broken down by month."""
-    rows = execute_query(
-        """SELECT
-             substr(date, 1, 7) as month,
-             SUM(CASE WHEN transaction_type='Credit' THEN amount ELSE 0 END) as income,
-             SUM(CASE WHEN transaction_type='Debit' AND is_saving=0 THEN amount ELSE 0 END) as expenses,
-             SUM(CASE WHEN is_saving=1 THEN amount ELSE 0 END) as savings
-           FROM daily_transactions
-           GROUP BY substr(date, 1, 7)
+    rows = execute_read(
+        """SELECT month, total_income as income, total_expenses as expenses,
+                  total_savings as savings
+           FROM monthly_summary
            ORDER BY month""",
-        fetch=True,
     )
     return [dict(r) for r in rows] if rows else []
 
 
+@cached("transactions")
 def get_category_breakdown(transaction_type=None):
     """Get spending by category, optionally filtered by type."""
     if transaction_type:
-        rows = execute_query(
-            """SELECT category, SUM(amount) as total
-               FROM daily_transactions WHERE transaction_type = ?
+        rows = execute_read(
+            """SELECT NULLIF(category, '') as category, SUM(total) as total
+               FROM category_monthly WHERE transaction_type = ?
                GROUP BY category ORDER BY total DESC""",
             (transaction_type,),
-            fetch=True,
         )
     else:
-        rows = execute_query(
-            """SELECT category, SUM(amount) as total
-               FROM daily_transactions
+        rows = execute_read(
+            """SELECT NULLIF(category, '') as category, SUM(total) as total
+               FROM category_monthly
                GROUP BY category ORDER BY total DESC""",
-            fetch=True,
         )
     return [dict(r) for r in rows] if rows else []
 
 
+@cached("transactions")
 def get_daily_spending(months_back=3):
     """Get daily total spending for recent months."""
-    rows = execute_query(
-        """SELECT date, SUM(amount) as total
-           FROM daily_transactions
-           WHERE transaction_type = 'Debit'
-           GROUP BY date
-           ORDER BY date DESC
-           LIMIT ?""",
-        (months_back * 31,),
-        fetch=True,
-    )
-    return [dict(r) for r in rows] if rows else []
+    span = date_span("Debit")
+    if span is None:
+        return []
+    dates, totals = daily_totals(*span)
+    days = [
+        {"date": d, "total": round(t, 2)}
+        for d, t in zip(reversed(dates), reversed(totals.tolist())) if round(t, 2)
+    ]
+    return days[:months_back * 31]
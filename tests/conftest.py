@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 import pytest
 
 # Ensure project root is importable
@@ -20,6 +21,12 @@ def test_db(tmp_path, monkeypatch):
         "currency": {"symbol": "\u20B9", "code": "INR", "locale": "en_IN"},
         "ml": {"confidence_threshold": 0.7, "retrain_on_startup": False, "model_save_path": str(tmp_path / "models")},
         "logging": {"level": "WARNING", "file": str(tmp_path / "test.log")},
+        "analytics": {"backend": "sqlite", "mirror_path": str(tmp_path / "analytics_mirror.parquet")},
+        "snapshot": {"directory": str(tmp_path / "snapshots"), "row_group_size": 2},
+        "archive": {"directory": str(tmp_path / "archives")},
+        "profiles": {"directory": str(tmp_path / "profiles"), "max_open": 4},
+        "daily_series": {"persist_path": str(tmp_path / "daily_series.pkl")},
+        "backup": {"directory": str(tmp_path / "backups"), "interval_hours": 0, "keep": 3},
         "budgets": {"default_rule": "50/30/20"},
         "festivals": {
             "alert_days_before": 21,
@@ -34,32 +41,41 @@ def test_db(tmp_path, monkeypatch):
     import core.config
     monkeypatch.setattr(core.config, "_config", test_config)
 
-    # Reset thread-local DB connections
+    # Drop pooled connections from the previous test
     import core.database
-    if hasattr(core.database._local, "connection"):
-        try:
-            core.database._local.connection.close()
-        except Exception:
-            pass
-        core.database._local.connection = None
+    core.database.close_pool()
 
     # Reset ML model state
     import models.ml_models as ml
-    ml._debit_type_model = None
-    ml._expense_model = None
-    ml._savings_model = None
-    ml._vectorizer = None
-    ml._data_hash = None
+    ml.reset_models()
+
+    import models.similarity as similarity
+    similarity.reset_index()
+
+    from core.cache import clear_cache
+    clear_cache()
+
+    from core.query_stats import reset_query_stats
+    reset_query_stats()
+
+    from core.analytics_backend import reset_backend
+    reset_backend()
+
+    from core.daily_series import reset_daily_series
+    reset_daily_series()
 
     from core.database import initialize_database
     initialize_database()
 
     yield db_path
 
+    # Drain the single writer (if a test enabled it), then let background
+    # training/loading threads finish against this test's database
+    from core.writer import stop_writer
+    stop_writer()
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread() and thread.daemon:
+            thread.join(timeout=30)
+
     # Cleanup
-    if hasattr(core.database._local, "connection") and core.database._local.connection:
-        try:
-            core.database._local.connection.close()
-        except Exception:
-            pass
-        core.database._local.connection = None
+    core.database.close_pool()
@@ -0,0 +1,123 @@
+from core.database import execute_query, rebuild_summaries
+
+
+def _insert(date, amount, txn_type, is_saving=0, txn_hash=None):
+    execute_query(
+        """INSERT INTO daily_transactions
+           (date, description, amount, transaction_type, category, is_saving, uploaded_at, hash)
+           VALUES (?, 'TEST', ?, ?, NULL, ?, '2024-01-01T00:00:00', ?)""",
+        (date, amount, txn_type, is_saving, txn_hash or f"{date}|{amount}|{txn_type}"),
+    )
+
+
+def _summary():
+    rows = execute_query("SELECT * FROM monthly_summary ORDER BY month", fetch=True)
+    return {
+        r["month"]: (r["total_income"], r["total_expenses"], r["total_savings"],
+                     r["total_debits"], r["debit_count"], r["txn_count"])
+        for r in rows
+    }
+
+
+def test_summary_tracks_inserts(test_db):
+    _insert("2024-01-05", 50000, "Credit")
+    _insert("2024-01-10", 500, "Debit")
+    _insert("2024-01-20", 5000, "Debit", is_saving=1)
+    _insert("2024-02-01", 300, "Debit")
+
+    assert _summary() == {
+        "2024-01": (50000, 500, 5000, 5500, 2, 3),
+        "2024-02": (0, 300, 0, 300, 1, 1),
+    }
+
+
+def test_summary_tracks_updates_and_deletes(test_db):
+    _insert("2024-01-10", 500, "Debit", txn_hash="a")
+    _insert("2024-02-10", 300, "Debit", txn_hash="b")
+
+    execute_query("UPDATE daily_transactions SET amount = 700, is_saving = 1 WHERE hash = 'a'")
+    execute_query("UPDATE daily_transactions SET date = '2024-01-15' WHERE hash = 'b'")
+    assert _summary() == {"2024-01": (0, 300, 700, 1000, 2, 2)}
+
+    execute_query("DELETE FROM daily_transactions WHERE hash = 'a'")
+    execute_query("DELETE FROM daily_transactions WHERE hash = 'b'")
+    assert _summary() == {}
+
+
+def test_rebuild_matches_incremental(test_db):
+    _insert("2024-01-05", 50000, "Credit")
+    _insert("2024-01-10", 500, "Debit")
+    _insert("2024-03-10", 800, "Debit", is_saving=1)
+    incremental = _summary()
+
+    execute_query("DELETE FROM monthly_summary")
+    rebuild_summaries()
+    assert _summary() == incremental
+
+
+def _cube():
+    rows = execute_query("SELECT * FROM category_monthly", fetch=True)
+    return {
+        (r["year_month"], r["category"], r["transaction_type"], r["is_saving"]):
+            (r["total"], r["txn_count"], r["min_amount"], r["max_amount"])
+        for r in rows
+    }
+
+
+def test_cube_tracks_writes_and_recategorization(test_db):
+    _insert("2024-01-05", 100, "Debit", txn_hash="a")
+    _insert("2024-01-06", 300, "Debit", txn_hash="b")
+    _insert("2024-01-07", 200, "Debit", txn_hash="c")
+    assert _cube() == {("2024-01", "", "Debit", 0): (600, 3, 100, 300)}
+
+    # Moving the max out of a cell re-reads that cell's extremes
+    execute_query("UPDATE daily_transactions SET category = 'Shopping' WHERE hash = 'b'")
+    assert _cube() == {
+        ("2024-01", "", "Debit", 0): (300, 2, 100, 200),
+        ("2024-01", "Shopping", "Debit", 0): (300, 1, 300, 300),
+    }
+
+    execute_query("DELETE FROM daily_transactions WHERE hash = 'a'")
+    execute_query("DELETE FROM daily_transactions WHERE hash = 'b'")
+    assert _cube() == {("2024-01", "", "Debit", 0): (200, 1, 200, 200)}
+
+
+def test_cube_rebuild_matches_incremental(test_db):
+    _insert("2024-01-05", 100, "Debit", txn_hash="a")
+    _insert("2024-01-06", 300, "Debit", is_saving=1, txn_hash="b")
+    _insert("2024-02-07", 900, "Credit", txn_hash="c")
+    execute_query("UPDATE daily_transactions SET category = 'Rent', amount = 150 WHERE hash = 'a'")
+    incremental = _cube()
+
+    execute_query("DELETE FROM category_monthly")
+    rebuild_summaries()
+    assert _cube() == incremental
+
+
+def _last_seq():
+    return execute_query("SELECT MAX(seq) AS s FROM daily_totals", fetch=True)[0]["s"]
+
+
+def test_rollup_triggers_skip_unchanged_columns(test_db):
+    _insert("2024-01-10", 500, "Debit")
+    seq = _last_seq()
+
+    # Rewrites every column through the view, but none the rollups read
+    execute_query("UPDATE daily_transactions SET prediction_reviewed = 1")
+    assert _last_seq() == seq
+
+    execute_query("UPDATE daily_transactions SET category = 'Shopping'")
+    assert _last_seq() > seq
+    cube = execute_query("SELECT category, total FROM category_monthly", fetch=True)
+    assert [(r["category"], r["total"]) for r in cube] == [("Shopping", 500)]
+
+
+def test_rollup_triggers_name_the_physical_table(test_db):
+    rows = execute_query(
+        "SELECT name, tbl_name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_%'",
+        fetch=True,
+    )
+    for r in rows:
+        if r["name"].split("_")[1] in ("summary", "cube", "daily", "fts"):
+            assert r["tbl_name"] == "transaction_rows"
+            assert "daily_transactions" not in r["sql"]
@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+
+pytest.importorskip("duckdb")
+pytest.importorskip("pyarrow")
+
+import core.config  # noqa: E402
+from core.analytics_backend import backend, sync_mirror  # noqa: E402
+from core.cache import clear_cache  # noqa: E402
+from core.database import execute_query  # noqa: E402
+from services.analytics import (  # noqa: E402
+    detect_anomalies,
+    forecast_next_month,
+    get_category_growth_rates,
+    get_category_monthly_totals,
+    get_monthly_trends,
+    get_seasonal_patterns,
+)
+from services.transaction_service import ingest_csv  # noqa: E402
+
+CSV = b"""Date,Narration,Debit Amount,Credit Amount
+2024-01-05,SALARY CREDIT,0,50000
+2024-01-10,ZOMATO ORDER,500,0
+2024-01-15,AMAZON PURCHASE,3000,0
+2024-01-20,SIP MUTUAL FUND,5000,0
+2024-01-22,UNKNOWN MERCHANT XYZ,150,0
+2024-02-05,SALARY CREDIT,0,52000
+2024-02-10,SWIGGY ORDER,600,0
+2024-02-15,FLIPKART PURCHASE,9000,0
+2024-02-20,SIP MUTUAL FUND,5000,0
+2024-03-05,SALARY CREDIT,0,53000
+2024-03-10,ZOMATO ORDER,800,0
+2024-03-15,AMAZON PURCHASE,2000,0
+2024-03-20,SIP MUTUAL FUND,5000,0
+"""
+
+ANALYTICS = (
+    get_monthly_trends, detect_anomalies, forecast_next_month,
+    get_category_monthly_totals, get_category_growth_rates, get_seasonal_patterns,
+)
+
+
+def _use_backend(name):
+    core.config.get_config()["analytics"]["backend"] = name
+    clear_cache()
+
+
+def test_duckdb_matches_sqlite(test_db):
+    ingest_csv(CSV, "test.csv")
+    # Let background training finish re-scoring before comparing
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread() and thread.daemon:
+            thread.join(timeout=30)
+    expected = [f() for f in ANALYTICS]
+
+    _use_backend("duckdb")
+    assert backend() == "duckdb"
+    assert [f() for f in ANALYTICS] == expected
+
+
+def test_mirror_follows_writes(test_db):
+    _use_backend("duckdb")
+    assert get_monthly_trends() == []
+    assert not sync_mirror()  # nothing changed since the last query
+
+    # Plain insert: no background re-scoring to race the assertions
+    execute_query(
+        """INSERT INTO daily_transactions (date, description, amount, transaction_type, is_saving, uploaded_at, hash)
+           VALUES ('2024-05-01', 'UBER TRIP', 300, 'Debit', 0, '2024-05-01T00:00:00', 'h1')"""
+    )
+    assert get_monthly_trends()[0]["expenses"] == 300
+    assert not sync_mirror()
+
+
+def test_mirror_refreshes_changed_days_only(test_db, monkeypatch):
+    import core.snapshot
+
+    ingest_csv(CSV, "test.csv")
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread() and thread.daemon:
+            thread.join(timeout=30)
+    _use_backend("duckdb")
+    get_monthly_trends()
+
+    def no_export(sink):
+        raise AssertionError("full re-export")
+
+    monkeypatch.setattr(core.snapshot, "export_transactions", no_export)
+    execute_query("UPDATE daily_transactions SET amount = 700 WHERE date = '2024-01-10'")
+    execute_query("UPDATE daily_transactions SET date = '2024-04-01' WHERE date = '2024-03-15'")
+    execute_query("DELETE FROM daily_transactions WHERE date = '2024-02-15'")
+    duck = [f() for f in ANALYTICS]
+
+    _use_backend("sqlite")
+    assert duck == [f() for f in ANALYTICS]
+
+
+def test_mirror_path_with_quote(test_db, tmp_path):
+    core.config.get_config()["analytics"]["mirror_path"] = str(tmp_path / "it's" / "mirror.parquet")
+    _use_backend("duckdb")
+    execute_query(
+        """INSERT INTO daily_transactions (date, description, amount, transaction_type, is_saving, uploaded_at, hash)
+           VALUES ('2024-05-01', 'UBER TRIP', 300, 'Debit', 0, '2024-05-01T00:00:00', 'h1')"""
+    )
+    assert get_monthly_trends()[0]["expenses"] == 300
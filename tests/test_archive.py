@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from core.archive import archive_year, list_archives, restore_year
+from core.database import execute_read, rebuild_summaries, transaction
+from core.query_stats import get_query_stats, reset_query_stats
+from services.analytics import get_monthly_trends
+from services.suggestion_service import get_subscription_audit
+from services.transaction_service import (
+    get_all_transactions,
+    get_category_breakdown,
+    get_summary,
+    get_transactions_by_month,
+    ingest_csv,
+    search_transactions,
+)
+
+HISTORY_CSV = b"""Date,Narration,Debit Amount,Credit Amount
+2022-03-01,SWIGGY ORDER,300,0
+2022-03-05,NETFLIX SUBSCRIPTION,649,0
+2022-04-05,NETFLIX SUBSCRIPTION,649,0
+2022-04-20,SALARY CREDIT,0,40000
+2023-01-10,ZOMATO ORDER,500,0
+2023-01-15,SALARY CREDIT,0,50000
+"""
+
+
+def _live_count():
+    return execute_read("SELECT COUNT(*) AS n FROM daily_transactions")[0]["n"]
+
+
+def _snapshot():
+    return get_summary(), get_monthly_trends(), get_category_breakdown()
+
+
+def test_archive_keeps_aggregates_and_history(test_db):
+    ingest_csv(HISTORY_CSV, "test.csv")
+    before = _snapshot()
+
+    assert archive_year(2022) == 4
+    assert _live_count() == 2
+    assert [a["year"] for a in list_archives()] == [2022]
+    assert os.path.exists(list_archives()[0]["path"])
+
+    # Rollups are frozen; raw-row readers span the archive
+    assert _snapshot() == before
+    assert len(get_all_transactions()) == 6
+    assert [t["amount"] for t in get_transactions_by_month("2022-04")] == [649, 40000]
+    assert get_subscription_audit()[0]["occurrences"] == 2
+    assert search_transactions("netflix")["total"] == 2
+    assert search_transactions("ord")["total"] == 2
+
+
+def test_reingest_skips_archived_rows(test_db):
+    ingest_csv(HISTORY_CSV, "test.csv")
+    archive_year(2022)
+
+    result = ingest_csv(HISTORY_CSV, "test.csv")
+    assert result["inserted"] == 0
+    assert result["skipped"] == 6
+
+
+def test_late_rows_and_restore(test_db):
+    ingest_csv(HISTORY_CSV, "test.csv")
+    archive_year(2022)
+    # A row for the archived year arriving later lands in the live table
+    ingest_csv(b"""Date,Narration,Debit Amount,Credit Amount
+2022-04-25,AMAZON PAY,1000,0
+""", "late.csv")
+    rebuild_summaries()
+    with_late = _snapshot()
+
+    assert restore_year(2022) == 4
+    assert list_archives() == []
+    assert _live_count() == 7
+    assert _snapshot() == with_late
+
+
+def test_archive_rejects_open_year(test_db):
+    from datetime import datetime
+    with pytest.raises(ValueError):
+        archive_year(datetime.now().year)
+
+
+def test_history_read_in_unit_of_work_raises(test_db):
+    ingest_csv(HISTORY_CSV, "test.csv")
+    with transaction():
+        assert len(get_all_transactions()) == 6
+    archive_year(2022)
+    with pytest.raises(RuntimeError):
+        with transaction():
+            get_all_transactions()
+
+
+def test_history_reads_instrumented(test_db):
+    ingest_csv(HISTORY_CSV, "test.csv")
+    archive_year(2022)
+    reset_query_stats()
+    get_all_transactions()
+    search_transactions("netflix")
+
+    statements = get_query_stats(top_n=50)["most_frequent"]
+    sites = {site.split(":")[0] for s in statements for site in s["call_sites"]}
+    assert "services/transaction_service.py" in sites
+    assert any("archive_2022.transactions_fts" in s["sql"] for s in statements)
+    assert any("archive_2022.daily_transactions" in s["sql"] for s in statements)
@@ -0,0 +1,71 @@
+import os
+import sqlite3
+
+import pytest
+
+from core.archive import archive_year, list_archives
+from core.backup import archives_dir_for, backup_database, backup_dir, list_backups, prune_backups
+from services.budget_service import set_budget
+from services.transaction_service import ingest_csv
+
+
+def test_backup_includes_wal_pages(test_db):
+    set_budget("Shopping", 500)
+    assert os.path.getsize(test_db + "-wal") > 0  # not yet checkpointed
+
+    path = backup_database()
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute("SELECT category, monthly_limit FROM budgets").fetchall()
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    finally:
+        conn.close()
+    assert rows == [("Shopping", 500)]
+    assert not os.path.exists(path + ".partial")
+
+
+def test_rolling_retention(test_db):
+    for _ in range(5):
+        backup_database()
+    assert len(list_backups()) == 5
+    assert prune_backups() == 2  # keep: 3 in the test config
+    assert len(list_backups()) == 3
+
+
+def test_download_route_streams_backup(test_db):
+    from ui.app import app
+    import ui.routes  # noqa: F401
+
+    name = os.path.basename(backup_database())
+    client = app.server.test_client()
+    resp = client.get(f"/download/backup/{name}")
+    assert resp.status_code == 200
+    assert "attachment" in resp.headers["Content-Disposition"]
+    with open(os.path.join(backup_dir(), name), "rb") as f:
+        assert resp.data == f.read()
+    resp.close()
+
+    assert client.get("/download/backup/test.db").status_code == 404
+
+
+def test_backup_copies_archive_files(test_db):
+    ingest_csv(b"Date,Narration,Debit Amount,Credit Amount\n2022-03-01,SWIGGY ORDER,300,0\n", "old.csv")
+    archive_year(2022)
+
+    path = backup_database()
+    copy = os.path.join(archives_dir_for(path), "transactions_2022.db")
+    conn = sqlite3.connect(copy)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM daily_transactions").fetchone()[0] == 1
+    finally:
+        conn.close()
+
+    # A backup whose archive cannot be read is not kept half-done
+    os.remove(list_archives()[0]["path"])
+    with pytest.raises(FileNotFoundError):
+        backup_database()
+    assert list_backups() == [os.path.basename(path)]
+
+    # Pruning takes the archive copies with the backup
+    assert prune_backups(keep=0) == 1
+    assert not os.path.exists(archives_dir_for(path))
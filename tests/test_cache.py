@@ -0,0 +1,91 @@
+import core.config
+from core.cache import cached, clear_cache, get_cache_stats, load_cache, save_cache
+from core.database import execute_query, get_database_id
+from services.budget_service import get_budget_vs_actual, set_budget
+from services.transaction_service import get_daily_spending, get_summary, ingest_csv
+
+SAMPLE_CSV = b"""Date,Narration,Debit Amount,Credit Amount
+2024-01-15,SWIGGY ORDER,450,0
+2024-01-16,SALARY CREDIT,0,50000
+"""
+
+calls = []
+
+
+@cached("transactions")
+def _count_transactions():
+    calls.append(1)
+    rows = execute_query("SELECT COUNT(*) AS n FROM daily_transactions", fetch=True)
+    return rows[0]["n"]
+
+
+def _stats(name):
+    return get_cache_stats()["functions"][name]
+
+
+def test_hit_until_table_changes(test_db):
+    calls.clear()
+    assert _count_transactions() == 0
+    assert _count_transactions() == 0
+    assert len(calls) == 1
+
+    ingest_csv(SAMPLE_CSV, "test.csv")
+    assert _count_transactions() == 2
+    assert len(calls) == 2
+
+
+def test_unrelated_table_keeps_entry(test_db):
+    calls.clear()
+    _count_transactions()
+    set_budget("Food & Dining", 5000)
+    _count_transactions()
+    assert len(calls) == 1
+
+
+def test_results_are_copies(test_db):
+    ingest_csv(SAMPLE_CSV, "test.csv")
+    summary = get_summary()
+    summary["total_income"] = -1
+    assert get_summary()["total_income"] == 50000
+    assert _stats("services.transaction_service.get_summary")["hits"] == 1
+
+
+def test_budget_change_invalidates(test_db):
+    ingest_csv(SAMPLE_CSV, "test.csv")
+    set_budget("Food & Dining", 1000)
+    assert get_budget_vs_actual("2024-01")[0]["budget"] == 1000
+    set_budget("Food & Dining", 2000)
+    assert get_budget_vs_actual("2024-01")[0]["budget"] == 2000
+
+
+def test_disabled(test_db, monkeypatch):
+    monkeypatch.setitem(core.config._config, "cache", {"enabled": False})
+    calls.clear()
+    _count_transactions()
+    _count_transactions()
+    assert len(calls) == 2
+
+
+def test_lru_bound(test_db, monkeypatch):
+    monkeypatch.setitem(core.config._config, "cache", {"max_entries": 2})
+    for months in (1, 2, 3):
+        get_daily_spending(months)
+    assert get_cache_stats()["entries"] == 2
+
+
+def test_persist_round_trip(test_db, tmp_path, monkeypatch):
+    monkeypatch.setitem(core.config._config, "cache", {"persist_path": str(tmp_path / "cache.pkl")})
+    calls.clear()
+    _count_transactions()
+    save_cache()
+    clear_cache()
+
+    load_cache()
+    _count_transactions()
+    assert len(calls) == 1
+
+
+def test_database_id_is_stable(test_db):
+    db_id = get_database_id()
+    assert len(db_id) == 32
+    assert get_database_id() == db_id
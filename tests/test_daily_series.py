@@ -0,0 +1,127 @@
+import os
+
+import numpy as np
+import pytest
+
+import core.config
+import core.daily_series as daily_series
+from core.archive import archive_year, restore_year
+from core.daily_series import (
+    DailySeries,
+    daily_totals,
+    range_total,
+    range_totals,
+    reset_daily_series,
+    save_daily_series,
+)
+from core.database import execute_query, execute_read, get_database_id, rebuild_summaries
+from services.transaction_service import get_daily_spending, ingest_csv
+
+CSV = b"""Date,Narration,Debit Amount,Credit Amount
+2023-12-30,ZOMATO ORDER,200,0
+2024-01-10,ZOMATO ORDER,500,0
+2024-01-10,UBER TRIP,300,0
+2024-01-15,SALARY CREDIT,0,50000
+2024-02-11,RANDOM SHOP XYZ,900,0
+"""
+
+
+def _scan(start, end, category=None):
+    """The same total the slow way."""
+    sql = "SELECT COALESCE(SUM(amount), 0) AS t FROM daily_transactions WHERE transaction_type = 'Debit' AND date BETWEEN ? AND ?"
+    params = [start, end]
+    if category is not None:
+        sql += " AND category = ?"
+        params.append(category)
+    return execute_read(sql, params)[0]["t"]
+
+
+def test_series_arithmetic():
+    series = DailySeries()
+    series.apply([("2024-01-05", "Food", "Debit", 0, 100.0), ("2024-01-01", "Rent", "Debit", 0, 50.0)])
+    series.apply([("2024-03-01", "Food", "Debit", 0, 10.0), ("2024-01-05", "Food", "Debit", 0, 40.0)])
+    day = lambda s: int(np.datetime64(s, "D").astype(np.int64))  # noqa: E731
+
+    starts = [day("2023-01-01"), day("2024-01-02"), day("2024-01-05"), day("2025-01-01")]
+    ends = [day("2024-12-31"), day("2024-02-29"), day("2024-01-04"), day("2025-02-01")]
+    assert series.range_totals(starts, ends).tolist() == [100.0, 40.0, 0.0, 0.0]
+    assert series.range_totals(starts[:1], ends[:1], category="Food").tolist() == [50.0]
+    assert series.range_totals(starts[:1], ends[:1], transaction_type="Credit").tolist() == [0.0]
+
+
+def test_range_totals_match_scans(test_db):
+    ingest_csv(CSV, "a.csv")
+    assert range_total("2024-01-01", "2024-01-31") == _scan("2024-01-01", "2024-01-31") == 800
+    assert range_total("2024-01-15", "2024-01-15", transaction_type="Credit") == 50000
+
+    ranges = [("2023-12-01", "2024-12-31"), ("2024-01-11", "2024-02-10"), ("2024-02-11", "2024-02-11")]
+    assert range_totals(ranges).tolist() == [_scan(*r) for r in ranges]
+
+    category = execute_read("SELECT category FROM daily_transactions WHERE date = '2024-02-11'")[0]["category"]
+    assert range_total("2024-01-01", "2024-12-31", category=category) == _scan("2024-01-01", "2024-12-31", category)
+
+    dates, values = daily_totals("2024-01-09", "2024-01-11")
+    assert dates == ["2024-01-09", "2024-01-10", "2024-01-11"]
+    assert values.tolist() == [0, 800, 0]
+
+
+def test_series_follows_writes(test_db):
+    ingest_csv(CSV, "a.csv")
+    assert range_total("2024-01-01", "2024-12-31") == 1700
+
+    execute_query("UPDATE daily_transactions SET amount = 650 WHERE date = '2024-01-10' AND amount = 500")
+    execute_query("UPDATE daily_transactions SET date = '2024-03-01' WHERE amount = 900")
+    execute_query("DELETE FROM daily_transactions WHERE amount = 300")
+    assert range_total("2024-01-01", "2024-01-31") == _scan("2024-01-01", "2024-01-31") == 650
+    assert range_total("2024-02-01", "2024-02-29") == 0
+    assert range_total("2024-03-01", "2024-03-01") == 900
+
+    # A full rebuild renumbers every day and the series keeps up
+    execute_query("DELETE FROM daily_transactions WHERE date = '2024-03-01'")
+    rebuild_summaries()
+    assert range_total("2023-01-01", "2024-12-31") == _scan("2023-01-01", "2024-12-31") == 850
+    assert [d["date"] for d in get_daily_spending()] == ["2024-01-10", "2023-12-30"]
+
+
+def test_archived_days_stay_in_series(test_db):
+    ingest_csv(CSV, "a.csv")
+    assert archive_year(2023) == 1
+    assert range_total("2023-12-30", "2023-12-30") == 200
+    rebuild_summaries()
+    assert range_total("2023-12-30", "2023-12-30") == 200
+
+    restore_year(2023)
+    assert range_total("2023-01-01", "2024-12-31") == 1900
+
+
+def test_series_persisted_for_same_database(test_db):
+    ingest_csv(CSV, "a.csv")
+    range_total("2024-01-01", "2024-01-31")
+    save_daily_series()
+    path = core.config.get_config()["daily_series"]["persist_path"]
+    assert os.path.exists(path)
+
+    daily_series._states.clear()
+    execute_query("DELETE FROM daily_transactions WHERE amount = 900")
+    assert range_total("2024-01-01", "2024-12-31") == 800
+    assert daily_series._states[get_database_id()]["series"].num_days > 0
+
+    assert daily_series._load(path, "another-database") is None
+    reset_daily_series()
+    assert not os.path.exists(path)
+
+
+def test_snapshot_import_resets_series(test_db):
+    pytest.importorskip("pyarrow")
+    from core.snapshot import export_snapshot, import_snapshot
+
+    ingest_csv(CSV, "a.csv")
+    path = export_snapshot()
+    execute_query("DELETE FROM daily_transactions WHERE amount = 900")
+    assert range_total("2024-01-01", "2024-12-31") == 800
+    save_daily_series()
+
+    import_snapshot(path)
+    assert get_database_id() not in daily_series._states
+    assert not os.path.exists(core.config.get_config()["daily_series"]["persist_path"])
+    assert range_total("2024-01-01", "2024-12-31") == 1700
@@ -1,16 +1,36 @@
-from core.database import execute_query, get_db
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from core.database import (
+    SCHEMA_VERSION,
+    close_pool,
+    connection,
+    execute_query,
+    execute_read,
+    get_connection,
+    get_data_version,
+    get_db,
+    get_pool_stats,
+    in_transaction,
+    initialize_database,
+    transaction,
+)
 
 
 def test_tables_created(test_db):
     """Verify all expected tables exist after initialization."""
     rows = execute_query(
-        "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name",
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') ORDER BY name",
         fetch=True,
     )
     table_names = {r["name"] for r in rows}
     expected = {
         "daily_transactions", "training_data", "budgets",
         "monthly_summary", "festivals", "savings_goals", "schema_version",
+        "transaction_rows", "training_rows", "descriptions", "merchants",
     }
     assert expected.issubset(table_names), f"Missing tables: {expected - table_names}"
 
@@ -18,7 +38,7 @@ def test_tables_created(test_db):
 def test_schema_version(test_db):
     rows = execute_query("SELECT version FROM schema_version", fetch=True)
     assert len(rows) == 1
-    assert rows[0]["version"] == 2
+    assert rows[0]["version"] == SCHEMA_VERSION
 
 
 def test_festivals_seeded(test_db):
@@ -76,3 +96,272 @@ def test_context_manager_rollback(test_db):
 
     rows = execute_query("SELECT * FROM daily_transactions WHERE hash = 'rollback1'", fetch=True)
     assert len(rows) == 0
+
+
+def test_transaction_indexes_created(test_db):
+    rows = execute_query(
+        "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='transaction_rows'",
+        fetch=True,
+    )
+    names = {r["name"] for r in rows}
+    assert {"idx_txn_type_month", "idx_txn_category_type_month", "idx_txn_date"} <= names
+
+
+def test_budget_query_uses_index(test_db):
+    plan = execute_query(
+        """EXPLAIN QUERY PLAN
+           SELECT SUM(amount) FROM daily_transactions
+           WHERE category = ? AND transaction_type = 'Debit' AND year_month = ?""",
+        ("Shopping", "2024-01"),
+        fetch=True,
+    )
+    assert any("idx_txn_category_type_month" in r["detail"] for r in plan)
+
+
+def test_migrations_upgrade_v2_database(test_db):
+    conn = get_connection()
+    conn.execute("DROP VIEW daily_transactions")
+    conn.execute("DROP VIEW training_data")
+    conn.execute("DROP TABLE transaction_rows")
+    conn.execute("DROP TABLE training_rows")
+    conn.execute("DROP TABLE model_accuracy")
+    conn.execute("""
+        CREATE TABLE daily_transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL, description TEXT NOT NULL,
+            amount REAL NOT NULL, transaction_type TEXT NOT NULL, category TEXT,
+            is_saving INTEGER DEFAULT 0, uploaded_at TEXT NOT NULL, hash TEXT UNIQUE
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE training_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, description TEXT NOT NULL, category TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT INTO daily_transactions (date, description, amount, transaction_type, uploaded_at, hash)
+        VALUES ('2024-01-05', 'Zomato Order-110889182110', 450, 'Debit', '2024-01-05', 'old1')
+    """)
+    conn.execute("INSERT INTO training_data (description, category) VALUES ('ZOMATO ORDER', 'Food & Dining')")
+    conn.execute("UPDATE schema_version SET version = 2")
+    conn.commit()
+
+    initialize_database()
+    initialize_database()  # idempotent
+
+    columns = {r["name"] for r in execute_query("PRAGMA table_info(daily_transactions)", fetch=True)}
+    assert {"pending_ml", "predicted_category", "prediction_reviewed"} <= columns
+    assert {"year_month", "cal_month"} <= {
+        r["name"] for r in execute_query("PRAGMA table_xinfo(daily_transactions)", fetch=True)
+    }
+    assert execute_query("SELECT version FROM schema_version", fetch=True)[0]["version"] == SCHEMA_VERSION
+
+    # Existing rows survive interning, and share the training row's merchant
+    row = execute_query("SELECT description, merchant_id FROM daily_transactions", fetch=True)[0]
+    assert row["description"] == "Zomato Order-110889182110"
+    training = execute_query("SELECT description, merchant_id FROM training_data", fetch=True)[0]
+    assert training["description"] == "ZOMATO ORDER"
+    assert training["merchant_id"] == row["merchant_id"]
+    assert execute_query(
+        "SELECT COUNT(*) AS n FROM transactions_fts WHERE transactions_fts MATCH 'zomato'", fetch=True,
+    )[0]["n"] == 1
+
+
+def test_data_versions_bump_on_writes(test_db):
+    from core.database import get_data_versions, get_data_version
+    from services.budget_service import set_budget
+
+    before = get_data_versions()
+    assert set(before) == {"transactions", "budgets", "festivals", "training_data"}
+
+    execute_query(
+        """INSERT INTO daily_transactions
+           (date, description, amount, transaction_type, category, is_saving, uploaded_at, hash)
+           VALUES ('2024-01-15', 'TEST', 100.0, 'Debit', NULL, 0, '2024-01-15T10:00:00', 'v1')""",
+    )
+    execute_query("UPDATE daily_transactions SET category = 'Shopping' WHERE hash = 'v1'")
+    set_budget("Shopping", 1000)
+
+    after = get_data_versions()
+    assert after["transactions"] == before["transactions"] + 2
+    assert after["budgets"] > before["budgets"]
+    assert after["festivals"] == before["festivals"]
+    assert get_data_version("transactions") == after["transactions"]
+
+
+def test_data_version_unchanged_on_rollback(test_db):
+    from core.database import get_data_version
+
+    before = get_data_version("transactions")
+    try:
+        with get_db() as conn:
+            conn.execute(
+                """INSERT INTO daily_transactions
+                   (date, description, amount, transaction_type, category, is_saving, uploaded_at, hash)
+                   VALUES ('2024-01-15', 'X', 1.0, 'Debit', NULL, 0, '2024-01-15T10:00:00', 'v2')""",
+            )
+            raise ValueError("Force rollback")
+    except ValueError:
+        pass
+    assert get_data_version("transactions") == before
+
+
+def test_pragmas_applied(test_db):
+    with connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+
+def test_pool_bounded_under_thread_churn(test_db):
+    def worker():
+        execute_query("SELECT COUNT(*) FROM daily_transactions", fetch=True)
+        get_connection()  # left checked out; reclaimed once the thread exits
+
+    for _ in range(30):
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+    assert get_pool_stats()["open"] <= get_pool_stats()["size"]
+
+
+def test_nested_blocks_share_connection(test_db):
+    with connection() as outer:
+        with get_db() as inner:
+            assert inner is outer
+    assert get_pool_stats()["in_use"] == 0
+
+
+def test_broken_connection_replaced(test_db):
+    with connection() as conn:
+        pass
+    conn.close()
+    rows = execute_query("SELECT COUNT(*) AS n FROM festivals", fetch=True)
+    assert rows[0]["n"] >= 2
+
+
+def test_close_pool_checkpoints_wal(test_db):
+    execute_query(
+        """INSERT INTO budgets (category, monthly_limit, created_at, updated_at)
+           VALUES ('Shopping', 100, 'now', 'now')"""
+    )
+    close_pool()
+    wal = test_db + "-wal"
+    assert not os.path.exists(wal) or os.path.getsize(wal) == 0
+
+
+def _add_budget(category):
+    execute_query(
+        """INSERT INTO budgets (category, monthly_limit, created_at, updated_at)
+           VALUES (?, 100, 'now', 'now')""",
+        (category,),
+    )
+
+
+def _budget_names():
+    return {r["category"] for r in execute_query("SELECT category FROM budgets", fetch=True)}
+
+
+def test_transaction_rolls_back_all_statements(test_db):
+    try:
+        with transaction():
+            _add_budget("Shopping")
+            _add_budget("Travel")
+            raise ValueError("abort")
+    except ValueError:
+        pass
+    assert _budget_names() == set()
+
+
+def test_nested_transaction_is_savepoint(test_db):
+    with transaction():
+        _add_budget("Shopping")
+        try:
+            with transaction():
+                _add_budget("Travel")
+                raise ValueError("inner only")
+        except ValueError:
+            pass
+        with get_db() as conn:
+            conn.execute(
+                """INSERT INTO budgets (category, monthly_limit, created_at, updated_at)
+                   VALUES ('Groceries', 100, 'now', 'now')"""
+            )
+        assert in_transaction()
+    assert not in_transaction()
+    assert _budget_names() == {"Shopping", "Groceries"}
+
+
+def test_transaction_inside_get_db_keeps_block_atomic(test_db):
+    with pytest.raises(ValueError):
+        with get_db() as conn:
+            conn.execute(
+                """INSERT INTO budgets (category, monthly_limit, created_at, updated_at)
+                   VALUES ('Groceries', 100, 'now', 'now')"""
+            )
+            with transaction():
+                _add_budget("Shopping")
+            assert conn.execute("SELECT COUNT(*) FROM budgets").fetchone()[0] == 2
+            raise ValueError("abort the block")
+    # Neither write was committed behind the enclosing block's back
+    assert _budget_names() == set()
+
+
+def test_transaction_commits_once(test_db):
+    before = get_data_version("budgets")
+    with transaction() as conn:
+        _add_budget("Shopping")
+        _add_budget("Travel")
+        assert conn.in_transaction
+    assert get_data_version("budgets") == before + 2
+    assert _budget_names() == {"Shopping", "Travel"}
+
+
+def test_read_pool_rejects_writes(test_db):
+    with pytest.raises(sqlite3.OperationalError):
+        execute_read("DELETE FROM festivals")
+    assert execute_read("SELECT COUNT(*) AS n FROM festivals")[0]["n"] >= 2
+    assert get_pool_stats(read_only=True)["open"] >= 1
+
+
+def _read_in_thread(query):
+    result = {}
+    t = threading.Thread(target=lambda: result.update(rows=execute_read(query)))
+    t.start()
+    t.join()
+    return result["rows"]
+
+
+def test_read_inside_transaction_sees_own_writes(test_db):
+    with transaction():
+        _add_budget("Shopping")
+        assert execute_read("SELECT category FROM budgets")[0]["category"] == "Shopping"
+        # Other readers only see committed data
+        assert _read_in_thread("SELECT COUNT(*) AS n FROM budgets")[0]["n"] == 0
+    assert execute_read("SELECT COUNT(*) AS n FROM budgets")[0]["n"] == 1
+
+
+def test_hex_hashes_upgraded_to_binary(test_db):
+    import hashlib
+    from services.transaction_service import ingest_csv, preprocess_description as normalize
+
+    csv = b"""Date,Narration,Debit Amount,Credit Amount
+2024-01-10,ZOMATO ORDER-110889182110,500,0
+2024-01-11,AMAZON PAY,1200,0
+"""
+    ingest_csv(csv, "test.csv")
+    # Put the rows back to the v12 format: hex SHA-256 of the same fields
+    rows = execute_query("SELECT id, date, description, amount, transaction_type FROM daily_transactions", fetch=True)
+    for row in rows:
+        raw = f"{row['date']}|{normalize(row['description'])}|{row['amount']}|{row['transaction_type']}"
+        execute_query("UPDATE transaction_rows SET hash = ? WHERE id = ?",
+                      (hashlib.sha256(raw.encode()).hexdigest(), row["id"]))
+    execute_query("UPDATE schema_version SET version = 12")
+
+    initialize_database()
+
+    hashes = execute_query("SELECT hash FROM transaction_rows", fetch=True)
+    assert all(isinstance(r["hash"], bytes) and len(r["hash"]) == 16 for r in hashes)
+    # Dedup still recognises the upgraded rows
+    result = ingest_csv(csv, "test.csv")
+    assert result["inserted"] == 0 and result["skipped"] == 2
@@ -0,0 +1,62 @@
+from core.database import execute_query
+from models.drift import get_model_accuracy, should_retrain, reset_since_train
+from services.transaction_service import ingest_csv, update_transaction_category
+
+
+def _ingest_and_get(narration):
+    csv = f"""Date,Narration,Debit Amount,Credit Amount
+2024-01-18,{narration},1000,0
+""".encode()
+    ingest_csv(csv, "test.csv")
+    return execute_query(
+        "SELECT * FROM daily_transactions WHERE description = ?", (narration,), fetch=True
+    )[0]
+
+
+def test_prediction_stored_on_ingest(test_db):
+    row = _ingest_and_get("ZOMATO ORDER")
+    assert row["predicted_category"] == "Food & Dining"
+    assert row["prediction_source"] == "keyword"
+    assert row["predicted_confidence"] == 1.0
+
+
+def test_correction_updates_counters(test_db):
+    row = _ingest_and_get("ZOMATO ORDER")
+    update_transaction_category(row["hash"], "Groceries", is_saving=0)
+
+    stats = get_model_accuracy()
+    assert len(stats) == 1
+    assert stats[0]["head"] == "keywords"
+    assert stats[0]["label"] == "Food & Dining"
+    assert stats[0]["corrected"] == 1
+    assert stats[0]["confirmed"] == 0
+
+    # Re-editing the same row does not count the original guess twice
+    update_transaction_category(row["hash"], "Shopping", is_saving=0)
+    assert get_model_accuracy()[0]["corrected"] == 1
+
+
+def test_ml_corrections_drive_retrain(test_db, monkeypatch):
+    from core.config import get_config
+    monkeypatch.setitem(get_config()["ml"], "retrain_min_corrections", 2)
+
+    for i in range(2):
+        execute_query(
+            """INSERT INTO daily_transactions
+               (date, description, amount, transaction_type, category, is_saving, uploaded_at, hash,
+                predicted_category, predicted_is_saving, predicted_confidence, prediction_source)
+               VALUES ('2024-01-01', ?, 100, 'Debit', NULL, 0, '2024-01-01', ?, 'Shopping', 0, 0.4, 'ml')""",
+            (f"MERCHANT {i}", f"h{i}"),
+        )
+
+    update_transaction_category("h0", "Shopping", is_saving=0)
+    assert not should_retrain()
+    update_transaction_category("h1", "Travel", is_saving=0)
+    assert not should_retrain()
+
+    execute_query("UPDATE daily_transactions SET prediction_reviewed = 0 WHERE hash = 'h0'")
+    update_transaction_category("h0", "Travel", is_saving=0)
+    assert should_retrain()
+
+    reset_since_train()
+    assert not should_retrain()
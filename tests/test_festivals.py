@@ -65,3 +65,20 @@ def test_upcoming_festival_message(test_db):
         assert "message" in f
         assert "days_until" in f
         assert f["days_until"] >= 0
+
+
+def test_festival_window_spending(test_db):
+    from services.festival_service import _get_festival_window_spending
+
+    csv = b"""Date,Narration,Debit Amount,Credit Amount
+2023-01-05,GROCERY SHOPPING,2000,0
+2023-10-21,DIWALI SHOPPING,1000,0
+2023-10-26,GROCERY SHOPPING,700,0
+2024-10-20,DIWALI SHOPPING,2500,0
+2024-10-24,DIWALI GIFTS,500,0
+2024-12-20,CHRISTMAS GIFTS,6000,0
+"""
+    ingest_csv(csv, "test.csv")
+    # Oct 20-24 in both years; no Christmas spend in 2023 and 2024 runs past the data
+    assert _get_festival_window_spending(10, 20, 5) == 2000
+    assert _get_festival_window_spending(12, 25, 3) == 0
@@ -0,0 +1,59 @@
+from core.database import execute_query, execute_read
+from services.transaction_service import (
+    get_all_transactions,
+    ingest_csv,
+    search_transactions,
+    update_transaction_category,
+)
+
+CSV = b"""Date,Narration,Debit Amount,Credit Amount
+2024-01-10,ZOMATO ORDER-110889182110,500,0
+2024-01-12,Zomato Order-220889182999,300,0
+2024-02-10,ZOMATO ORDER-110889182110,700,0
+2024-02-11,RANDOM SHOP XYZ,900,0
+"""
+
+
+def _count(table):
+    return execute_read(f"SELECT COUNT(*) AS n FROM {table}")[0]["n"]
+
+
+def test_descriptions_and_merchants_stored_once(test_db):
+    ingest_csv(CSV, "test.csv")
+    assert _count("transaction_rows") == 4
+    assert _count("descriptions") == 3
+    # Reference numbers and case are normalized away from the merchant
+    assert _count("merchants") == 2
+
+    texts = {t["description"] for t in get_all_transactions()}
+    assert "Zomato Order-220889182999" in texts
+    by_merchant = execute_read(
+        """SELECT merchant_id, COUNT(*) AS n FROM daily_transactions
+           GROUP BY merchant_id ORDER BY n DESC"""
+    )
+    assert [r["n"] for r in by_merchant] == [3, 1]
+
+
+def test_training_rows_reference_merchants(test_db):
+    ingest_csv(CSV, "test.csv")
+    row = next(t for t in get_all_transactions() if t["description"] == "RANDOM SHOP XYZ")
+    update_transaction_category(row["hash"], "Shopping")
+    assert execute_read(
+        "SELECT description, category FROM training_data WHERE category = 'Shopping'"
+    )[0]["description"] == "RANDOM SHOP XYZ"
+
+
+def test_view_writes_intern(test_db):
+    execute_query(
+        """INSERT INTO daily_transactions (date, description, amount, transaction_type, uploaded_at, hash)
+           VALUES ('2024-03-01', 'UBER TRIP-12345678', 250, 'Debit', '2024-03-01', 'u1')"""
+    )
+    row = execute_read("SELECT * FROM daily_transactions WHERE hash = 'u1'")[0]
+    assert row["description"] == "UBER TRIP-12345678"
+    assert row["is_saving"] == 0 and row["pending_ml"] == 0
+
+    execute_query("UPDATE daily_transactions SET description = 'OLA RIDE' WHERE hash = 'u1'")
+    assert search_transactions("ola")["total"] == 1
+    assert search_transactions("uber")["total"] == 0
+    execute_query("DELETE FROM daily_transactions WHERE hash = 'u1'")
+    assert _count("transaction_rows") == 0
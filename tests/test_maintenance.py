@@ -0,0 +1,115 @@
+import threading
+
+from core.database import execute_query, execute_read
+from core.maintenance import (
+    get_maintenance_log,
+    ingestion_active,
+    ingestion_job,
+    run_maintenance,
+)
+from services.transaction_service import ingest_csv
+
+
+def _insert_rows(n, prefix="ROW"):
+    for i in range(n):
+        execute_query(
+            """INSERT INTO daily_transactions (date, description, amount, transaction_type, uploaded_at, hash)
+               VALUES ('2024-01-01', ?, ?, 'Debit', '2024-01-01T00:00:00', ?)""",
+            (f"{prefix} {i} " + "x" * 200, i, f"{prefix}{i}"),
+        )
+
+
+def test_new_database_uses_incremental_auto_vacuum(test_db):
+    assert execute_read("PRAGMA auto_vacuum")[0][0] == 2
+
+
+def test_maintenance_runs_and_logs_each_task(test_db):
+    _insert_rows(50)
+    results = run_maintenance(force=True)
+    assert [r["task"] for r in results] == ["analyze", "optimize", "vacuum", "checkpoint"]
+    assert all(r["status"] == "ok" for r in results)
+    # ANALYZE gave the planner statistics
+    assert execute_read("SELECT COUNT(*) AS n FROM sqlite_stat1")[0]["n"] > 0
+
+    log = get_maintenance_log()
+    assert {r["task"] for r in log} == {"analyze", "optimize", "vacuum", "checkpoint"}
+    assert all(r["duration_ms"] >= 0 for r in log)
+
+    # Only the size-triggered checkpoint is due again straight away
+    assert [r["task"] for r in run_maintenance()] == ["checkpoint"]
+
+
+def test_incremental_vacuum_releases_deleted_pages(test_db):
+    _insert_rows(500)
+    execute_query("DELETE FROM transaction_rows")
+    execute_query("DELETE FROM descriptions")
+    free = execute_read("PRAGMA freelist_count")[0][0]
+    assert free > 0
+
+    result = run_maintenance(["vacuum"], force=True)[0]
+    assert result["status"] == "ok"
+    assert execute_read("PRAGMA freelist_count")[0][0] == max(free - 1000, 0)
+
+
+def test_maintenance_skipped_during_ingestion(test_db):
+    with ingestion_job():
+        assert ingestion_active()
+        assert run_maintenance(force=True) == []
+    assert not ingestion_active()
+    assert get_maintenance_log() == []
+
+
+def test_csv_import_counts_as_ingestion(test_db, monkeypatch):
+    seen = []
+    import services.transaction_service as ts
+    real_store = ts._store_parsed_rows
+
+    def store(parsed):
+        seen.append(ingestion_active())
+        return real_store(parsed)
+
+    monkeypatch.setattr(ts, "_store_parsed_rows", store)
+    ingest_csv(b"Date,Narration,Debit Amount,Credit Amount\n2024-01-10,SHOP,5,0\n", "a.csv")
+    assert seen == [True]
+    assert not ingestion_active()
+
+
+def test_checkpoint_truncates_large_wal(test_db, monkeypatch):
+    import core.config
+    monkeypatch.setitem(core.config.get_config(), "maintenance", {"wal_checkpoint_mb": 0})
+    _insert_rows(50)
+    result = run_maintenance(["checkpoint"])[0]
+    assert result["status"] == "ok"
+    assert result["detail"].split("-> ")[1].startswith("0 KiB")
+
+
+def test_ingestion_waits_for_running_task(test_db, monkeypatch):
+    import core.maintenance as maintenance
+
+    events = []
+    started, release = threading.Event(), threading.Event()
+
+    def slow_analyze(conn):
+        started.set()
+        release.wait(10)
+        events.append("analyze done")
+        return ""
+
+    monkeypatch.setitem(maintenance._RUNNERS, "analyze", slow_analyze)
+
+    def ingest():
+        with ingestion_job():
+            events.append("ingestion")
+
+    runner = threading.Thread(target=run_maintenance, args=(["analyze"], True))
+    runner.start()
+    assert started.wait(10)
+    job = threading.Thread(target=ingest)
+    job.start()
+    job.join(0.5)
+    assert events == []  # held back while ANALYZE runs
+
+    release.set()
+    runner.join(10)
+    job.join(10)
+    assert events == ["analyze done", "ingestion"]
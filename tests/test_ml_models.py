@@ -1,3 +1,5 @@
+import threading
+
 from core.database import execute_query
 from models.ml_models import (
     train_models,
@@ -56,3 +58,53 @@ def test_predict_without_training(test_db):
     label, conf = predict_debit_type("SOMETHING RANDOM")
     assert label is None
     assert conf == 0.0
+
+
+def test_predict_before_ready_starts_background_load(test_db):
+    import models.ml_models as ml
+
+    _seed_training_data(test_db)
+    assert not ml.models_ready()
+
+    # First prediction returns immediately and leaves loading to a background thread
+    assert predict_expense_category("AMAZON SHOPPING") == (None, 0.0)
+    assert ml.wait_for_models(timeout=30)
+
+    label, _ = predict_expense_category("AMAZON SHOPPING")
+    assert label is not None
+
+
+def test_disk_load_does_not_hold_model_lock(test_db, monkeypatch):
+    import models.ml_models as ml
+
+    started, release = threading.Event(), threading.Event()
+
+    def slow_load():
+        started.set()
+        release.wait(10)
+        return None
+
+    monkeypatch.setattr(ml, "_load_models", slow_load)
+    ml.start_background_load()
+    try:
+        assert started.wait(10)
+        # Predictions only need the module lock, which the loader must not hold
+        assert ml._lock.acquire(timeout=1)
+        ml._lock.release()
+    finally:
+        release.set()
+    assert ml.wait_for_models(timeout=30)
+
+
+def test_concurrent_training_runs_once(test_db, monkeypatch):
+    import models.ml_models as ml
+
+    _seed_training_data(test_db)
+    saves = []
+    monkeypatch.setattr(ml, "_save_models", saves.append)
+    threads = [threading.Thread(target=train_models) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(30)
+    assert len(saves) == 1
@@ -0,0 +1,171 @@
+import os
+import threading
+from collections import OrderedDict
+
+import pytest
+
+import core.config
+import core.database
+from core.backup import backup_database, backup_dir, list_backups
+from core.database import execute_query, execute_read, get_database_id
+from core.profiles import (
+    DEFAULT_PROFILE,
+    active_profile,
+    bind_profile,
+    create_profile,
+    list_profiles,
+    profiles_dir,
+    scoped_path,
+    use_profile,
+)
+from models.ml_models import models_ready, train_models
+from services.budget_service import get_all_budgets, set_budget
+from services.transaction_service import get_all_transactions, ingest_csv
+
+CSV = b"""Date,Narration,Debit Amount,Credit Amount
+2024-01-10,ZOMATO ORDER,500,0
+"""
+
+
+def _open_paths():
+    return {path for path, _ in core.database._pools}
+
+
+def test_create_and_list_profiles(test_db):
+    assert list_profiles() == [DEFAULT_PROFILE]
+    create_profile("priya")
+    create_profile("arun")
+    assert list_profiles() == [DEFAULT_PROFILE, "arun", "priya"]
+
+    with pytest.raises(ValueError):
+        create_profile("priya")
+    for bad in ("../etc", "Priya", "", "a/b"):
+        with pytest.raises(ValueError):
+            create_profile(bad)
+    with pytest.raises(ValueError):
+        with use_profile("nobody"):
+            pass
+
+
+def test_profiles_have_separate_databases(test_db):
+    create_profile("priya")
+    ingest_csv(CSV, "default.csv")
+    default_id = get_database_id()
+
+    with use_profile("priya"):
+        assert active_profile() == "priya"
+        assert core.database._db_path() == os.path.join(profiles_dir(), "priya", "test.db")
+        assert scoped_path("saved_models/") == os.path.join(profiles_dir(), "priya", "saved_models")
+        assert get_all_transactions() == []
+        set_budget("Food & Dining", 3000)
+        assert get_database_id() != default_id
+
+    assert active_profile() == DEFAULT_PROFILE
+    assert core.database._db_path() == test_db
+    assert len(get_all_transactions()) == 1
+    assert get_all_budgets() == []
+
+
+def test_files_are_kept_per_profile(test_db):
+    create_profile("priya")
+    with use_profile("priya"):
+        path = backup_database()
+        assert os.path.dirname(path) == backup_dir()
+        assert backup_dir().startswith(os.path.join(profiles_dir(), "priya"))
+    assert list_backups() == []
+
+
+def test_models_trained_per_profile(test_db):
+    create_profile("priya")
+    with use_profile("priya"):
+        for desc, cat in [("ZOMATO ORDER", "Food & Dining"), ("UBER TRIP", "Transport")] * 3:
+            execute_query("INSERT INTO training_data (description, category) VALUES (?, ?)", (desc, cat))
+        train_models()
+        assert models_ready()
+        model_dir = scoped_path(core.config.get_config()["ml"]["model_save_path"])
+        assert os.path.exists(os.path.join(model_dir, "vectorizer.joblib"))
+    assert not models_ready()
+
+
+def test_least_recently_used_databases_closed(test_db, monkeypatch):
+    monkeypatch.setitem(core.config._config["profiles"], "max_open", 2)
+    for name in ("a", "b", "c"):
+        create_profile(name)
+        with use_profile(name):
+            execute_read("SELECT 1")
+    assert len(_open_paths()) == 2
+    assert os.path.join(profiles_dir(), "c", "test.db") in _open_paths()
+    assert test_db not in _open_paths()
+
+    # A closed database reopens on demand
+    assert execute_read("SELECT COUNT(*) AS n FROM daily_transactions")[0]["n"] == 0
+    assert test_db in _open_paths()
+
+
+def test_least_recently_used_profile_state_dropped(test_db, monkeypatch):
+    import core.daily_series as daily_series
+    import core.profiles as profiles
+    import models.ml_models as ml
+    import models.similarity as similarity
+
+    monkeypatch.setitem(core.config._config["profiles"], "max_open", 2)
+    monkeypatch.setattr(profiles, "_resident", OrderedDict())
+
+    def touch(name):
+        with use_profile(name):
+            ml._current()
+            similarity.suggest_categories(["ZOMATO ORDER"])
+            daily_series.range_total("2024-01-01", "2024-01-31")
+
+    for name in ("a", "b", "c"):
+        create_profile(name)
+        touch(name)
+    assert set(ml._models) == {"b", "c"}
+    assert set(similarity._indexes) == {"b", "c"}
+    assert {s["profile"] for s in daily_series._states.values()} == {"b", "c"}
+
+    # A profile still in use is never dropped
+    with use_profile("b"):
+        touch("a")
+        touch("c")
+        assert set(ml._models) == {"b", "c"}
+    touch("a")
+    assert set(ml._models) == {"a", "c"}
+
+
+def test_background_work_keeps_profile(test_db, monkeypatch):
+    create_profile("priya")
+    seen = []
+    with use_profile("priya"):
+        thread = threading.Thread(target=bind_profile(lambda: seen.append(active_profile())))
+    thread.start()
+    thread.join()
+    assert seen == ["priya"]
+
+    # Queued writes run against the profile that queued them
+    monkeypatch.setitem(core.config._config["database"], "single_writer", True)
+    with use_profile("priya"):
+        set_budget("Shopping", 1500)
+        assert [b["category"] for b in get_all_budgets()] == ["Shopping"]
+    assert get_all_budgets() == []
+
+
+def test_request_profile_from_cookie(test_db):
+    from ui.app import app
+    import ui.routes  # noqa: F401
+
+    create_profile("priya")
+    with use_profile("priya"):
+        name = os.path.basename(backup_database())
+
+    client = app.server.test_client()
+    assert client.get(f"/download/backup/{name}").status_code == 404
+    client.set_cookie("pfa_profile", "priya")
+    resp = client.get(f"/download/backup/{name}")
+    assert resp.status_code == 200
+    resp.close()
+
+    # Unknown profiles fall back to the default
+    for bad in ("../elsewhere", "priya\n", "nobody"):
+        client.set_cookie("pfa_profile", bad)
+        assert client.get(f"/download/backup/{name}").status_code == 404
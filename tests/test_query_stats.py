@@ -0,0 +1,64 @@
+import logging
+
+import core.config
+from core.database import execute_query, execute_read
+from core.query_stats import get_query_stats, reset_query_stats
+from services.budget_service import get_all_budgets
+
+
+def test_statements_recorded_with_call_site(test_db):
+    reset_query_stats()
+    get_all_budgets()
+    get_all_budgets()
+
+    stats = get_query_stats()
+    top = stats["most_frequent"][0]
+    assert top["sql"] == "SELECT * FROM budgets ORDER BY category"
+    assert top["calls"] == 2
+    assert top["call_sites"][0].startswith("services/budget_service.py:")
+    assert sum(stats["histogram"].values()) == 2
+    assert stats["recent"][-1]["rows"] == 0
+
+
+def test_rows_counted(test_db):
+    reset_query_stats()
+    n = len(execute_read("SELECT * FROM festivals"))
+    execute_query("UPDATE festivals SET is_active = 1")
+    by_sql = {s["sql"]: s for s in get_query_stats()["most_frequent"]}
+    assert by_sql["SELECT * FROM festivals"]["rows"] == n
+    assert by_sql["UPDATE festivals SET is_active = 1"]["rows"] == n
+
+
+def test_slow_query_logs_plan(test_db, monkeypatch):
+    monkeypatch.setitem(core.config._config["database"], "slow_query_ms", 0)
+    messages = []
+    handler = logging.Handler()
+    handler.emit = lambda record: messages.append(record.getMessage())
+    logger = logging.getLogger("pfa.queries")
+    logger.addHandler(handler)
+    try:
+        execute_read("SELECT * FROM daily_transactions WHERE year_month = ?", ("2024-01",))
+    finally:
+        logger.removeHandler(handler)
+    assert "Slow query" in messages[-1]
+    assert "idx_txn_month" in messages[-1]
+
+
+def test_disabled(test_db, monkeypatch):
+    monkeypatch.setitem(core.config._config["database"], "instrumentation", False)
+    reset_query_stats()
+    get_all_budgets()
+    assert get_query_stats()["most_frequent"] == []
+
+
+def test_statements_bounded_lru(test_db, monkeypatch):
+    monkeypatch.setitem(core.config._config["database"], "query_stats_max_statements", 3)
+    reset_query_stats()
+    execute_read("SELECT 1")
+    execute_read("SELECT 2")
+    execute_read("SELECT 3")
+    execute_read("SELECT 1")  # most recently run again
+    execute_read("SELECT 4")
+
+    kept = {s["sql"] for s in get_query_stats()["most_frequent"]}
+    assert kept == {"SELECT 1", "SELECT 3", "SELECT 4"}
@@ -0,0 +1,45 @@
+from core.database import execute_query
+from models.similarity import find_similar, suggest_categories
+from services.transaction_service import ingest_csv, get_uncategorized_with_suggestions
+
+
+def _label(desc, cat):
+    execute_query(
+        "INSERT INTO training_data (description, category) VALUES (?, ?)",
+        (desc, cat),
+    )
+
+
+def test_find_similar_empty_index(test_db):
+    assert find_similar(["ANYTHING"]) == [[]]
+
+
+def test_find_similar_ranks_closest_first(test_db):
+    _label("BLUE TOKAI COFFEE ROASTERS", "Food & Dining")
+    _label("DECATHLON SPORTS STORE", "Shopping")
+    _label("BLUE TOKAI COFFEE", "Food & Dining")
+
+    result = find_similar(["BLUE TOKAI COFFEE BANDRA", "DECATHLON STORE"], k=2)
+    assert len(result) == 2
+    assert result[0][0]["category"] == "Food & Dining"
+    assert result[0][0]["similarity"] >= result[0][-1]["similarity"]
+    assert result[1][0]["description"] == "DECATHLON SPORTS STORE"
+
+
+def test_index_picks_up_new_labels(test_db):
+    _label("DECATHLON SPORTS STORE", "Shopping")
+    assert suggest_categories(["CULT FIT GYM"]) == [[]]
+
+    _label("CULT FIT GYM MEMBERSHIP", "Health & Fitness")
+    assert suggest_categories(["CULT FIT GYM"]) == [["Health & Fitness"]]
+
+
+def test_uncategorized_with_suggestions(test_db):
+    _label("CULT FIT GYM MEMBERSHIP", "Health & Fitness")
+    csv = b"""Date,Narration,Debit Amount,Credit Amount
+2024-01-18,CULT FIT GYM,1500,0
+"""
+    ingest_csv(csv, "test.csv")
+
+    txns = get_uncategorized_with_suggestions()
+    assert txns[0]["suggested_categories"][0] == "Health & Fitness"
@@ -0,0 +1,136 @@
+import hashlib
+import io
+import json
+import os
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq  # noqa: E402
+
+from core.archive import archive_year, restore_year  # noqa: E402
+from core.database import execute_query  # noqa: E402
+from core.hashing import _identity  # noqa: E402
+from core.interning import normalize_merchant  # noqa: E402
+from core.snapshot import export_snapshot, export_transactions, import_snapshot, read_manifest  # noqa: E402
+from models.similarity import suggest_categories  # noqa: E402
+from services.budget_service import delete_budget, get_all_budgets, set_budget  # noqa: E402
+from services.transaction_service import (  # noqa: E402
+    get_all_transactions,
+    get_category_breakdown,
+    get_summary,
+    ingest_csv,
+    search_transactions,
+)
+
+SAMPLE_CSV = b"""Date,Narration,Debit Amount,Credit Amount
+2022-05-02,SWIGGY ORDER,250,0
+2023-01-10,ZOMATO ORDER,500,0
+2023-01-15,SALARY CREDIT,0,50000
+2023-02-05,NETFLIX SUBSCRIPTION,649,0
+2023-02-20,AMAZON PAY,1200,0
+"""
+
+
+def _state():
+    budgets = [(b["category"], b["monthly_limit"]) for b in get_all_budgets()]
+    return get_summary(), get_category_breakdown(), get_all_transactions(), budgets
+
+
+def test_snapshot_round_trip(test_db):
+    ingest_csv(SAMPLE_CSV, "test.csv")
+    set_budget("Food & Dining", 3000)
+    before = _state()
+
+    path = export_snapshot()
+    manifest = read_manifest(path)
+    assert manifest["tables"]["daily_transactions"] == 5
+    # Streamed in row groups of snapshot.row_group_size (2 in tests)
+    assert pq.ParquetFile(os.path.join(path, "daily_transactions.parquet")).num_row_groups == 3
+
+    delete_budget("Food & Dining")
+    ingest_csv(b"Date,Narration,Debit Amount,Credit Amount\n2023-03-01,UBER TRIP,300,0\n", "more.csv")
+
+    counts = import_snapshot(path)
+    assert counts["daily_transactions"] == 5
+    assert _state() == before
+    assert search_transactions("netflix")["total"] == 1
+    # Triggers are back: new rows still roll up and index
+    ingest_csv(b"Date,Narration,Debit Amount,Credit Amount\n2023-03-01,UBER TRIP,300,0\n", "more.csv")
+    assert get_summary()["total_expenses"] == before[0]["total_expenses"] + 300
+    assert search_transactions("uber")["total"] == 1
+
+
+def test_snapshot_includes_archived_years(test_db):
+    ingest_csv(SAMPLE_CSV, "test.csv")
+    archive_year(2022)
+
+    buf = io.BytesIO()
+    assert export_transactions(buf) == 5
+    table = pq.read_table(io.BytesIO(buf.getvalue()))
+    assert "2022-05-02" in table.column("date").to_pylist()
+
+    path = export_snapshot()
+    with pytest.raises(ValueError):
+        import_snapshot(path)
+    restore_year(2022)
+    assert import_snapshot(path)["daily_transactions"] == 5
+
+
+def _downgrade_to_hex_hashes(path):
+    """Rewrite a snapshot as a pre-v13 export would have: hex SHA-256 keys."""
+    file = os.path.join(path, "daily_transactions.parquet")
+    table = pq.read_table(file)
+    rows = table.to_pylist()
+    hashes = [
+        hashlib.sha256(
+            _identity(r["date"], normalize_merchant(r["description"]), r["amount"], r["transaction_type"])
+        ).hexdigest()
+        for r in rows
+    ]
+    index = table.schema.get_field_index("hash")
+    pq.write_table(table.set_column(index, "hash", pa.array(hashes, pa.string())), file)
+    manifest = read_manifest(path)
+    manifest["schema_version"] = 12
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+
+
+def test_old_snapshot_hashes_upgraded(test_db):
+    ingest_csv(SAMPLE_CSV, "test.csv")
+    path = export_snapshot()
+    _downgrade_to_hex_hashes(path)
+
+    import_snapshot(path)
+    assert {len(t["hash"]) for t in get_all_transactions()} == {32}
+    # Re-ingesting the same statement finds every row already stored
+    result = ingest_csv(SAMPLE_CSV, "test.csv")
+    assert (result["inserted"], result["skipped"]) == (0, 5)
+    assert len(get_all_transactions()) == 5
+
+
+def test_import_resets_similarity_index(test_db):
+    path = export_snapshot()
+    execute_query(
+        "INSERT INTO training_data (description, category) VALUES (?, ?)", ("DECATHLON SPORTS", "Shopping"),
+    )
+    assert suggest_categories(["DECATHLON SPORTS STORE"]) == [["Shopping"]]
+
+    import_snapshot(path)
+    assert suggest_categories(["DECATHLON SPORTS STORE"]) == [[]]
+
+
+def test_parquet_download_route(test_db):
+    from ui.app import app
+    import ui.routes  # noqa: F401
+
+    ingest_csv(SAMPLE_CSV, "test.csv")
+    archive_year(2022)
+    client = app.server.test_client()
+    resp = client.get("/download/transactions.parquet")
+    assert resp.status_code == 200
+    assert "attachment" in resp.headers["Content-Disposition"]
+    table = pq.read_table(io.BytesIO(resp.data))
+    resp.close()
+    assert table.num_rows == 5
+    assert "2022-05-02" in table.column("date").to_pylist()
@@ -90,6 +90,15 @@ def test_ingest_csv_duplicates(test_db):
     assert result2["skipped"] == 1
 
 
+def test_ingest_csv_repeated_row_in_file(test_db):
+    csv_content = b"""Date,Narration,Debit Amount,Credit Amount
+2024-01-12,UBER TRIP,300,0
+2024-01-12,UBER TRIP,300,0
+"""
+    result = ingest_csv(csv_content, "test.csv")
+    assert (result["inserted"], result["skipped"]) == (1, 1)
+
+
 def test_ingest_csv_missing_columns(test_db):
     csv_content = b"""Date,Description,Amount
 2024-01-15,ZOMATO,500
@@ -181,3 +190,107 @@ def test_update_transaction_category(test_db):
         "SELECT * FROM training_data WHERE category = 'Shopping'", fetch=True
     )
     assert len(training) >= 1
+
+
+def test_pending_ml_rows_rescored_when_models_ready(test_db, monkeypatch):
+    from core.config import get_config
+    from core.database import execute_query
+    import models.ml_models as ml
+    from services.transaction_service import rescore_pending_transactions
+
+    monkeypatch.setitem(get_config()["ml"], "confidence_threshold", 0.0)
+    for desc, cat in [("BLUE TOKAI COFFEE", "Food & Dining"), ("DECATHLON STORE", "Shopping")]:
+        execute_query("INSERT INTO training_data (description, category) VALUES (?, ?)", (desc, cat))
+
+    csv_content = b"""Date,Narration,Debit Amount,Credit Amount
+2024-01-18,BLUE TOKAI COFFEE ANDHERI,400,0
+"""
+    ingest_csv(csv_content, "test.csv")
+    assert ml.wait_for_models(timeout=30)
+    rescore_pending_transactions()
+
+    rows = execute_query(
+        "SELECT category, pending_ml FROM daily_transactions", fetch=True
+    )
+    assert rows[0]["pending_ml"] == 0
+    assert rows[0]["category"] is not None
+
+
+def test_get_transactions_by_month_range(test_db):
+    from services.transaction_service import get_transactions_by_month
+
+    csv_content = b"""Date,Narration,Debit Amount,Credit Amount
+2023-12-31,ZOMATO ORDER,100,0
+2024-12-01,ZOMATO ORDER,200,0
+2024-12-31,SWIGGY ORDER,300,0
+2025-01-01,SWIGGY ORDER,400,0
+"""
+    ingest_csv(csv_content, "test.csv")
+
+    december = get_transactions_by_month("2024-12")
+    assert [t["amount"] for t in december] == [200, 300]
+    assert december[0]["year_month"] == "2024-12"
+    assert december[0]["cal_month"] == 12
+
+
+def test_update_transaction_category_is_atomic(test_db, monkeypatch):
+    from core.database import execute_query
+    import services.transaction_service as ts
+
+    ingest_csv(b"""Date,Narration,Debit Amount,Credit Amount
+2024-01-18,RANDOM UNKNOWN MERCHANT,1000,0
+""", "test.csv")
+    txn = get_uncategorized_transactions()[0]
+
+    def fail(*args):
+        raise RuntimeError("feedback failed")
+
+    monkeypatch.setattr(ts, "record_feedback", fail)
+    with pytest.raises(RuntimeError):
+        update_transaction_category(txn["hash"], "Shopping")
+
+    assert get_uncategorized_transactions()[0]["hash"] == txn["hash"]
+    assert not execute_query("SELECT * FROM training_data WHERE category = 'Shopping'", fetch=True)
+
+
+SEARCH_CSV = b"""Date,Narration,Debit Amount,Credit Amount
+2022-03-01,SWIGGY ORDER 1234,300,0
+2023-06-10,AMAZON PAY INDIA,1200,0
+2023-06-11,PAY TO AMAZON SELLER,800,0
+2024-01-15,SWIGGY INSTAMART,450,0
+2024-01-16,SALARY CREDIT,0,50000
+"""
+
+
+def test_search_prefix_and_phrase(test_db):
+    from services.transaction_service import search_transactions
+
+    ingest_csv(SEARCH_CSV, "test.csv")
+
+    swig = search_transactions("swig")
+    assert swig["total"] == 2
+    assert {t["description"] for t in swig["results"]} == {"SWIGGY ORDER 1234", "SWIGGY INSTAMART"}
+
+    assert search_transactions("amazon pay")["total"] == 2
+    phrase = search_transactions('"amazon pay"')
+    assert [t["description"] for t in phrase["results"]] == ["AMAZON PAY INDIA"]
+
+    assert search_transactions("swig", month="2024-01")["total"] == 1
+    assert search_transactions("sal", transaction_type="Debit")["total"] == 0
+    assert search_transactions('"" !!')["total"] == 0
+
+
+def test_search_pagination_and_sync(test_db):
+    from core.database import execute_query
+    from services.transaction_service import search_transactions
+
+    ingest_csv(SEARCH_CSV, "test.csv")
+    page1 = search_transactions("swiggy", limit=1)
+    page2 = search_transactions("swiggy", limit=1, offset=1)
+    assert page1["total"] == page2["total"] == 2
+    assert page1["results"][0]["id"] != page2["results"][0]["id"]
+
+    execute_query("UPDATE daily_transactions SET description = 'ZOMATO ORDER' WHERE description = 'SWIGGY INSTAMART'")
+    execute_query("DELETE FROM daily_transactions WHERE description = 'SWIGGY ORDER 1234'")
+    assert search_transactions("swiggy")["total"] == 0
+    assert search_transactions("zomato")["total"] == 1
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+import core.config
+from core.database import execute_query
+from core.writer import get_writer_stats, submit_write, write_operation
+from services.budget_service import get_all_budgets, set_budget
+
+
+@pytest.fixture
+def single_writer(monkeypatch):
+    monkeypatch.setitem(core.config._config["database"], "single_writer", True)
+
+
+def test_disabled_runs_inline(test_db):
+    ran_on = []
+
+    @write_operation
+    def job():
+        ran_on.append(threading.current_thread().name)
+
+    job()
+    assert ran_on == [threading.current_thread().name]
+
+
+def test_writes_run_on_writer_thread(test_db, single_writer):
+    @write_operation
+    def job():
+        return threading.current_thread().name
+
+    assert job() == "pfa-db-writer"
+
+
+def test_concurrent_writes_are_batched(test_db, single_writer):
+    before = get_writer_stats()
+    errors = []
+
+    def worker(i):
+        try:
+            set_budget(f"Category {i}", 100 + i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    after = get_writer_stats()
+    assert errors == []
+    assert len(get_all_budgets()) == 20
+    assert after["jobs"] - before["jobs"] == 20
+    assert after["batches"] - before["batches"] <= 20
+
+
+def test_failed_job_does_not_abort_batch(test_db, single_writer):
+    def bad():
+        execute_query(
+            """INSERT INTO budgets (category, monthly_limit, created_at, updated_at)
+               VALUES ('Travel', 1, 'now', 'now')"""
+        )
+        raise ValueError("bad job")
+
+    failing = submit_write(bad)
+    set_budget("Shopping", 500)
+
+    with pytest.raises(ValueError):
+        failing.result(10)
+    assert [b["category"] for b in get_all_budgets()] == ["Shopping"]
+
+
+def test_timeout_only_while_queued(test_db, single_writer, monkeypatch):
+    monkeypatch.setitem(core.config._config["database"], "writer_timeout", 0.2)
+    started, release = threading.Event(), threading.Event()
+    ran = []
+
+    def blocker():
+        started.set()
+        release.wait(10)
+
+    @write_operation
+    def slow():
+        time.sleep(0.5)
+        return "done"
+
+    @write_operation
+    def queued():
+        ran.append("queued")
+
+    # A job already running is waited for past the timeout
+    assert slow() == "done"
+
+    # One still queued when the timeout passes is withdrawn and never runs
+    blocking = submit_write(blocker)
+    assert started.wait(10)
+    with pytest.raises(TimeoutError):
+        queued()
+    release.set()
+    blocking.result(10)
+    assert submit_write(lambda: "after").result(10) == "after"
+    assert ran == []
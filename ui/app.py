@@ -13,6 +13,11 @@ app = dash.Dash(
 sidebar = html.Div(
     [
         html.H4("Finance Analyzer", className="mb-3"),
+        dcc.Dropdown(
+            id="profile-select", clearable=False, searchable=False,
+            className="mb-2 text-dark", placeholder="Profile",
+        ),
+        dcc.Location(id="profile-reload", refresh=True),
         html.Hr(),
 
         dbc.Nav(
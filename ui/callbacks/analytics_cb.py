@@ -11,10 +11,10 @@ from services.analytics import (
     detect_anomalies,
     get_category_growth_rates,
     get_seasonal_patterns,
+    get_category_monthly_totals,
 )
 from services.transaction_service import get_category_breakdown
 from core.config import get_config
-from core.database import execute_query
 
 
 def _currency():
@@ -137,18 +137,11 @@ def update_category_time(pathname, theme):
     if pathname != "/analytics":
         return go.Figure()
 
-    rows = execute_query(
-        """SELECT substr(date, 1, 7) as month, category, SUM(amount) as total
-           FROM daily_transactions
-           WHERE transaction_type = 'Debit' AND category IS NOT NULL
-           GROUP BY substr(date, 1, 7), category
-           ORDER BY month""",
-        fetch=True,
-    )
+    rows = get_category_monthly_totals()
     if not rows:
         return go.Figure().add_annotation(text="No data", showarrow=False)
 
-    df = pd.DataFrame([dict(r) for r in rows])
+    df = pd.DataFrame(rows)
     fig = px.area(df, x="month", y="total", color="category")
     fig.update_layout(yaxis_title=f"Amount ({_currency()})",
                       **themed_layout(theme, margin=dict(t=20, b=40)))
@@ -1,6 +1,6 @@
 import plotly.graph_objects as go
 import plotly.express as px
-from dash import Input, Output, html
+from dash import Input, Output, State, html, no_update
 import dash_bootstrap_components as dbc
 import pandas as pd
 
@@ -11,6 +11,7 @@ from services.transaction_service import get_summary, get_monthly_breakdown, get
 from services.analytics import get_monthly_trends, forecast_next_month
 from services.budget_service import get_budget_vs_actual
 from core.config import get_config
+from core.database import get_data_versions
 
 
 def _currency():
@@ -18,8 +19,20 @@ def _currency():
 
 
 @app.callback(
-    Output("summary-cards", "children"),
+    Output("dashboard-data-version", "data"),
     Input("dashboard-refresh", "n_intervals"),
+    State("dashboard-data-version", "data"),
+)
+def poll_data_version(_, current):
+    versions = get_data_versions()
+    latest = {"transactions": versions.get("transactions", 0), "budgets": versions.get("budgets", 0)}
+    return no_update if latest == current else latest
+
+
+@app.callback(
+    Output("summary-cards", "children"),
+    Input("dashboard-data-version", "data"),
+    prevent_initial_call=True,
 )
 def update_summary_cards(_):
     s = get_summary()
@@ -36,8 +49,9 @@ def update_summary_cards(_):
 
 @app.callback(
     Output("monthly-trend-chart", "figure"),
-    Input("dashboard-refresh", "n_intervals"),
+    Input("dashboard-data-version", "data"),
     Input("theme-store", "data"),
+    prevent_initial_call=True,
 )
 def update_monthly_trend(_, theme):
     data = get_monthly_breakdown()
@@ -57,8 +71,9 @@ def update_monthly_trend(_, theme):
 
 @app.callback(
     Output("expense-pie-chart", "figure"),
-    Input("dashboard-refresh", "n_intervals"),
+    Input("dashboard-data-version", "data"),
     Input("theme-store", "data"),
+    prevent_initial_call=True,
 )
 def update_expense_pie(_, theme):
     data = get_category_breakdown("Debit")
@@ -73,8 +88,9 @@ def update_expense_pie(_, theme):
 
 @app.callback(
     Output("savings-rate-chart", "figure"),
-    Input("dashboard-refresh", "n_intervals"),
+    Input("dashboard-data-version", "data"),
     Input("theme-store", "data"),
+    prevent_initial_call=True,
 )
 def update_savings_rate(_, theme):
     data = get_monthly_trends()
@@ -97,8 +113,9 @@ def update_savings_rate(_, theme):
 
 @app.callback(
     Output("spending-heatmap", "figure"),
-    Input("dashboard-refresh", "n_intervals"),
+    Input("dashboard-data-version", "data"),
     Input("theme-store", "data"),
+    prevent_initial_call=True,
 )
 def update_heatmap(_, theme):
     data = get_daily_spending(months_back=6)
@@ -125,7 +142,8 @@ def update_heatmap(_, theme):
 
 @app.callback(
     Output("forecast-card-body", "children"),
-    Input("dashboard-refresh", "n_intervals"),
+    Input("dashboard-data-version", "data"),
+    prevent_initial_call=True,
 )
 def update_forecast(_):
     forecast = forecast_next_month()
@@ -158,7 +176,8 @@ def update_forecast(_):
 
 @app.callback(
     Output("budget-status-body", "children"),
-    Input("dashboard-refresh", "n_intervals"),
+    Input("dashboard-data-version", "data"),
+    prevent_initial_call=True,
 )
 def update_budget_status(_):
     data = get_budget_vs_actual()
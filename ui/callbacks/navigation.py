@@ -1,4 +1,4 @@
-from dash import Input, Output, html
+from dash import Input, Output, ctx, html, no_update
 import dash_bootstrap_components as dbc
 
 from ui.app import app
@@ -13,6 +13,7 @@ from ui.layouts import (
     settings,
 )
 from services.festival_service import get_upcoming_festivals
+from core.profiles import active_profile, list_profiles, profile_cookie, profile_exists
 
 
 @app.callback(
@@ -68,3 +69,25 @@ def update_festival_banner(_):
         )
 
     return alerts
+
+
+@app.callback(
+    Output("profile-select", "options"),
+    Output("profile-select", "value"),
+    Input("url", "pathname"),
+)
+def update_profile_select(_):
+    return [{"label": name.title(), "value": name} for name in list_profiles()], active_profile()
+
+
+@app.callback(
+    Output("profile-reload", "href"),
+    Input("profile-select", "value"),
+    prevent_initial_call=True,
+)
+def switch_profile(name):
+    if not name or name == active_profile() or not profile_exists(name):
+        return no_update
+    # Remembered per browser; the reload re-renders every page from the new profile
+    ctx.response.set_cookie(profile_cookie(), name, max_age=365 * 24 * 3600, samesite="Lax")
+    return "/"
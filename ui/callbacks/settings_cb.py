@@ -1,10 +1,15 @@
-import shutil
-from dash import Input, Output, html
+import os
+
+from dash import Input, Output, State, ctx, html
 import dash_bootstrap_components as dbc
 
 from ui.app import app
 from models.ml_models import train_models
-from core.config import get_config
+from models.drift import get_model_accuracy
+from core.backup import backup_database, list_backups, prune_backups
+from core.maintenance import get_maintenance_log, run_maintenance
+from core.profiles import create_profile
+from core.query_stats import get_query_stats
 
 
 @app.callback(
@@ -21,23 +26,144 @@ def handle_retrain(n_clicks):
 
 
 @app.callback(
-    Output("download-backup", "data"),
+    Output("model-accuracy-body", "children"),
+    Input("url", "pathname"),
+    Input("retrain-feedback", "children"),
+)
+def update_model_accuracy(pathname, _):
+    if pathname != "/settings":
+        return []
+
+    stats = get_model_accuracy()
+    if not stats:
+        return html.P("No corrections recorded yet.", className="text-muted")
+
+    rows = [
+        html.Tr([
+            html.Td(s["head"]),
+            html.Td(s["label"]),
+            html.Td(s["confirmed"]),
+            html.Td(s["corrected"]),
+            html.Td(f"{s['rolling_accuracy'] * 100:.0f}%"),
+            html.Td(s["corrected_since_train"]),
+        ])
+        for s in stats
+    ]
+    return dbc.Table([
+        html.Thead(html.Tr([
+            html.Th("Head"), html.Th("Predicted"), html.Th("Confirmed"), html.Th("Corrected"),
+            html.Th("Rolling Accuracy"), html.Th("Corrections Since Training"),
+        ])),
+        html.Tbody(rows),
+    ], bordered=True, hover=True, size="sm")
+
+
+def _statement_table(statements):
+    rows = [
+        html.Tr([
+            html.Td(html.Code(s["sql"][:120] + ("..." if len(s["sql"]) > 120 else "")),
+                    title="\n".join(s["call_sites"])),
+            html.Td(s["calls"]),
+            html.Td(f"{s['avg_ms']:.2f}"),
+            html.Td(f"{s['max_ms']:.2f}"),
+            html.Td(s["rows"]),
+        ])
+        for s in statements
+    ]
+    return dbc.Table([
+        html.Thead(html.Tr([
+            html.Th("Statement"), html.Th("Calls"), html.Th("Avg ms"), html.Th("Max ms"), html.Th("Rows"),
+        ])),
+        html.Tbody(rows),
+    ], bordered=True, hover=True, size="sm", className="small")
+
+
+@app.callback(
+    Output("query-stats-body", "children"),
+    Input("url", "pathname"),
+    Input("query-stats-refresh", "n_clicks"),
+)
+def update_query_stats(pathname, _):
+    if pathname != "/settings":
+        return []
+
+    stats = get_query_stats(top_n=10)
+    if not stats["most_frequent"]:
+        return html.P("No queries recorded yet.", className="text-muted")
+
+    histogram = "  ".join(f"{bucket}: {n}" for bucket, n in stats["histogram"].items())
+    return [
+        html.P(histogram, className="text-muted small"),
+        html.H6("Slowest"),
+        _statement_table(stats["slowest"]),
+        html.H6("Most Frequent"),
+        _statement_table(stats["most_frequent"]),
+    ]
+
+
+@app.callback(
+    Output("backup-feedback", "children"),
     Input("backup-db-btn", "n_clicks"),
     prevent_initial_call=True,
 )
 def handle_backup(n_clicks):
-    import os
-    from datetime import datetime
+    try:
+        name = os.path.basename(backup_database())
+        prune_backups()
+    except Exception as e:
+        return dbc.Alert(f"Backup failed: {e}", color="danger")
+
+    return dbc.Alert([
+        f"Backup created ({len(list_backups())} kept). ",
+        html.A("Download", href=f"/download/backup/{name}", className="alert-link"),
+    ], color="success")
 
-    cfg = get_config()
-    db_path = cfg.get("database", {}).get("path", "personal_finance_analyzer.db")
 
-    if not os.path.exists(db_path):
-        return None
+@app.callback(
+    Output("maintenance-body", "children"),
+    Input("url", "pathname"),
+    Input("maintenance-run-btn", "n_clicks"),
+)
+def update_maintenance(pathname, n_clicks):
+    if pathname != "/settings":
+        return []
+
+    notice = []
+    if n_clicks and ctx.triggered_id == "maintenance-run-btn":
+        if not run_maintenance(force=True):
+            notice = [dbc.Alert("An import is running; maintenance was skipped.", color="warning")]
 
-    backup_name = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-    backup_path = os.path.join("backups", backup_name)
-    os.makedirs("backups", exist_ok=True)
-    shutil.copy2(db_path, backup_path)
+    log = get_maintenance_log()
+    if not log:
+        return notice + [html.P("No maintenance has run yet.", className="text-muted")]
 
-    return dict(content=open(backup_path, "rb").read(), filename=backup_name, type="application/octet-stream")
+    rows = [
+        html.Tr([
+            html.Td(r["started_at"][:19].replace("T", " ")),
+            html.Td(r["task"]),
+            html.Td(f"{r['duration_ms']:.0f}"),
+            html.Td(r["status"], className="text-danger" if r["status"] != "ok" else None),
+            html.Td(r["detail"]),
+        ])
+        for r in log
+    ]
+    return notice + [dbc.Table([
+        html.Thead(html.Tr([
+            html.Th("Started"), html.Th("Task"), html.Th("ms"), html.Th("Status"), html.Th("Detail"),
+        ])),
+        html.Tbody(rows),
+    ], bordered=True, hover=True, size="sm", className="small")]
+
+
+@app.callback(
+    Output("create-profile-feedback", "children"),
+    Input("create-profile-btn", "n_clicks"),
+    State("new-profile-name", "value"),
+    prevent_initial_call=True,
+)
+def handle_create_profile(n_clicks, name):
+    try:
+        create_profile((name or "").strip().lower())
+    except ValueError as e:
+        return dbc.Alert(str(e), color="danger")
+    return dbc.Alert(f"Profile '{name.strip().lower()}' created. Select it in the sidebar.", color="success")
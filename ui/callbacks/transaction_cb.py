@@ -6,7 +6,8 @@ import dash_bootstrap_components as dbc
 from ui.app import app
 from services.transaction_service import (
     get_all_transactions,
-    get_uncategorized_transactions,
+    get_uncategorized_with_suggestions,
+    search_transactions,
     update_transaction_category,
     ingest_csv,
 )
@@ -16,7 +17,9 @@ from models.keywords import (
     ALL_INCOME_CATEGORIES,
 )
 from models.ml_models import train_models
+from models.drift import should_retrain
 from core.config import get_config
+from core.profiles import bind_profile
 
 
 def _currency():
@@ -40,26 +43,37 @@ def update_transactions_table(type_filter, search, month_filter, cat_filter, _sa
     if pathname != "/transactions":
         return [], ""
 
-    txns = get_all_transactions(limit=1000)
-
-    if type_filter and type_filter != "all":
-        txns = [t for t in txns if t["transaction_type"] == type_filter]
+    total = None
+    if search and search.strip():
+        # Ranked full-text search over the whole history, filters applied in SQL
+        hits = search_transactions(
+            search,
+            transaction_type=type_filter if type_filter and type_filter != "all" else None,
+            category=cat_filter if cat_filter not in (None, "all", "_uncategorized") else None,
+            month=month_filter or None,
+            uncategorized=cat_filter == "_uncategorized",
+            limit=1000,
+        )
+        txns, total = hits["results"], hits["total"]
+    else:
+        txns = get_all_transactions(limit=1000)
 
-    if cat_filter and cat_filter != "all":
-        if cat_filter == "_uncategorized":
-            txns = [t for t in txns if not t.get("category")]
-        else:
-            txns = [t for t in txns if t.get("category") == cat_filter]
+        if type_filter and type_filter != "all":
+            txns = [t for t in txns if t["transaction_type"] == type_filter]
 
-    if search:
-        search_lower = search.lower()
-        txns = [t for t in txns if search_lower in t["description"].lower()]
+        if cat_filter and cat_filter != "all":
+            if cat_filter == "_uncategorized":
+                txns = [t for t in txns if not t.get("category")]
+            else:
+                txns = [t for t in txns if t.get("category") == cat_filter]
 
-    if month_filter:
-        txns = [t for t in txns if t["date"].startswith(month_filter)]
+        if month_filter:
+            txns = [t for t in txns if t["date"].startswith(month_filter)]
 
     uncat_count = sum(1 for t in get_all_transactions(limit=5000) if not t.get("category"))
     info = f"Showing {len(txns)} transactions"
+    if total is not None and total > len(txns):
+        info += f" (best {len(txns)} of {total} matches)"
     if uncat_count > 0:
         info += f" | {uncat_count} uncategorized"
 
@@ -156,12 +170,15 @@ def save_category(n_clicks, txn_hash, txn_type, category):
     is_saving = 1 if txn_type == "Savings/Investment" else 0
     update_transaction_category(txn_hash, category, is_saving)
 
-    # Retrain in background so the model learns this correction
-    threading.Thread(target=train_models, daemon=True).start()
+    # Retrain in background once corrections show the model drifting
+    message = f"Category updated to '{category}'."
+    if should_retrain():
+        threading.Thread(target=bind_profile(train_models), daemon=True).start()
+        message += " ML will retrain in background."
 
     return (
         dbc.Alert(
-            [html.I(className="fas fa-check me-2"), f"Category updated to '{category}'. ML will retrain in background."],
+            [html.I(className="fas fa-check me-2"), message],
             color="success",
             duration=4000,
         ),
@@ -185,7 +202,7 @@ def toggle_uncategorized_modal(show_clicks, close_clicks, is_open):
     if trigger == "close-uncat-modal-btn":
         return False, no_update
 
-    uncategorized = get_uncategorized_transactions()
+    uncategorized = get_uncategorized_with_suggestions()
     sym = _currency()
 
     if not uncategorized:
@@ -202,6 +219,7 @@ def toggle_uncategorized_modal(show_clicks, close_clicks, is_open):
             html.Td(txn["description"], style={"maxWidth": "300px", "overflow": "hidden", "textOverflow": "ellipsis"}),
             html.Td(f"{sym}{txn['amount']:,.2f}"),
             html.Td(txn["transaction_type"]),
+            html.Td(", ".join(txn["suggested_categories"][:3]) or "-", className="text-muted"),
         ]))
 
     body = html.Div([
@@ -216,6 +234,7 @@ def toggle_uncategorized_modal(show_clicks, close_clicks, is_open):
         dbc.Table([
             html.Thead(html.Tr([
                 html.Th("Date"), html.Th("Description"), html.Th("Amount"), html.Th("Type"),
+                html.Th("Similar to"),
             ])),
             html.Tbody(rows),
         ], bordered=True, hover=True, size="sm", striped=True),
@@ -75,6 +75,7 @@ def layout():
             ], md=6),
         ]),
 
-        # Hidden interval for auto-refresh
+        # Hidden interval polls the data versions; charts redraw only when they change
         dcc.Interval(id="dashboard-refresh", interval=30000, n_intervals=0),
+        dcc.Store(id="dashboard-data-version"),
     ])
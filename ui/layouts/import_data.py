@@ -53,6 +53,14 @@ def layout():
                         ),
                         dcc.Download(id="download-csv"),
                     ], md=4),
+                    dbc.Col([
+                        # A plain link: the file is streamed by a Flask route (ui/routes.py)
+                        dbc.Button(
+                            [html.I(className="fas fa-file-export me-2"), "Export as Parquet"],
+                            id="export-parquet-btn", color="success", outline=True, className="me-2",
+                            href="/download/transactions.parquet", external_link=True,
+                        ),
+                    ], md=4),
                 ]),
             ]),
         ], className="shadow-sm"),
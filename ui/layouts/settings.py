@@ -1,4 +1,4 @@
-from dash import html, dcc
+from dash import html
 import dash_bootstrap_components as dbc
 
 
@@ -17,6 +17,22 @@ def layout():
             ]),
         ], className="shadow-sm mb-4"),
 
+        dbc.Card([
+            dbc.CardHeader("Model Accuracy (from your corrections)"),
+            dbc.CardBody(html.Div(id="model-accuracy-body")),
+        ], className="shadow-sm mb-4"),
+
+        dbc.Card([
+            dbc.CardHeader([
+                "Query Performance",
+                dbc.Button(
+                    [html.I(className="fas fa-sync")],
+                    id="query-stats-refresh", color="link", size="sm", className="float-end p-0",
+                ),
+            ]),
+            dbc.CardBody(html.Div(id="query-stats-body")),
+        ], className="shadow-sm mb-4"),
+
         dbc.Card([
             dbc.CardHeader("Database"),
             dbc.CardBody([
@@ -24,8 +40,34 @@ def layout():
                     [html.I(className="fas fa-download me-2"), "Backup Database"],
                     id="backup-db-btn", color="info", className="me-2",
                 ),
-                dcc.Download(id="download-backup"),
                 html.Div(id="backup-feedback", className="mt-2"),
             ]),
+        ], className="shadow-sm mb-4"),
+
+        dbc.Card([
+            dbc.CardHeader([
+                "Maintenance",
+                dbc.Button(
+                    [html.I(className="fas fa-broom me-2"), "Run Now"],
+                    id="maintenance-run-btn", color="link", size="sm", className="float-end p-0",
+                ),
+            ]),
+            dbc.CardBody(html.Div(id="maintenance-body")),
+        ], className="shadow-sm mb-4"),
+
+        dbc.Card([
+            dbc.CardHeader("Profiles"),
+            dbc.CardBody([
+                html.P(
+                    "Each profile has its own transactions, budgets and trained models. "
+                    "Switch between them from the sidebar.",
+                    className="text-muted small",
+                ),
+                dbc.InputGroup([
+                    dbc.Input(id="new-profile-name", placeholder="e.g. priya"),
+                    dbc.Button("Create Profile", id="create-profile-btn", color="secondary"),
+                ]),
+                html.Div(id="create-profile-feedback", className="mt-2"),
+            ]),
         ], className="shadow-sm"),
     ])
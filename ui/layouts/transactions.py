@@ -15,7 +15,7 @@ def layout():
             dbc.Col([
                 dbc.InputGroup([
                     dbc.InputGroupText(html.I(className="fas fa-search")),
-                    dbc.Input(id="txn-search", placeholder="Search transactions...", type="text"),
+                    dbc.Input(id="txn-search", placeholder='Search: swig, "amazon pay"...', type="text", debounce=True),
                 ]),
             ], md=3),
             dbc.Col([
@@ -0,0 +1,68 @@
+"""Plain Flask routes served alongside the Dash app."""
+import os
+import tempfile
+
+from flask import abort, g, request, send_file, send_from_directory
+
+from core.backup import BACKUP_NAME, backup_dir
+from core.profiles import DEFAULT_PROFILE, list_profiles, profile_cookie, use_profile
+from ui.app import app
+
+
+@app.server.before_request
+def enter_profile():
+    # Every request, Dash callbacks included, works on the profile chosen in
+    # this browser; names that are not an existing profile fall back to the
+    # default before any path is built from them.
+    name = request.cookies.get(profile_cookie(), DEFAULT_PROFILE)
+    g.pfa_profile = use_profile(name if name in list_profiles() else DEFAULT_PROFILE)
+    g.pfa_profile.__enter__()
+
+
+@app.server.teardown_request
+def leave_profile(exc):
+    profile = g.pop("pfa_profile", None)
+    if profile is not None:
+        profile.__exit__(None, None, None)
+
+
+@app.server.route("/download/backup/<name>")
+def download_backup(name):
+    # Streamed from disk; only files the backup module wrote are served.
+    if not BACKUP_NAME.match(name):
+        abort(404)
+    return send_from_directory(
+        os.path.abspath(backup_dir()), name,
+        as_attachment=True, mimetype="application/octet-stream",
+    )
+
+
+@app.server.route("/download/transactions.parquet")
+def download_transactions_parquet():
+    # Full history, archived years included. Written row group by row group to
+    # a temporary file and streamed from disk, so it is never held in memory.
+    from core.snapshot import export_transactions
+
+    fd, path = tempfile.mkstemp(suffix=".parquet")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            export_transactions(f)
+    except RuntimeError as e:
+        os.remove(path)
+        # pyarrow is not installed
+        return str(e), 503, {"Content-Type": "text/plain; charset=utf-8"}
+    except Exception:
+        os.remove(path)
+        raise
+    f = open(path, "rb")
+    response = send_file(
+        f, as_attachment=True, download_name="transactions_export.parquet",
+        mimetype="application/octet-stream",
+    )
+
+    def cleanup():
+        f.close()
+        os.remove(path)
+
+    response.call_on_close(cleanup)
+    return response